@@ -0,0 +1,116 @@
+"""
+Latency and query-count benchmarks for every public API endpoint.
+
+Run from this directory with ``pytest``; add ``--reuse-db`` to keep the
+seeded database between runs. Results are written as JSON so that two
+commits can be compared with ``python compare.py old.json new.json``.
+"""
+
+import os
+import statistics
+import time
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+from benchmarks.seed import PASSWORD
+
+ITERATIONS = int(os.environ.get('BENCH_ITERATIONS', 20))
+WARMUP = 2
+
+# (URL name, method, URL kwargs builder, request data builder)
+ENDPOINTS = [
+    ('listing-list', 'get', None, None),
+    ('listing-detail', 'get', lambda s: {'pk': s['listing'].pk}, None),
+    ('category-list', 'get', None, None),
+    ('category-detail', 'get',
+     lambda s: {'pk': s['listing'].category_id}, None),
+    ('subcategory-list', 'get', None, None),
+    ('subcategory-detail', 'get',
+     lambda s: {'pk': s['listing'].subcategory_id}, None),
+    ('subcategory-by-category', 'get',
+     lambda s: {'category_id': s['listing'].category_id}, None),
+    ('my-listings', 'get', None, None),
+    ('favorite-list', 'get', None, None),
+    ('favorite-toggle', 'post',
+     lambda s: {'pk': s['other_listing'].pk}, None),
+    ('conversation-list-create', 'get', None, None),
+    ('message-list-create', 'get',
+     lambda s: {'conversation_id': s['conversation'].pk}, None),
+    ('mark-messages-as-read', 'post',
+     lambda s: {'conversation_id': s['conversation'].pk},
+     lambda s: {'message_ids': []}),
+    ('conversation-unread-counts', 'get', None, None),
+    ('unread-message-count', 'get', None, None),
+    ('listing-incoming-messages', 'get',
+     lambda s: {'listing_id': s['listing'].pk}, None),
+    ('profile-detail', 'get', None, None),
+    ('public-profile', 'get',
+     lambda s: {'username': s['user'].username}, None),
+    ('user-listings', 'get',
+     lambda s: {'username': s['user'].username}, None),
+    ('review-list', 'get', lambda s: {'user_id': s['user'].pk}, None),
+    ('review-detail', 'get', lambda s: {'pk': s['review'].pk}, None),
+    ('reviewer-review-detail', 'get',
+     lambda s: {'user_id': s['review'].reviewed_user_id,
+                'reviewer_id': s['review'].reviewer_id}, None),
+    ('profile', 'get', None, None),
+    ('login', 'post', None,
+     lambda s: {'email': s['user'].email, 'password': PASSWORD}),
+    ('sitemap', 'get', None, None),
+]
+
+
+class QueryCounter:
+    """Execute wrapper counting queries without keeping them."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    index = max(0, int(round(fraction * len(ordered))) - 1)
+    return ordered[index]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'url_name,method,kwargs,data', ENDPOINTS,
+    ids=[endpoint[0] for endpoint in ENDPOINTS])
+def test_endpoint(url_name, method, kwargs, data, subject, api_client,
+                  results):
+    url = reverse(url_name, kwargs=kwargs(subject) if kwargs else None)
+    payload = data(subject) if data else None
+    send = getattr(api_client, method)
+
+    for _ in range(WARMUP):
+        send(url, payload, format='json')
+
+    latencies = []
+    queries = []
+    for _ in range(ITERATIONS):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = send(url, payload, format='json')
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count)
+        assert response.status_code < 400, response.content[:200]
+
+    results[url_name] = {
+        'method': method.upper(),
+        'iterations': ITERATIONS,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p90_ms': round(percentile(latencies, 0.90), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'mean_ms': round(statistics.mean(latencies), 2),
+        'max_ms': round(max(latencies), 2),
+        'queries': max(queries),
+    }
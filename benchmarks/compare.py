@@ -0,0 +1,51 @@
+"""
+Compare two benchmark result files.
+
+Usage: python compare.py OLD.json NEW.json [--threshold 0.2]
+
+Prints p50/p90 latency and query count changes per endpoint and exits
+with status 1 if any endpoint regressed by more than the threshold or
+runs more queries.
+"""
+
+import argparse
+import json
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed relative p90 increase.')
+    args = parser.parse_args()
+
+    with open(args.old) as old_file, open(args.new) as new_file:
+        old = json.load(old_file)['endpoints']
+        new = json.load(new_file)['endpoints']
+
+    regressions = 0
+    print(f"{'endpoint':32} {'p50 ms':>16} {'p90 ms':>16} {'queries':>10}")
+    for name in sorted(set(old) | set(new)):
+        if name not in old or name not in new:
+            print(f"{name:32} only in {'new' if name in new else 'old'}")
+            continue
+        before, after = old[name], new[name]
+        regressed = (
+            after['p90_ms'] > before['p90_ms'] * (1 + args.threshold)
+            or after['queries'] > before['queries']
+        )
+        regressions += regressed
+        print(
+            f"{name:32} "
+            f"{before['p50_ms']:>7} -> {after['p50_ms']:<6} "
+            f"{before['p90_ms']:>7} -> {after['p90_ms']:<6} "
+            f"{before['queries']:>3} -> {after['queries']:<3}"
+            f"{'  REGRESSED' if regressed else ''}"
+        )
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import json
+import os
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from listings.models import Listing
+from messaging.models import Conversation
+from reviews.models import Review
+from benchmarks.seed import get_volumes, seed
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    """Seed the benchmark database once per session."""
+    with django_db_blocker.unblock():
+        if not Listing.objects.exists():
+            seed(get_volumes())
+
+
+@pytest.fixture(scope='session')
+def subject(django_db_setup, django_db_blocker):
+    """
+    Reference objects owned by or involving the benchmark user, the
+    power seller with the most listings that have conversations.
+    """
+    with django_db_blocker.unblock():
+        user = (
+            get_user_model().objects
+            .filter(listings__conversations__isnull=False,
+                    reviews_given__isnull=False)
+            .annotate(num_listings=Count('listings', distinct=True))
+            .order_by('-num_listings', 'id')
+            .first()
+        )
+        listing = Listing.objects.filter(
+            user=user, conversations__isnull=False).order_by('id').first()
+        other_listing = Listing.objects.exclude(user=user).first()
+        conversation = Conversation.objects.filter(listing=listing).first()
+        review = Review.objects.filter(reviewer=user).first() \
+            or Review.objects.first()
+        token = RefreshToken.for_user(user).access_token
+    return {
+        'user': user,
+        'listing': listing,
+        'other_listing': other_listing,
+        'conversation': conversation,
+        'review': review,
+        'token': str(token),
+    }
+
+
+@pytest.fixture
+def api_client(subject):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {subject['token']}")
+    return client
+
+
+@pytest.fixture(scope='session')
+def results():
+    """
+    Collect per-endpoint results and write them to
+    benchmarks/results/<commit>.json (or BENCH_OUTPUT) at the end.
+    """
+    collected = {}
+    yield collected
+    output = Path(os.environ.get(
+        'BENCH_OUTPUT', RESULTS_DIR / f'{_git_commit()}.json'))
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        'commit': _git_commit(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'volumes': get_volumes(),
+        'endpoints': collected,
+    }, indent=2, sort_keys=True))
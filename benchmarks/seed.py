@@ -0,0 +1,38 @@
+"""
+Seed the benchmark database with configurable volumes.
+
+Volumes come from the BENCH_* environment variables; BENCH_SCALE=full
+selects the capacity-planning volumes (1M listings, 100k users,
+5M messages, 500k reviews). The data itself is generated by the
+seed_marketplace generator, so benchmarks see the same skew as
+load tests.
+"""
+
+import os
+
+from locallisting.seeding import MarketplaceSeeder
+
+PASSWORD = 'benchmark-pass-123'
+
+SCALES = {
+    'small': {'users': 1000, 'listings': 10000, 'favorites': 20000,
+              'conversations': 3000, 'messages': 50000, 'reviews': 5000},
+    'full': {'users': 100000, 'listings': 1000000, 'favorites': 2000000,
+             'conversations': 300000, 'messages': 5000000,
+             'reviews': 500000},
+}
+
+
+def get_volumes():
+    """Return the seed volumes from BENCH_SCALE and BENCH_* overrides."""
+    volumes = dict(SCALES[os.environ.get('BENCH_SCALE', 'small')])
+    for name in volumes:
+        value = os.environ.get(f'BENCH_{name.upper()}')
+        if value:
+            volumes[name] = int(value)
+    return volumes
+
+
+def seed(volumes, seed_value=42):
+    """Generate the benchmark data set with a fixed seed."""
+    MarketplaceSeeder(volumes, seed=seed_value, password=PASSWORD).run()
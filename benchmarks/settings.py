@@ -0,0 +1,26 @@
+"""
+Settings for the API benchmark suite.
+
+Benchmarks run against a local database given by BENCH_DATABASE_URL
+(SQLite or PostgreSQL), defaulting to a SQLite file next to this module.
+"""
+
+import os
+from pathlib import Path
+
+os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key')
+os.environ['DATABASE_URL'] = os.environ.get(
+    'BENCH_DATABASE_URL',
+    f"sqlite:///{Path(__file__).resolve().parent / 'bench_db.sqlite3'}")
+
+from locallisting.settings import *  # noqa: E402,F401,F403
+
+DEBUG = False
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+# Keep the seeded test database in a file so --reuse-db can skip seeding
+database = DATABASES['default']  # noqa: F405
+if database['ENGINE'] == 'django.db.backends.sqlite3':
+    database['TEST'] = {
+        'NAME': str(Path(__file__).resolve().parent / 'test_bench.sqlite3'),
+    }
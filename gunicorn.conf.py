@@ -0,0 +1,20 @@
+import os
+import shutil
+
+# Workers write Prometheus metrics to this directory so /metrics can
+# aggregate them; it must be set before the application is imported.
+os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', '/tmp/locallisting-prometheus')
+
+
+def on_starting(server):
+    """Start every server with an empty metrics directory."""
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that exited."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Category, Subcategory, Listing, ListingImage
+from django.db.models import Count
+from .models import (
+    ArchivedListing, Category, Subcategory, Listing, ListingImage
+)
 
 
 class SubcategoryInline(admin.TabularInline):
@@ -15,13 +18,21 @@ class CategoryAdmin(admin.ModelAdmin):
     """
     Admin interface for the Category model.
     """
-    list_display = ('name', 'subcategory_count')
+    list_display = ('name', 'subcategory_count', 'listing_count')
     search_fields = ('name',)
     inlines = [SubcategoryInline]
 
+    def get_queryset(self, request):
+        """
+        Count the subcategories of the listed categories in the list
+        query.
+        """
+        return super().get_queryset(request).annotate(
+            num_subcategories=Count('subcategories'))
+
     def subcategory_count(self, obj):
         """
-        Count the number of subcategories associated with the category.
+        Return the number of subcategories, counted by get_queryset().
 
         Args:
             obj: The Category instance being displayed.
@@ -29,8 +40,23 @@ class CategoryAdmin(admin.ModelAdmin):
         Returns:
             int: The number of related Subcategory instances.
         """
-        return obj.subcategories.count()
+        return obj.num_subcategories
     subcategory_count.short_description = 'Number of Subcategories'
+    subcategory_count.admin_order_field = 'num_subcategories'
+
+    def listing_count(self, obj):
+        """
+        Return the number of active listings in the category.
+
+        Args:
+            obj: The Category instance being displayed.
+
+        Returns:
+            int: The category's active listing counter.
+        """
+        return obj.active_listings
+    listing_count.short_description = 'Active Listings'
+    listing_count.admin_order_field = 'active_listings'
 
 
 @admin.register(Subcategory)
@@ -40,20 +66,22 @@ class SubcategoryAdmin(admin.ModelAdmin):
     """
     list_display = ('name', 'category', 'listing_count')
     list_filter = ('category',)
+    list_select_related = ('category',)
     search_fields = ('name', 'category__name')
 
     def listing_count(self, obj):
         """
-        Count the number of listings associated with the subcategory.
+        Return the number of active listings in the subcategory.
 
         Args:
             obj: The Subcategory instance being displayed.
 
         Returns:
-            int: The number of related Listing instances.
+            int: The subcategory's active listing counter.
         """
-        return obj.listings.count()
-    listing_count.short_description = 'Number of Listings'
+        return obj.active_listings
+    listing_count.short_description = 'Active Listings'
+    listing_count.admin_order_field = 'active_listings'
 
 
 class ListingImageInline(admin.TabularInline):
@@ -134,5 +162,21 @@ class ListingAdmin(admin.ModelAdmin):
         return self.readonly_fields
 
 
+@admin.register(ArchivedListing)
+class ArchivedListingAdmin(admin.ModelAdmin):
+    """
+    Read-only admin interface for archived listings.
+    """
+    list_display = ('title', 'user', 'status', 'created_at', 'archived_at')
+    list_filter = ('status', 'archived_at')
+    search_fields = ('title', 'description', 'user__username')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # Register ListingImage model with the admin site
 admin.site.register(ListingImage)
@@ -0,0 +1,204 @@
+"""
+Daily view, favorite and contact counts of listings.
+
+Writing a row per event would add a write to every listing view, so
+events are counted in memory by each process and added to the
+per-(listing, day) ListingDailyStats rows in batches: when
+ANALYTICS_BUFFER_SIZE counters are pending, when the oldest pending
+event is ANALYTICS_FLUSH_INTERVAL seconds old, and when the process
+exits. A flush costs the same few queries however many events it
+writes. Events still in memory when a process is killed are lost,
+which is acceptable for analytics.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ArchivedListing, Listing, ListingDailyStats
+
+logger = logging.getLogger(__name__)
+
+# Event names, which are also the ListingDailyStats counter fields
+EVENTS = ('views', 'favorites', 'contacts')
+
+
+class EventBuffer:
+    """Thread-safe in-memory counts of listing events by day."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (listing id, date, event) -> count
+        self._counts = Counter()
+        self._oldest = None
+
+    def add(self, listing_id, event, count=1):
+        """
+        Count an event, flushing the buffer if it is due.
+
+        Args:
+            listing_id (int): The listing.
+            event (str): One of EVENTS.
+            count (int): Number of events.
+        """
+        if event not in EVENTS:
+            raise ValueError(f"Unknown listing event {event!r}")
+        interval = settings.ANALYTICS_FLUSH_INTERVAL
+        with self._lock:
+            if not self._counts:
+                self._oldest = time.monotonic()
+            self._counts[listing_id, timezone.now().date(), event] += count
+            due = len(self._counts) >= settings.ANALYTICS_BUFFER_SIZE or (
+                interval is not None
+                and time.monotonic() - self._oldest >= interval)
+        if due:
+            self.flush()
+
+    def take(self):
+        """Return the pending counts and empty the buffer."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return counts
+
+    def clear(self):
+        """Drop the pending counts."""
+        self.take()
+
+    def flush(self):
+        """
+        Write the pending counts to the database.
+
+        Returns:
+            int: Number of (listing, day) rows written.
+        """
+        counts = self.take()
+        if not counts:
+            return 0
+        try:
+            return write_counts(counts)
+        except Exception:
+            logger.exception("Could not write %d listing event counts",
+                             len(counts))
+            return 0
+
+
+def write_counts(counts):
+    """
+    Add event counts to the ListingDailyStats rows, creating missing
+    rows.
+
+    Missing rows are inserted first, ignoring conflicts, so the rows to
+    add to can then be locked and updated with one bulk update; their
+    locks are taken in primary key order, so concurrent flushes do not
+    deadlock.
+
+    Args:
+        counts (Counter): Counts by (listing id, date, event).
+
+    Returns:
+        int: Number of rows written.
+    """
+    added = {}
+    for (listing_id, date, event), count in counts.items():
+        added.setdefault((listing_id, date), Counter())[event] += count
+    # Listings deleted since their events were counted are skipped
+    existing = set(Listing.objects.filter(
+        pk__in={listing_id for listing_id, _ in added}
+    ).values_list('pk', flat=True))
+    added = {key: value for key, value in added.items()
+             if key[0] in existing}
+    if not added:
+        return 0
+
+    with transaction.atomic():
+        ListingDailyStats.objects.bulk_create([
+            ListingDailyStats(listing_id=listing_id, date=date)
+            for listing_id, date in added
+        ], ignore_conflicts=True)
+        rows = []
+        for stats in ListingDailyStats.objects.select_for_update().filter(
+            listing_id__in={listing_id for listing_id, _ in added},
+            date__in={date for _, date in added},
+        ).order_by('pk'):
+            event_counts = added.get((stats.listing_id, stats.date))
+            if event_counts is None:
+                continue
+            for event, count in event_counts.items():
+                setattr(stats, event, getattr(stats, event) + count)
+            rows.append(stats)
+        ListingDailyStats.objects.bulk_update(rows, EVENTS)
+    return len(rows)
+
+
+events = EventBuffer()
+
+
+def record_event(listing_id, event, count=1):
+    """Count an event of a listing; see EventBuffer.add()."""
+    events.add(listing_id, event, count)
+
+
+def get_seller_stats(user, days):
+    """
+    Return the daily event counts of a seller's listings, including
+    archived ones, read with one query.
+
+    Args:
+        user (User): The seller.
+        days (int): Number of days, up to and including today.
+
+    Returns:
+        list: Per listing with events, its ``id``, ``title`` and
+        ``series``: the counts of each day, oldest first, with zeros on
+        days without events.
+    """
+    end = timezone.now().date()
+    dates = [end - timedelta(days=offset)
+             for offset in reversed(range(days))]
+    # Stats outlive their listing when it is archived, so the title
+    # comes from whichever table holds the listing now
+    title = Coalesce(*(
+        Subquery(model.objects.filter(pk=OuterRef('listing_id')).values(
+            'title'))
+        for model in (Listing, ArchivedListing)))
+    listings = {}
+    for listing_id, title, date, *counts in ListingDailyStats.objects.filter(
+        Q(listing_id__in=Listing.objects.filter(user=user).values('pk'))
+        | Q(listing_id__in=ArchivedListing.objects.filter(
+            user=user).values('pk')),
+        date__gte=dates[0],
+    ).annotate(title=title).order_by('listing_id').values_list(
+            'listing_id', 'title', 'date', *EVENTS):
+        listing = listings.setdefault(
+            listing_id, {'id': listing_id, 'title': title, 'days': {}})
+        listing['days'][date] = counts
+    for listing in listings.values():
+        days_counts = listing.pop('days')
+        listing['series'] = [
+            {'date': date,
+             **dict(zip(EVENTS, days_counts.get(date, (0,) * len(EVENTS))))}
+            for date in dates
+        ]
+    return list(listings.values())
+
+
+def prune_listing_stats(days=None):
+    """
+    Delete daily listing stats older than ``days`` (defaults to
+    ANALYTICS_RETENTION_DAYS).
+
+    Returns:
+        int: Number of rows deleted.
+    """
+    days = settings.ANALYTICS_RETENTION_DAYS if days is None else days
+    cutoff = timezone.now().date() - timedelta(days=days)
+    deleted, _ = ListingDailyStats.objects.filter(date__lt=cutoff).delete()
+    return deleted
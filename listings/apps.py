@@ -1,6 +1,23 @@
+import atexit
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ListingsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "listings"
+
+    def ready(self):
+        # Register the change feed receivers
+        from . import changes  # noqa: F401
+        # and the category tree cache invalidation
+        from . import category_tree  # noqa: F401
+        # and the category counters of deleted listings
+        from . import counts  # noqa: F401
+
+        # Write the analytics events still counted in memory on exit;
+        # tests write them explicitly
+        if settings.ANALYTICS_FLUSH_INTERVAL is not None:
+            from .analytics import events
+            atexit.register(events.flush)
@@ -0,0 +1,99 @@
+"""
+The category tree: categories with their nested subcategories and
+active listing counters.
+
+The tree is built with two queries and cached twice: in the shared
+cache (CACHE_BACKEND) for CATEGORY_TREE_CACHE_TTL seconds, and in each
+process for CATEGORY_TREE_LOCAL_TTL seconds on top of it. Once a save
+or delete of a category or subcategory is committed, both caches are
+cleared in the process that made it, and the shared cache for the
+others; their own copies expire within the local TTL. Counter updates
+do not clear the caches, so the listing counts are refreshed when the
+shared copy expires.
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from locallisting.metrics import record_cache_lookup
+from .models import Category, Subcategory
+
+CACHE_KEY = 'listings:category-tree'
+
+_local_lock = threading.Lock()
+# (expiry time on the monotonic clock, (etag, tree))
+_local_tree = None
+
+
+def build_category_tree():
+    """
+    Return the categories, by name, with their subcategories and
+    active listing counts.
+    """
+    subcategories = {}
+    for subcategory in Subcategory.objects.order_by('name').values(
+            'id', 'name', 'category_id', 'active_listings'):
+        subcategories.setdefault(subcategory.pop('category_id'), []).append(
+            subcategory)
+    return [
+        {**category, 'subcategories': subcategories.get(category['id'], [])}
+        for category in Category.objects.order_by('name').values(
+            'id', 'name', 'active_listings')
+    ]
+
+
+def get_category_tree():
+    """
+    Return the category tree and its ETag, from the process or shared
+    cache when they have it.
+
+    Returns:
+        tuple: The ETag and the tree.
+    """
+    global _local_tree
+    now = time.monotonic()
+    local = _local_tree
+    if local is not None and local[0] > now:
+        record_cache_lookup('category_tree_local', True)
+        return local[1]
+    record_cache_lookup('category_tree_local', False)
+
+    cached = cache.get(CACHE_KEY)
+    record_cache_lookup('category_tree', cached is not None)
+    if cached is None:
+        tree = build_category_tree()
+        content = json.dumps(tree, cls=DjangoJSONEncoder, sort_keys=True)
+        etag = '"%s"' % hashlib.md5(content.encode()).hexdigest()
+        cached = (etag, tree)
+        cache.set(CACHE_KEY, cached, settings.CATEGORY_TREE_CACHE_TTL)
+    with _local_lock:
+        _local_tree = (now + settings.CATEGORY_TREE_LOCAL_TTL, cached)
+    return cached
+
+
+def clear_category_tree():
+    """Drop the cached category tree."""
+    global _local_tree
+    with _local_lock:
+        _local_tree = None
+    cache.delete(CACHE_KEY)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Subcategory)
+@receiver(post_delete, sender=Subcategory)
+def clear_category_tree_on_change(sender, raw=False, **kwargs):
+    # Cleared once the change is committed; clearing it before would let
+    # another process cache the tree as it was before the change
+    if not raw:
+        transaction.on_commit(clear_category_tree)
@@ -0,0 +1,31 @@
+"""
+Record listing changes for the incremental change feed.
+
+Saving or deleting a listing, or adding or removing one of its images,
+moves the listing to the end of the feed. Bulk updates bypass these
+signals, so code updating listings with ``QuerySet.update()`` calls
+``ListingChange.objects.record()`` itself.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Listing, ListingChange, ListingImage
+
+
+@receiver(post_save, sender=Listing)
+def record_saved_listing(sender, instance, raw=False, **kwargs):
+    if not raw:
+        ListingChange.objects.record([instance.pk])
+
+
+@receiver(post_delete, sender=Listing)
+def record_deleted_listing(sender, instance, **kwargs):
+    ListingChange.objects.record([instance.pk], deleted=True)
+
+
+@receiver(post_save, sender=ListingImage)
+@receiver(post_delete, sender=ListingImage)
+def record_image_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        ListingChange.objects.record([instance.listing_id])
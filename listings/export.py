@@ -0,0 +1,109 @@
+"""
+Bulk export of listings as NDJSON or CSV.
+
+Listings are read with ``QuerySet.iterator()``, which uses a server-side
+cursor on PostgreSQL, and written out chunk by chunk, so an export of the
+whole catalog runs in constant memory. Each chunk costs two queries: the
+listings joined to their user, category and subcategory, and their
+images.
+"""
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import ListingImage
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Listing values read from the database, with the export column names
+EXPORT_COLUMNS = {
+    'id': 'id',
+    'title': 'title',
+    'description': 'description',
+    'user__username': 'user',
+    'listing_type': 'listing_type',
+    'category__name': 'category',
+    'subcategory__name': 'subcategory',
+    'price': 'price',
+    'price_type': 'price_type',
+    'condition': 'condition',
+    'delivery_option': 'delivery_option',
+    'location': 'location',
+    'event_date': 'event_date',
+    'expires_at': 'expires_at',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    'status': 'status',
+    'is_active': 'is_active',
+    'view_count': 'view_count',
+    'favorite_count': 'favorite_count',
+}
+EXPORT_FIELDS = list(EXPORT_COLUMNS.values()) + ['images']
+
+
+class _Echo:
+    """File-like object returning what is written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _iter_chunks(queryset, chunk_size):
+    """
+    Yield lists of export rows of up to ``chunk_size`` listings, with
+    the image URLs of each listing.
+    """
+    rows = queryset.order_by('pk').values_list(*EXPORT_COLUMNS)
+    chunk = []
+    for values in rows.iterator(chunk_size=chunk_size):
+        chunk.append(dict(zip(EXPORT_COLUMNS.values(), values)))
+        if len(chunk) == chunk_size:
+            yield _add_images(chunk)
+            chunk = []
+    if chunk:
+        yield _add_images(chunk)
+
+
+def _add_images(chunk):
+    """Add the image URLs of each listing to the rows of ``chunk``."""
+    images = {}
+    for listing_id, image in ListingImage.objects.filter(
+        listing_id__in=[row['id'] for row in chunk]
+    ).order_by('pk').values_list('listing_id', 'image'):
+        images.setdefault(listing_id, []).append(image.url)
+    for row in chunk:
+        row['images'] = images.get(row['id'], [])
+    return chunk
+
+
+def export_listings(queryset, export_format='ndjson', chunk_size=2000):
+    """
+    Export listings as NDJSON or CSV.
+
+    Args:
+        queryset (QuerySet): Listings to export, e.g. filtered with
+            ListingFilter.
+        export_format (str): 'ndjson' or 'csv'. CSV rows list the image
+            URLs separated by spaces.
+        chunk_size (int): Number of listings fetched per query.
+
+    Yields:
+        str: The export, one chunk of listings at a time.
+    """
+    if export_format == 'csv':
+        writer = csv.DictWriter(_Echo(), fieldnames=EXPORT_FIELDS)
+        yield writer.writeheader()
+        for chunk in _iter_chunks(queryset, chunk_size):
+            yield ''.join(
+                writer.writerow({**row, 'images': ' '.join(row['images'])})
+                for row in chunk)
+    else:
+        for chunk in _iter_chunks(queryset, chunk_size):
+            yield ''.join(
+                json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+                for row in chunk)
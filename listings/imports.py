@@ -0,0 +1,274 @@
+"""
+Bulk creation and update of a seller's listings.
+
+Rows are validated with the ListingSerializer rules, with the category
+and subcategory given by name and resolved from an in-memory lookup, so
+validating a batch costs no queries per row. Valid rows are written
+with one bulk insert and one bulk update, the images are queued for
+Cloudinary to fetch in the background, and the seller's profile counts
+are recomputed once per batch.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from profiles.tasks import update_listing_counts
+from .models import (
+    Category, Listing, ListingChange, Subcategory, adjust_active_listings
+)
+from .serializers import ListingSerializer
+from .tasks import (
+    import_listing_image, match_saved_searches, refresh_similar_listings
+)
+
+
+class CategoryLookup:
+    """
+    Category and subcategory ids by case-insensitive name, and the
+    category of each subcategory, read with one query each.
+    """
+
+    def __init__(self):
+        self.categories = {
+            name.lower(): pk
+            for pk, name in Category.objects.values_list('pk', 'name')
+        }
+        self.subcategories = {}
+        self.subcategory_categories = {}
+        for pk, category_id, name in Subcategory.objects.values_list(
+                'pk', 'category_id', 'name'):
+            self.subcategories[(category_id, name.lower())] = pk
+            self.subcategory_categories[pk] = category_id
+
+
+class ListingImportSerializer(ListingSerializer):
+    """
+    Serializer validating one imported listing.
+
+    Applies the ListingSerializer rules; ``category`` and
+    ``subcategory`` are names resolved with the CategoryLookup in the
+    ``lookup`` context entry; a subcategory is looked up in the
+    category given with it. A row with an ``id`` updates that listing,
+    which is validated as the serializer's instance with only the
+    fields the row gives; a missing category or subcategory is the
+    listing's own.
+    """
+    # Fields of the ListingSerializer rules, which a partial row is
+    # checked with against the stored listing
+    RULE_FIELDS = ('listing_type', 'price', 'price_type', 'condition',
+                   'event_date')
+    id = serializers.IntegerField(required=False)
+    category = serializers.CharField(required=False, allow_blank=True)
+    subcategory = serializers.CharField(required=False, allow_blank=True)
+    image_urls = serializers.ListField(
+        child=serializers.URLField(), required=False, max_length=10)
+
+    # Output-only fields of ListingSerializer
+    images = None
+    category_name = None
+    subcategory_name = None
+    user = None
+    is_favorited = None
+    has_conversation = None
+
+    class Meta(ListingSerializer.Meta):
+        fields = [
+            'id', 'title', 'description', 'listing_type', 'category',
+            'subcategory', 'price', 'price_type', 'condition',
+            'delivery_option', 'location', 'event_date', 'status',
+            'image_urls',
+        ]
+        read_only_fields = []
+
+    def validate(self, data):
+        """
+        Apply the listing rules and replace the category and subcategory
+        names with their ids.
+        """
+        if self.instance is None:
+            data = super().validate(data)
+        else:
+            stored = {field: getattr(self.instance, field)
+                      for field in self.RULE_FIELDS if field not in data}
+            # Only the fields the rules changed are added to the row
+            data = {
+                field: value for field, value
+                in super().validate({**stored, **data}).items()
+                if field not in stored or value != stored[field]
+            }
+        if 'category' not in data and 'subcategory' not in data:
+            return data
+        lookup = self.context['lookup']
+        updating = self.instance is not None
+        category_given = 'category' in data
+        subcategory_given = 'subcategory' in data
+        category_name = data.pop('category', '').strip()
+        subcategory_name = data.pop('subcategory', '').strip()
+
+        category_id = None
+        if updating and not category_given:
+            category_id = self.instance.category_id
+        elif category_name:
+            category_id = lookup.categories.get(category_name.lower())
+            if category_id is None:
+                raise serializers.ValidationError({
+                    'category': f"Unknown category {category_name!r}."
+                })
+        subcategory_id = None
+        if updating and not subcategory_given:
+            subcategory_id = self.instance.subcategory_id
+            belongs_to = lookup.subcategory_categories.get(subcategory_id)
+            if subcategory_id is not None and belongs_to != category_id:
+                raise serializers.ValidationError({
+                    'subcategory': (
+                        "The listing's subcategory does not belong to "
+                        "this category."
+                    )
+                })
+        elif subcategory_name:
+            subcategory_id = lookup.subcategories.get(
+                (category_id, subcategory_name.lower()))
+            if subcategory_id is None:
+                raise serializers.ValidationError({
+                    'subcategory': (
+                        f"Unknown subcategory {subcategory_name!r} "
+                        "for this category."
+                    )
+                })
+        data['category_id'] = category_id
+        data['subcategory_id'] = subcategory_id
+        return data
+
+
+def get_row_id(row):
+    """Return the listing id of a row, or None if it has no valid one."""
+    try:
+        return int(row['id'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def validate_rows(rows, lookup=None, existing=None):
+    """
+    Validate listing rows.
+
+    Rows with an ``id`` are validated partially against that listing;
+    a listing can be updated by one row only.
+
+    Args:
+        rows (list): Listing data dicts.
+        lookup (CategoryLookup): Category names; read if not given.
+        existing (dict): The listings rows may update, by id.
+
+    Returns:
+        tuple: The validated data by row index, and the errors by row
+        index.
+    """
+    lookup = lookup or CategoryLookup()
+    existing = existing or {}
+    valid, errors = {}, {}
+    updated = set()
+    for index, row in enumerate(rows):
+        row_id = get_row_id(row)
+        instance = existing.get(row_id)
+        if row_id is not None and instance is None:
+            errors[index] = {'id': ["Listing not found."]}
+            continue
+        if row_id in updated:
+            errors[index] = {'id': ["Listing is updated by another row."]}
+            continue
+        if row_id is not None:
+            updated.add(row_id)
+        serializer = ListingImportSerializer(
+            instance, data=row, partial=instance is not None,
+            context={'lookup': lookup})
+        if serializer.is_valid():
+            valid[index] = serializer.validated_data
+        else:
+            errors[index] = serializer.errors
+    return valid, errors
+
+
+def import_listings(user, rows, skip_invalid=False, lookup=None,
+                    batch_size=None):
+    """
+    Create and update listings of ``user`` in bulk.
+
+    Rows without an ``id`` create listings; rows with one replace the
+    fields they give of that listing, which must be the user's. Unless
+    ``skip_invalid`` is set, nothing is written if any row is invalid.
+
+    Args:
+        user (User): The seller.
+        rows (list): Listing data dicts, with optional ``image_urls``.
+        skip_invalid (bool): Import the valid rows when others are not.
+        lookup (CategoryLookup): Category names, shared across batches.
+        batch_size (int): Rows per insert statement; defaults to
+            LISTING_IMPORT_BATCH_SIZE.
+
+    Returns:
+        dict: The ``created`` and ``updated`` listing ids, in row order,
+        and the ``errors`` by row index.
+    """
+    batch_size = batch_size or settings.LISTING_IMPORT_BATCH_SIZE
+    update_ids = {get_row_id(row) for row in rows} - {None}
+    existing = Listing.objects.filter(
+        user=user, pk__in=update_ids).in_bulk() if update_ids else {}
+    valid, errors = validate_rows(rows, lookup, existing)
+
+    result = {'created': [], 'updated': [], 'errors': errors}
+    if not valid or (errors and not skip_invalid):
+        return result
+
+    now = timezone.now()
+    new_listings, updated_listings, image_urls = [], [], []
+    removed, added = [], []
+    update_fields = {'status', 'is_active', 'expires_at', 'updated_at'}
+    for data in valid.values():
+        data = dict(data)
+        urls = data.pop('image_urls', [])
+        listing_id = data.pop('id', None)
+        if listing_id is None:
+            listing = Listing(user=user, **data)
+            new_listings.append(listing)
+        else:
+            listing = existing[listing_id]
+            if listing.is_active:
+                removed.append(listing.get_counted_as())
+            if 'status' in data:
+                listing.set_status(data.pop('status'))
+            for field, value in data.items():
+                setattr(listing, field, value)
+            listing.updated_at = now
+            update_fields.update(data)
+            updated_listings.append(listing)
+        listing.update_derived_fields(now)
+        if listing.is_active:
+            added.append(listing.get_counted_as())
+        image_urls.append((listing, urls))
+
+    with transaction.atomic():
+        # Primary keys are set on the new listings on PostgreSQL and
+        # SQLite, which support RETURNING
+        Listing.objects.bulk_create(new_listings, batch_size=batch_size)
+        if updated_listings:
+            Listing.objects.bulk_update(
+                updated_listings, sorted(update_fields),
+                batch_size=batch_size)
+        result['created'] = [listing.pk for listing in new_listings]
+        result['updated'] = [listing.pk for listing in updated_listings]
+        ListingChange.objects.record(result['created'] + result['updated'])
+        adjust_active_listings(removed=removed, added=added)
+
+        import_listing_image.enqueue_many([
+            {'listing_id': listing.pk, 'url': url}
+            for listing, urls in image_urls for url in urls
+        ])
+        update_listing_counts.enqueue(user_id=user.pk)
+        refresh_similar_listings.enqueue(
+            listing_ids=result['created'] + result['updated'])
+        if result['created']:
+            match_saved_searches.enqueue(listing_ids=result['created'])
+    return result
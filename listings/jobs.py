@@ -0,0 +1,141 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from profiles.models import Profile
+from taskqueue.batching import DEFAULT_BATCH_SIZE
+from .models import (
+    ArchivedListing, Listing, ListingChange, ListingImage,
+    PendingImageUpload, adjust_active_listings
+)
+from .serializers import ListingImageSerializer
+
+# Statuses of listings that can no longer become active by themselves
+CLOSED_STATUSES = ['sold', 'expired', 'cancelled']
+
+
+def expire_listings(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Move active listings past their expiry date to ``expired``.
+
+    Listings are expired in batches read from the partial expiry index,
+    each in its own short transaction with a single bulk update. The
+    active listing counts of the sellers' profiles and of the
+    categories are decremented in the same transaction, so they stay
+    consistent.
+
+    Returns:
+        int: Number of listings expired.
+    """
+    expired = 0
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                Listing.objects.select_for_update(skip_locked=True)
+                .filter(is_active=True, expires_at__lte=now)
+                .order_by('expires_at')
+                .values_list('pk', 'user_id', 'category_id',
+                             'subcategory_id')[:batch_size]
+            )
+            if not rows:
+                return expired
+            ids = [pk for pk, _, _, _ in rows]
+            Listing.objects.filter(pk__in=ids).update(
+                status='expired', is_active=False, updated_at=now)
+            ListingChange.objects.record(ids)
+            _decrement_active_listings(
+                Counter(user_id for _, user_id, _, _ in rows))
+            adjust_active_listings(removed=[
+                (category_id, subcategory_id)
+                for _, _, category_id, subcategory_id in rows])
+        expired += len(rows)
+
+
+def _decrement_active_listings(counts):
+    """
+    Decrement the active listing counts of profiles.
+
+    Args:
+        counts (Counter): Number of deactivated listings by user id.
+    """
+    users_by_count = {}
+    for user_id, count in counts.items():
+        users_by_count.setdefault(count, []).append(user_id)
+    for count, user_ids in users_by_count.items():
+        Profile.objects.filter(user_id__in=user_ids).update(
+            active_listings=Greatest(F('active_listings') - count, Value(0)))
+
+
+def get_archivable_listings(older_than=None):
+    """
+    Return closed listings unchanged for ``older_than`` days (defaults
+    to LISTING_ARCHIVE_AFTER_DAYS).
+
+    Listings with conversations are kept, since conversations refer to
+    their listing.
+    """
+    days = settings.LISTING_ARCHIVE_AFTER_DAYS if older_than is None \
+        else older_than
+    cutoff = timezone.now() - timedelta(days=days)
+    return Listing.objects.filter(
+        is_active=False, status__in=CLOSED_STATUSES,
+        updated_at__lt=cutoff, conversations__isnull=True,
+    )
+
+
+def archive_listings(older_than=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Move idle closed listings into the ArchivedListing table.
+
+    Each batch is copied with a bulk insert and deleted from the
+    listings table in one short transaction. The images are kept as a
+    snapshot; their files stay on Cloudinary. Their daily stats are
+    kept for the seller's analytics; favorites, trending scores and
+    pending saved search matches are dropped.
+
+    Returns:
+        int: Number of listings archived.
+    """
+    archived = 0
+    queryset = get_archivable_listings(older_than).order_by('pk')
+    while True:
+        with transaction.atomic():
+            listings = list(
+                queryset.select_for_update(skip_locked=True, of=('self',))
+                [:batch_size])
+            if not listings:
+                return archived
+            images = {}
+            for image in ListingImage.objects.filter(
+                    listing__in=listings).order_by('pk'):
+                images.setdefault(image.listing_id, []).append(
+                    ListingImageSerializer(image).data)
+            ArchivedListing.objects.bulk_create([
+                ArchivedListing.from_listing(
+                    listing, images.get(listing.pk, []))
+                for listing in listings
+            ])
+            Listing.objects.filter(
+                pk__in=[listing.pk for listing in listings]).delete()
+        archived += len(listings)
+
+
+def prune_pending_uploads(days=None):
+    """
+    Delete image files whose upload kept failing for ``days`` days
+    (defaults to IMAGE_UPLOAD_RETENTION_DAYS).
+
+    Returns:
+        int: Number of files deleted.
+    """
+    days = settings.IMAGE_UPLOAD_RETENTION_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = PendingImageUpload.objects.filter(
+        created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+
+from listings.export import EXPORT_FORMATS, export_listings
+from listings.filters import ListingFilter
+from listings.models import Listing
+
+
+class Command(BaseCommand):
+    """
+    Export listings as NDJSON or CSV in constant memory.
+
+    Accepts the ListingFilter parameters of the listings API, e.g.
+    ``--filter category=3 --filter min_price=10``.
+    """
+    help = 'Export listings as NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', dest='export_format', default='ndjson',
+            choices=list(EXPORT_FORMATS), help='Output format.')
+        parser.add_argument(
+            '--output', help='File to write; defaults to stdout.')
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='NAME=VALUE',
+            help='ListingFilter parameter; may be repeated.')
+        parser.add_argument(
+            '--chunk-size', type=int,
+            default=settings.LISTING_EXPORT_CHUNK_SIZE,
+            help='Number of listings fetched per query.')
+
+    def handle(self, *args, **options):
+        params = QueryDict(mutable=True)
+        for item in options['filter']:
+            name, separator, value = item.partition('=')
+            if not separator:
+                raise CommandError(f"Filters must be NAME=VALUE: {item!r}")
+            params.appendlist(name, value)
+        filterset = ListingFilter(params, queryset=Listing.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(f"Invalid filters: {filterset.errors}")
+
+        chunks = export_listings(
+            filterset.qs, options['export_format'],
+            chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
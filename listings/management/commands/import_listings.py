@@ -0,0 +1,74 @@
+import csv
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from listings.imports import CategoryLookup, import_listings
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Import a seller's listings from a CSV file.
+
+    The columns are the fields of the bulk import API; categories are
+    given by name and ``image_urls`` lists image URLs separated by
+    spaces. Empty cells take the field's default. Rows are validated
+    and written in batches; unless ``--skip-invalid`` is given, an
+    invalid row rolls back the whole file.
+    """
+    help = 'Import listings from a CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import.')
+        parser.add_argument(
+            '--user', required=True, help='Email of the seller.')
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.LISTING_IMPORT_BATCH_SIZE,
+            help='Number of rows validated and written at once.')
+        parser.add_argument(
+            '--skip-invalid', action='store_true',
+            help='Import the valid rows and report the invalid ones.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['user']!r}")
+
+        lookup = CategoryLookup()
+        created = updated = invalid = 0
+        with open(options['path'], newline='') as csv_file, \
+                transaction.atomic():
+            rows = map(self.parse_row, csv.DictReader(csv_file))
+            # The header is line 1
+            line = 2
+            while batch := list(islice(rows, options['batch_size'])):
+                result = import_listings(
+                    user, batch, skip_invalid=options['skip_invalid'],
+                    lookup=lookup, batch_size=options['batch_size'])
+                for index, errors in sorted(result['errors'].items()):
+                    self.stderr.write(f"Line {line + index}: {errors}")
+                if result['errors'] and not options['skip_invalid']:
+                    raise CommandError("Invalid rows; nothing was imported")
+                created += len(result['created'])
+                updated += len(result['updated'])
+                invalid += len(result['errors'])
+                line += len(batch)
+
+        self.stdout.write(
+            f"Created {created}, updated {updated}, "
+            f"skipped {invalid} invalid listings.")
+
+    @staticmethod
+    def parse_row(row):
+        """Drop the empty cells of a CSV row and split its image URLs."""
+        row = {key: value for key, value in row.items() if key and value}
+        if 'image_urls' in row:
+            row['image_urls'] = row['image_urls'].split()
+        return row
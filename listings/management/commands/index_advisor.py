@@ -0,0 +1,109 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from listings.models import Listing
+from messaging.models import Conversation, Message
+from reviews.models import Review
+
+# Plan lines that mean a table is read without an index
+FULL_SCAN_PATTERNS = [
+    re.compile(r'Seq Scan on (\w+)'),              # PostgreSQL
+    re.compile(r'\bSCAN (\w+)(?! USING)(?:\s|$)'),  # SQLite
+]
+# Plan lines that mean rows are sorted after being read
+SORT_PATTERNS = [
+    re.compile(r'^\s*(?:->\s*)?Sort\b'),            # PostgreSQL
+    re.compile(r'USE TEMP B-TREE FOR ORDER BY'),   # SQLite
+]
+
+
+def get_representative_queries():
+    """
+    Return the hot query shapes of the API views, keyed by URL name.
+
+    Sample ids are taken from existing rows so the planner sees
+    realistic values; an empty database falls back to id 1.
+    """
+    listing = Listing.objects.only('id', 'user_id', 'category_id').first()
+    user_id = listing.user_id if listing else 1
+    category_id = (listing.category_id if listing else None) or 1
+    conversation_id = Conversation.objects.values_list(
+        'id', flat=True).first() or 1
+    feed = Listing.objects.order_by('-created_at')
+
+    return {
+        'listing-list': feed[:20],
+        'listing-list?category': feed.filter(category_id=category_id)[:20],
+        'listing-list?listing_type': feed.filter(
+            listing_type='item_sale')[:20],
+        'user-listings': Listing.objects.filter(
+            user_id=user_id, is_active=True).order_by('-created_at'),
+        'sitemap': Listing.objects.filter(
+            is_active=True).order_by('-created_at'),
+        'message-list-create': Message.objects.filter(
+            conversation_id=conversation_id),
+        # .count() drops the default ordering
+        'unread-message-count': Message.objects.filter(
+            conversation__participants=user_id, is_read=False
+        ).exclude(sender_id=user_id).order_by(),
+        'conversation-unread-counts': Message.objects.filter(
+            conversation__participants=user_id, is_read=False
+        ).exclude(sender_id=user_id).values('conversation').annotate(
+            unread_count=Count('id')).order_by(),
+        'review-list': Review.objects.filter(
+            reviewed_user_id=user_id).order_by('-created_at'),
+    }
+
+
+def analyze_plan(plan):
+    """
+    Return a list of index problems found in an EXPLAIN plan.
+    """
+    issues = []
+    for line in plan.splitlines():
+        for pattern in FULL_SCAN_PATTERNS:
+            match = pattern.search(line)
+            if match:
+                issues.append(f"full table scan on {match.group(1)}")
+        if any(pattern.search(line) for pattern in SORT_PATTERNS):
+            issues.append("sort without a matching index")
+    return issues
+
+
+class Command(BaseCommand):
+    """
+    Replay each view's representative queries under EXPLAIN and report
+    those that do not use an index.
+
+    Run it against a database with realistic volumes; planners prefer
+    sequential scans on small tables.
+    """
+    help = 'Report hot API queries that are missing index usage.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--show-plans', action='store_true',
+            help='Print the full query plan for every query.')
+        parser.add_argument(
+            '--fail-on-issues', action='store_true',
+            help='Exit with an error if any query is missing an index.')
+
+    def handle(self, *args, **options):
+        problems = 0
+        for name, queryset in get_representative_queries().items():
+            plan = queryset.explain()
+            issues = analyze_plan(plan)
+            if issues:
+                problems += 1
+                self.stdout.write(self.style.WARNING(
+                    f"{name}: {', '.join(sorted(set(issues)))}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ok"))
+            if options['show_plans']:
+                self.stdout.write(plan + '\n')
+
+        if problems and options['fail_on_issues']:
+            raise CommandError(
+                f"{problems} query shape(s) are missing index usage.")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from listings.counts import reconcile_category_counts
+
+
+class Command(BaseCommand):
+    """
+    Recount the active listings of every category and subcategory.
+
+    The counters are maintained as listings change; this corrects those
+    that drifted, and also runs nightly as a scheduled job.
+    """
+    help = 'Correct the active listing counts of categories.'
+
+    def handle(self, *args, **options):
+        corrected = reconcile_category_counts()
+        self.stdout.write(f"Corrected {corrected} counter(s).")
@@ -0,0 +1,67 @@
+# Generated by Django 5.1 on 2026-10-19 06:14
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+# LISTING_LIFETIME_DAYS when this migration was written; later changes to
+# the setting must not change what it does
+LISTING_LIFETIME_DAYS = {
+    'item_sale': 60,
+    'item_free': 14,
+    'item_wanted': 30,
+    'service': 90,
+    'job': 45,
+    'housing': 30,
+    'event': 90,
+    'other': 60,
+}
+
+
+def set_expiry_dates(apps, schema_editor):
+    """
+    Give existing active listings the expiry date they would have had,
+    so the expiry job catches up on stale listings.
+    """
+    Listing = apps.get_model('listings', 'Listing')
+    active = Listing.objects.filter(is_active=True, expires_at__isnull=True)
+
+    def update(queryset, expires_at):
+        while True:
+            ids = list(queryset.values_list('pk', flat=True)[:BATCH_SIZE])
+            if not ids:
+                return
+            Listing.objects.filter(pk__in=ids).update(expires_at=expires_at)
+
+    update(active.filter(listing_type='event', event_date__isnull=False),
+           models.F('event_date'))
+    for listing_type, days in LISTING_LIFETIME_DAYS.items():
+        if days is not None:
+            update(active.filter(listing_type=listing_type),
+                   models.F('created_at') + timedelta(days=days))
+
+
+class Migration(migrations.Migration):
+    # Each batch of the backfill commits on its own, so the updated rows
+    # are not all locked until the end of the migration
+    atomic = False
+
+    dependencies = [
+        ('listings', '0007_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['expires_at'], name='listing_active_expires_idx'),
+        ),
+        migrations.RunPython(set_expiry_dates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1 on 2026-10-19 06:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0008_listing_expiry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedListing',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('listing_type', models.CharField(choices=[('item_sale', 'Item for Sale'), ('item_free', 'Free Item'), ('item_wanted', 'Item Wanted'), ('service', 'Service'), ('job', 'Job'), ('housing', 'Housing'), ('event', 'Event'), ('other', 'Other')], max_length=30)),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('price_type', models.CharField(choices=[('fixed', 'Fixed Price'), ('negotiable', 'Negotiable'), ('free', 'Free'), ('contact', 'Contact for Price'), ('na', 'Not Applicable')], max_length=20)),
+                ('condition', models.CharField(blank=True, choices=[('new', 'New'), ('like_new', 'Like New'), ('good', 'Good'), ('fair', 'Fair'), ('poor', 'Poor'), ('na', 'Not Applicable')], max_length=20, null=True)),
+                ('delivery_option', models.CharField(choices=[('pickup', 'Pickup Only'), ('delivery', 'Delivery Available'), ('both', 'Pickup or Delivery'), ('na', 'Not Applicable')], max_length=20)),
+                ('location', models.CharField(blank=True, max_length=255)),
+                ('event_date', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('active', 'Active'), ('pending', 'Pending'), ('sold', 'Sold'), ('expired', 'Expired'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('view_count', models.PositiveIntegerField(default=0)),
+                ('favorite_count', models.PositiveIntegerField(default=0)),
+                ('images', models.JSONField(blank=True, default=list)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['updated_at'], name='listing_inactive_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedlisting',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_listings', to='listings.category'),
+        ),
+        migrations.AddField(
+            model_name='archivedlisting',
+            name='subcategory',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_listings', to='listings.subcategory'),
+        ),
+        migrations.AddField(
+            model_name='archivedlisting',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_listings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedlisting',
+            index=models.Index(fields=['user', '-created_at'], name='archived_listing_user_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1 on 2026-10-19 06:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def add_existing_listings(apps, schema_editor):
+    """
+    Put every existing listing in the change feed, in id order, so a
+    first sync from the start of the feed sees all of them.
+    """
+    Listing = apps.get_model('listings', 'Listing')
+    ListingChange = apps.get_model('listings', 'ListingChange')
+    last_id = 0
+    while True:
+        rows = list(
+            Listing.objects.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', 'updated_at')[:BATCH_SIZE])
+        if not rows:
+            return
+        ListingChange.objects.bulk_create([
+            ListingChange(listing_id=pk, changed_at=updated_at)
+            for pk, updated_at in rows
+        ])
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0009_archived_listing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('listing_id', models.BigIntegerField(unique=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(
+            add_existing_listings, migrations.RunPython.noop),
+    ]
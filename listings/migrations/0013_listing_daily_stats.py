@@ -0,0 +1,29 @@
+# Generated by Django 5.1 on 2026-10-19 06:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0012_trending_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('favorites', models.PositiveIntegerField(default=0)),
+                ('contacts', models.PositiveIntegerField(default=0)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='listings.listing')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='listing_daily_stats_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('listing', 'date'), name='listing_daily_stats_unique')],
+            },
+        ),
+    ]
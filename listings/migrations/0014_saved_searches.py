@@ -0,0 +1,59 @@
+# Generated by Django 5.1 on 2026-10-19 06:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_listing_daily_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('search', models.CharField(blank=True, max_length=200)),
+                ('listing_type', models.CharField(blank=True, choices=[('item_sale', 'Item for Sale'), ('item_free', 'Free Item'), ('item_wanted', 'Item Wanted'), ('service', 'Service'), ('job', 'Job'), ('housing', 'Housing'), ('event', 'Event'), ('other', 'Other')], max_length=30)),
+                ('condition', models.CharField(blank=True, choices=[('new', 'New'), ('like_new', 'Like New'), ('good', 'Good'), ('fair', 'Fair'), ('poor', 'Poor'), ('na', 'Not Applicable')], max_length=20)),
+                ('delivery_option', models.CharField(blank=True, choices=[('pickup', 'Pickup Only'), ('delivery', 'Delivery Available'), ('both', 'Pickup or Delivery'), ('na', 'Not Applicable')], max_length=20)),
+                ('location', models.CharField(blank=True, max_length=255)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to='listings.category')),
+                ('subcategory', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to='listings.subcategory')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SavedSearchKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category_id', models.BigIntegerField(blank=True, null=True)),
+                ('listing_type', models.CharField(blank=True, max_length=30)),
+                ('price_bucket', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keys', to='listings.savedsearch')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category_id', 'listing_type', 'price_bucket'], name='saved_search_key_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_search_matches', to='listings.listing')),
+                ('search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_matches', to='listings.savedsearch')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('search', 'listing'), name='saved_search_match_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1 on 2026-10-19 07:00
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_active_listings(apps, schema_editor):
+    """Set the counters from the existing active listings."""
+    Listing = apps.get_model('listings', 'Listing')
+    for model_name, field in (('Category', 'category'),
+                              ('Subcategory', 'subcategory')):
+        model = apps.get_model('listings', model_name)
+        counts = (
+            Listing.objects.filter(
+                is_active=True, **{field: models.OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(count=models.Count('pk')).values('count')
+        )
+        model.objects.update(active_listings=Coalesce(
+            models.Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0014_saved_searches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='active_listings',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='subcategory',
+            name='active_listings',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_active_listings, migrations.RunPython.noop),
+    ]
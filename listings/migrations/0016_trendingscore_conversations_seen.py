@@ -0,0 +1,35 @@
+# Generated by Django 5.1 on 2026-10-19 07:46
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def set_conversations_seen(apps, schema_editor):
+    """
+    Mark the conversations of existing scores as counted, as the
+    previous update job already added them.
+    """
+    Conversation = apps.get_model('messaging', 'Conversation')
+    TrendingScore = apps.get_model('listings', 'TrendingScore')
+    TrendingScore.objects.update(conversations_seen=Coalesce(Subquery(
+        Conversation.objects.filter(listing=OuterRef('listing_id'))
+        .values('listing').annotate(count=Count('pk')).values('count')
+    ), 0))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0015_category_listing_counts'),
+        ('messaging', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trendingscore',
+            name='conversations_seen',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(
+            set_conversations_seen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1 on 2026-10-19 07:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0016_trendingscore_conversations_seen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingImageUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('content', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_uploads', to='listings.listing')),
+            ],
+        ),
+    ]
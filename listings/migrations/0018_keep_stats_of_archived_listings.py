@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-19 07:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0017_pending_image_uploads'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='listingdailystats',
+            name='listing',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='daily_stats', to='listings.listing'),
+        ),
+    ]
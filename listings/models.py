@@ -1,14 +1,47 @@
-from django.db import models
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
 from django.conf import settings
+from django.utils import timezone
 from cloudinary.models import CloudinaryField
 
 
-class Category(models.Model):
+class ActiveListingCounter(models.Model):
+    """
+    Abstract model with a counter of active listings, maintained by
+    adjust_active_listings().
+
+    Attributes:
+        active_listings (int): Number of active listings.
+    """
+    active_listings = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        """
+        Save the instance without its counter, so saving an instance
+        read before the counter last changed does not undo the change.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'active_listings'
+            ]
+        super().save(*args, **kwargs)
+
+
+class Category(ActiveListingCounter):
     """
     Model representing a category of listings.
 
     Attributes:
         name (str): The name of the category, unique for each category.
+        active_listings (int): Number of active listings in the category.
     """
     name = models.CharField(max_length=100, unique=True)
 
@@ -16,13 +49,15 @@ class Category(models.Model):
         return self.name
 
 
-class Subcategory(models.Model):
+class Subcategory(ActiveListingCounter):
     """
     Model representing a subcategory under a specific category.
 
     Attributes:
         name (str): The name of the subcategory.
         category (Category): The category to which this subcategory belongs.
+        active_listings (int): Number of active listings in the
+            subcategory.
     """
     name = models.CharField(max_length=100)
     category = models.ForeignKey(
@@ -36,6 +71,36 @@ class Subcategory(models.Model):
         return f"{self.category.name} - {self.name}"
 
 
+def adjust_active_listings(removed=(), added=()):
+    """
+    Update the active listing counters of categories and subcategories.
+
+    Listings are given as their (category id, subcategory id) pair.
+    Counters are updated in place with one query per model and change
+    amount, so concurrent writers do not overwrite each other; call
+    this in the transaction that activates or deactivates the listings.
+
+    Args:
+        removed (iterable): Listings that stopped counting as active.
+        added (iterable): Listings that started counting as active.
+    """
+    changes = {Category: Counter(), Subcategory: Counter()}
+    for step, listings in ((-1, removed), (1, added)):
+        for category_id, subcategory_id in listings:
+            changes[Category][category_id] += step
+            changes[Subcategory][subcategory_id] += step
+    for model, counts in changes.items():
+        # Listings without a category or subcategory
+        counts.pop(None, None)
+        ids_by_change = {}
+        for pk, change in sorted(counts.items()):
+            if change:
+                ids_by_change.setdefault(change, []).append(pk)
+        for change, ids in ids_by_change.items():
+            model.objects.filter(pk__in=ids).update(active_listings=Greatest(
+                F('active_listings') + change, Value(0)))
+
+
 class Listing(models.Model):
     """
     Model representing a listing for sale, wanted, or other types.
@@ -53,6 +118,7 @@ class Listing(models.Model):
         delivery_option (str): The delivery option available.
         location (str): The location of the listing.
         event_date (datetime): The date for events, if applicable.
+        expires_at (datetime): When the active listing expires.
         created_at (datetime): Timestamp when the listing was created.
         updated_at (datetime): Timestamp when the listing was last updated.
         is_active (bool): Indicates if the listing is active.
@@ -137,6 +203,7 @@ class Listing(models.Model):
 
     location = models.CharField(max_length=255, blank=True)
     event_date = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -150,12 +217,145 @@ class Listing(models.Model):
         related_name='favorite_listings',
         blank=True)
 
+    class Meta:
+        indexes = [
+            # Default feed ordering and its common filters
+            models.Index(fields=['-created_at'],
+                         name='listing_created_idx'),
+            models.Index(fields=['category', '-created_at'],
+                         name='listing_category_created_idx'),
+            models.Index(fields=['listing_type', '-created_at'],
+                         name='listing_type_created_idx'),
+            # Active-only listings (sitemap, public profiles)
+            models.Index(fields=['user', '-created_at'],
+                         condition=models.Q(is_active=True),
+                         name='listing_active_user_idx'),
+            models.Index(fields=['-created_at'],
+                         condition=models.Q(is_active=True),
+                         name='listing_active_created_idx'),
+            # Expiry job: the active listings due to expire
+            models.Index(fields=['expires_at'],
+                         condition=models.Q(is_active=True),
+                         name='listing_active_expires_idx'),
+            # Archive job: closed listings by last change
+            models.Index(fields=['updated_at'],
+                         condition=models.Q(is_active=False),
+                         name='listing_inactive_updated_idx'),
+        ]
+
+    # Fields deciding where a listing counts as active
+    COUNTED_FIELDS = {'is_active', 'category_id', 'subcategory_id'}
+    # Fields the expiry date is derived from
+    EXPIRY_FIELDS = {'listing_type', 'event_date'}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember where the loaded listing counts as active, and what its
+        expiry date was derived from.
+        """
+        instance = super().from_db(db, field_names, values)
+        deferred = instance.get_deferred_fields()
+        if not cls.COUNTED_FIELDS & deferred:
+            instance._counted_as = instance.get_counted_as()
+        if not cls.EXPIRY_FIELDS & deferred:
+            instance._expiry_basis = (
+                instance.listing_type, instance.event_date)
+        return instance
+
+    def get_counted_as(self):
+        """
+        Return the (category id, subcategory id) the listing counts
+        under as active, or None if it is not active.
+        """
+        if not self.is_active:
+            return None
+        return self.category_id, self.subcategory_id
+
     def save(self, *args, **kwargs):
         """
-        Override save method to set is_active based on status.
+        Override save method to set is_active based on status, and the
+        expiry date of active listings that have none.
+
+        The active listing counters of the categories are updated in
+        the same transaction.
+        """
+        self.update_derived_fields()
+        current = self.get_counted_as()
+        with transaction.atomic(savepoint=False):
+            if self._state.adding:
+                previous = None
+            elif getattr(self, '_counted_as', self) != current:
+                # The counters change, or the listing was loaded without
+                # the counted fields: read where it counts with its row
+                # locked, so a concurrent save cannot move the counters
+                # from the same state
+                row = Listing.objects.select_for_update().filter(
+                    pk=self.pk).values_list(
+                        'is_active', 'category_id', 'subcategory_id').first()
+                previous = row[1:] if row and row[0] else None
+            else:
+                previous = current
+            super().save(*args, **kwargs)
+            if previous != current:
+                adjust_active_listings(
+                    removed=[previous] if previous else [],
+                    added=[current] if current else [])
+        self._counted_as = current
+        self._expiry_basis = (self.listing_type, self.event_date)
+
+    def update_derived_fields(self, now=None):
+        """
+        Set is_active from the status, and the expiry date of an active
+        listing that has none or whose type or event date changed since
+        it was loaded.
+
+        Called by save(); bulk writes, which bypass save(), call it
+        themselves.
+
+        Args:
+            now (datetime): Activation time; defaults to now.
         """
         self.is_active = self.status == 'active'
-        super().save(*args, **kwargs)
+        basis = getattr(self, '_expiry_basis', None)
+        if basis is not None and basis != (self.listing_type,
+                                           self.event_date):
+            # Derived from the previous type or event date
+            self.expires_at = None
+        if self.is_active:
+            if self.listing_type == 'event' and self.event_date:
+                self.expires_at = self.event_date
+            elif self.expires_at is None:
+                self.expires_at = self.get_expiry_date(now)
+
+    def get_expiry_date(self, start=None):
+        """
+        Return when the listing expires if it is activated at ``start``.
+
+        Events with a date expire on that date; other listings after the
+        LISTING_LIFETIME_DAYS of their type.
+
+        Args:
+            start (datetime): Activation time; defaults to now.
+
+        Returns:
+            datetime: The expiry date, or None if the type never expires.
+        """
+        if self.listing_type == 'event' and self.event_date:
+            return self.event_date
+        days = settings.LISTING_LIFETIME_DAYS.get(self.listing_type)
+        if days is None:
+            return None
+        return (start or timezone.now()) + timedelta(days=days)
+
+    def set_status(self, status):
+        """
+        Change the status; a listing activated again gets a fresh
+        lifetime when saved.
+        """
+        if status == 'active' and self.status != 'active':
+            self.expires_at = None
+        self.status = status
 
     def update_favorite_count(self):
         """
@@ -185,3 +385,493 @@ class ListingImage(models.Model):
 
     def __str__(self):
         return f"Image for {self.listing.title}"
+
+
+class PendingImageUpload(models.Model):
+    """
+    An image file received with a request, kept until the task worker
+    has uploaded it to Cloudinary.
+
+    The upload task only carries the id of the row, keeping file
+    contents out of the task queue. Rows of uploads that keep failing
+    are deleted after IMAGE_UPLOAD_RETENTION_DAYS.
+
+    Attributes:
+        listing (Listing): The listing the image belongs to.
+        name (str): The original file name.
+        content_type (str): The MIME type of the file.
+        content (bytes): The file content.
+        created_at (datetime): When the file was received.
+    """
+    listing = models.ForeignKey(
+        Listing, related_name='pending_uploads', on_delete=models.CASCADE)
+    name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    content = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Pending upload {self.name} for listing {self.listing_id}"
+
+
+class ArchivedListing(models.Model):
+    """
+    A closed listing moved out of the listings table.
+
+    Sold, expired and cancelled listings are moved here once they have
+    been idle for LISTING_ARCHIVE_AFTER_DAYS, so the listings table and
+    its indexes only hold listings the feeds can still show. The row
+    keeps the listing's id and a snapshot of its images, and the seller
+    still sees it in their listing history. Fields not listed below are
+    copied from Listing.
+
+    Attributes:
+        id (int): The id the listing had.
+        images (list): Serialized images of the listing.
+        archived_at (datetime): When the listing was archived.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             related_name='archived_listings',
+                             on_delete=models.CASCADE)
+    listing_type = models.CharField(
+        max_length=30, choices=Listing.LISTING_TYPE_CHOICES)
+    category = models.ForeignKey(
+        Category, related_name='archived_listings',
+        on_delete=models.SET_NULL, null=True)
+    subcategory = models.ForeignKey(
+        Subcategory, related_name='archived_listings',
+        on_delete=models.SET_NULL, null=True, blank=True)
+    price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True)
+    price_type = models.CharField(
+        max_length=20, choices=Listing.PRICE_TYPE_CHOICES)
+    condition = models.CharField(
+        max_length=20, choices=Listing.CONDITION_CHOICES,
+        blank=True, null=True)
+    delivery_option = models.CharField(
+        max_length=20, choices=Listing.DELIVERY_CHOICES)
+    location = models.CharField(max_length=255, blank=True)
+    event_date = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    status = models.CharField(
+        max_length=20, choices=Listing.STATUS_CHOICES)
+    view_count = models.PositiveIntegerField(default=0)
+    favorite_count = models.PositiveIntegerField(default=0)
+    images = models.JSONField(default=list, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    # Fields copied as they are from the listing
+    COPIED_FIELDS = [
+        'id', 'title', 'description', 'user_id', 'listing_type',
+        'category_id', 'subcategory_id', 'price', 'price_type',
+        'condition', 'delivery_option', 'location', 'event_date',
+        'expires_at', 'created_at', 'updated_at', 'status', 'view_count',
+        'favorite_count',
+    ]
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'],
+                         name='archived_listing_user_idx'),
+        ]
+
+    @property
+    def is_active(self):
+        return False
+
+    @classmethod
+    def from_listing(cls, listing, images):
+        """
+        Build the archived copy of a listing.
+
+        Args:
+            listing (Listing): The listing to archive.
+            images (list): Serialized images of the listing.
+
+        Returns:
+            ArchivedListing: The unsaved archived listing.
+        """
+        return cls(
+            images=images,
+            **{field: getattr(listing, field) for field in cls.COPIED_FIELDS}
+        )
+
+    def __str__(self):
+        return f"{self.title} (archived)"
+
+
+class ListingChangeManager(models.Manager):
+    """
+    Manager recording listing changes in the change feed.
+    """
+    # Times a change is retried after losing to a concurrent one
+    RECORD_ATTEMPTS = 5
+
+    def record(self, listing_ids, deleted=False):
+        """
+        Move listings to the end of the change feed.
+
+        Each listing has at most one entry, its latest change, so the
+        feed stays as small as the listings table plus tombstones. The
+        entries are replaced, so they always get a new position and
+        this change's ``deleted`` flag.
+
+        Entries are written in the caller's transaction, so they commit
+        with the change, and get their position then. The feed holds
+        back entries younger than LISTING_CHANGES_DELAY until such
+        transactions commit; when a transaction commits later than
+        that, clients may already have passed its entries, so they are
+        moved to the end of the feed again once it has committed.
+
+        Args:
+            listing_ids (iterable): Ids of the changed listings.
+            deleted (bool): Whether the listings were deleted or archived.
+        """
+        # A listing given twice would conflict with itself on every try
+        listing_ids = list(dict.fromkeys(listing_ids))
+        if not listing_ids:
+            return
+        now = timezone.now()
+        self._replace(listing_ids, deleted, now)
+        if transaction.get_connection().in_atomic_block:
+            delay = timedelta(seconds=settings.LISTING_CHANGES_DELAY)
+
+            def move_after_commit():
+                if timezone.now() - now >= delay:
+                    self._replace(listing_ids, deleted, timezone.now())
+
+            transaction.on_commit(move_after_commit)
+
+    def _replace(self, listing_ids, deleted, now):
+        """Replace the entries of listings with new ones."""
+        with transaction.atomic(savepoint=False):
+            for attempt in range(self.RECORD_ATTEMPTS):
+                self.filter(listing_id__in=listing_ids).delete()
+                try:
+                    with transaction.atomic():
+                        self.bulk_create([
+                            self.model(listing_id=pk, deleted=deleted,
+                                       changed_at=now)
+                            for pk in listing_ids
+                        ])
+                    return
+                except IntegrityError:
+                    # A concurrent change of one of the listings inserted
+                    # its entry after the delete and has now committed;
+                    # the next delete sees and replaces it
+                    if attempt == self.RECORD_ATTEMPTS - 1:
+                        raise
+
+
+class ListingChange(models.Model):
+    """
+    The latest change of a listing, in the incremental change feed.
+
+    Attributes:
+        seq (int): Position in the feed; every change gets a higher one.
+        listing_id (int): The changed listing.
+        deleted (bool): Whether this is the tombstone of a deleted or
+            archived listing.
+        changed_at (datetime): When the change was recorded.
+    """
+    seq = models.BigAutoField(primary_key=True)
+    listing_id = models.BigIntegerField(unique=True)
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    objects = ListingChangeManager()
+
+    def __str__(self):
+        action = 'deleted' if self.deleted else 'changed'
+        return f"Listing {self.listing_id} {action} (#{self.seq})"
+
+
+class SimilarListing(models.Model):
+    """
+    One of the most similar active listings of a listing.
+
+    The table holds the top SIMILAR_LISTINGS_COUNT neighbors of each
+    active listing, by cosine similarity of their TF-IDF vectors; it is
+    rebuilt nightly and refreshed for listings created or edited since.
+
+    Attributes:
+        listing (Listing): The listing.
+        similar (Listing): A listing similar to it.
+        rank (int): Position of ``similar`` among the neighbors, from 0.
+        score (float): Cosine similarity of the two listings.
+    """
+    listing = models.ForeignKey(
+        Listing, related_name='similar_listings', on_delete=models.CASCADE)
+    similar = models.ForeignKey(
+        Listing, related_name='similar_to', on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['listing', 'rank'],
+                                    name='similar_listing_rank_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.similar_id} similar to {self.listing_id}"
+
+
+class TrendingScore(models.Model):
+    """
+    The time-decayed popularity of a listing.
+
+    Views, favorites and conversations add to the score, and each
+    contribution halves every TRENDING_HALF_LIFE_HOURS. The score is
+    stored as the base-2 logarithm of the decayed value scaled to a
+    fixed epoch, so scores never need rewriting as they decay and
+    ordering by the column orders by current popularity.
+
+    Attributes:
+        listing (Listing): The listing.
+        score (float): log2 of the popularity, scaled to the epoch.
+        views_seen (int): view_count when the score was last updated.
+        favorites_seen (int): favorite_count when the score was last
+            updated.
+        conversations_seen (int): Number of conversations when the score
+            was last updated.
+        updated_at (datetime): When the score was last updated.
+    """
+    listing = models.OneToOneField(
+        Listing, related_name='trending', on_delete=models.CASCADE,
+        primary_key=True)
+    score = models.FloatField()
+    views_seen = models.PositiveIntegerField(default=0)
+    favorites_seen = models.PositiveIntegerField(default=0)
+    conversations_seen = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='trending_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"Trending score of listing {self.listing_id}"
+
+
+class ListingDailyStats(models.Model):
+    """
+    Views, favorites and contacts of a listing on one day (UTC).
+
+    Events are counted in memory by the web processes and added to
+    these rows in batches; see listings.analytics. The rows outlive
+    their listing, so the stats of archived listings are kept until
+    ANALYTICS_RETENTION_DAYS; those of deleted listings are left to the
+    same pruning.
+
+    Attributes:
+        listing (Listing): The listing, or an ArchivedListing's id.
+        date (date): The day.
+        views (int): Number of times the listing was viewed.
+        favorites (int): Number of times it was added to favorites.
+        contacts (int): Number of conversations started about it.
+    """
+    listing = models.ForeignKey(
+        Listing, related_name='daily_stats', on_delete=models.DO_NOTHING,
+        db_constraint=False)
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    favorites = models.PositiveIntegerField(default=0)
+    contacts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['listing', 'date'],
+                                    name='listing_daily_stats_unique'),
+        ]
+        indexes = [
+            # Retention job
+            models.Index(fields=['date'], name='listing_daily_stats_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Listing {self.listing_id} on {self.date}"
+
+
+def price_bucket(price):
+    """
+    Return the price bucket of a price: 0 below 1, then one bucket per
+    power of two.
+    """
+    return int(price).bit_length()
+
+
+class SavedSearch(models.Model):
+    """
+    A listing search whose new matches the user is notified of.
+
+    The predicates mirror the ListingFilter parameters and the search
+    term of the listings endpoint; empty ones match any listing.
+
+    Attributes:
+        user (User): The user who saved the search.
+        name (str): A name for the search.
+        search (str): Text the title, description, category or
+            subcategory name must contain.
+        category (Category): Required category.
+        subcategory (Subcategory): Required subcategory.
+        listing_type (str): Required listing type.
+        condition (str): Required condition.
+        delivery_option (str): Required delivery option.
+        location (str): Text the location must contain.
+        min_price (Decimal): Minimum price.
+        max_price (Decimal): Maximum price.
+        created_at (datetime): When the search was saved.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             related_name='saved_searches',
+                             on_delete=models.CASCADE)
+    name = models.CharField(max_length=100, blank=True)
+    search = models.CharField(max_length=200, blank=True)
+    category = models.ForeignKey(
+        Category, related_name='saved_searches', on_delete=models.CASCADE,
+        null=True, blank=True)
+    subcategory = models.ForeignKey(
+        Subcategory, related_name='saved_searches',
+        on_delete=models.CASCADE, null=True, blank=True)
+    listing_type = models.CharField(
+        max_length=30, choices=Listing.LISTING_TYPE_CHOICES, blank=True)
+    condition = models.CharField(
+        max_length=20, choices=Listing.CONDITION_CHOICES, blank=True)
+    delivery_option = models.CharField(
+        max_length=20, choices=Listing.DELIVERY_CHOICES, blank=True)
+    location = models.CharField(max_length=255, blank=True)
+    min_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # Price ranges spanning more buckets are indexed under any price
+    MAX_PRICE_BUCKETS = 8
+
+    def get_price_buckets(self):
+        """
+        Return the price buckets the search can match, or [None] for
+        any price.
+        """
+        if self.max_price is None:
+            return [None]
+        low = price_bucket(self.min_price or 0)
+        high = price_bucket(self.max_price)
+        if high - low >= self.MAX_PRICE_BUCKETS:
+            return [None]
+        return list(range(low, high + 1))
+
+    def update_keys(self):
+        """Replace the reverse index entries of the search."""
+        self.keys.all().delete()
+        SavedSearchKey.objects.bulk_create([
+            SavedSearchKey(
+                search=self, category_id=self.category_id,
+                listing_type=self.listing_type, price_bucket=bucket)
+            for bucket in self.get_price_buckets()
+        ])
+
+    def matches(self, listing):
+        """
+        Check whether a listing matches every predicate of the search.
+
+        Args:
+            listing (Listing): The listing, with its category and
+                subcategory loaded.
+        """
+        for field in ('category_id', 'subcategory_id', 'listing_type',
+                      'condition', 'delivery_option'):
+            value = getattr(self, field)
+            if value and getattr(listing, field) != value:
+                return False
+        if self.location and \
+                self.location.lower() not in listing.location.lower():
+            return False
+        if self.min_price is not None or self.max_price is not None:
+            if listing.price is None:
+                return False
+            if self.min_price is not None and listing.price < self.min_price:
+                return False
+            if self.max_price is not None and listing.price > self.max_price:
+                return False
+        if self.search:
+            term = self.search.lower()
+            texts = [listing.title, listing.description]
+            if listing.category_id:
+                texts.append(listing.category.name)
+            if listing.subcategory_id:
+                texts.append(listing.subcategory.name)
+            if not any(term in text.lower() for text in texts):
+                return False
+        return True
+
+    def __str__(self):
+        return self.name or f"Saved search {self.pk}"
+
+
+class SavedSearchKey(models.Model):
+    """
+    An entry of the reverse index of saved searches.
+
+    Each saved search has one entry per price bucket it can match, with
+    its category and listing type; None, or '' for the listing type,
+    stands for any. A new listing is only checked against the searches
+    with an entry for its own category, type and price bucket, or for
+    any of them.
+
+    Attributes:
+        search (SavedSearch): The saved search.
+        category_id (int): The category of the search.
+        listing_type (str): The listing type of the search.
+        price_bucket (int): A price bucket the search can match.
+    """
+    search = models.ForeignKey(
+        SavedSearch, related_name='keys', on_delete=models.CASCADE)
+    category_id = models.BigIntegerField(null=True, blank=True)
+    listing_type = models.CharField(max_length=30, blank=True)
+    price_bucket = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['category_id', 'listing_type', 'price_bucket'],
+                name='saved_search_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"Key of saved search {self.search_id}"
+
+
+class SavedSearchMatch(models.Model):
+    """
+    A new listing matching a saved search, waiting to be notified.
+
+    Attributes:
+        search (SavedSearch): The saved search.
+        listing (Listing): The matching listing.
+        created_at (datetime): When the match was found.
+    """
+    search = models.ForeignKey(
+        SavedSearch, related_name='pending_matches',
+        on_delete=models.CASCADE)
+    listing = models.ForeignKey(
+        Listing, related_name='saved_search_matches',
+        on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['search', 'listing'],
+                                    name='saved_search_match_unique'),
+        ]
+
+    def __str__(self):
+        return f"Listing {self.listing_id} matches search {self.search_id}"
@@ -0,0 +1,190 @@
+"""
+Matching of new listings against saved searches, and their alerts.
+
+Rather than running every saved search against the listings table, a
+new listing looks up the searches that could match it in the reverse
+index of SavedSearchKey entries, by its category, listing type and
+price bucket, and only those are checked in full. Matches are queued
+as SavedSearchMatch rows and sent as one email per user by a scheduled
+job.
+"""
+
+from collections import defaultdict
+from textwrap import dedent
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Q
+from django.utils.html import escape
+
+from .models import (
+    Listing, SavedSearch, SavedSearchKey, SavedSearchMatch, price_bucket
+)
+
+
+def get_candidate_searches(category_id, listing_type, bucket):
+    """
+    Return the ids of the saved searches indexed under a category,
+    listing type and price bucket, or under any of them.
+    """
+    keys = SavedSearchKey.objects.filter(
+        Q(category_id=category_id) | Q(category_id__isnull=True),
+        Q(listing_type=listing_type) | Q(listing_type=''),
+    )
+    if bucket is None:
+        keys = keys.filter(price_bucket__isnull=True)
+    else:
+        keys = keys.filter(
+            Q(price_bucket=bucket) | Q(price_bucket__isnull=True))
+    return set(keys.values_list('search_id', flat=True))
+
+
+def match_listings(listing_ids):
+    """
+    Queue a match for each saved search the listings match.
+
+    The reverse index is read once per distinct category, listing type
+    and price bucket of the listings. Searches of a listing's seller
+    are skipped.
+
+    Args:
+        listing_ids (list): Ids of the new listings.
+
+    Returns:
+        int: Number of matches found.
+    """
+    listings = list(Listing.objects.filter(
+        pk__in=listing_ids, is_active=True).select_related(
+            'category', 'subcategory'))
+    by_key = defaultdict(list)
+    for listing in listings:
+        bucket = None if listing.price is None \
+            else price_bucket(listing.price)
+        by_key[listing.category_id, listing.listing_type, bucket].append(
+            listing)
+
+    candidates = {}
+    for key, key_listings in by_key.items():
+        search_ids = get_candidate_searches(*key)
+        for listing in key_listings:
+            candidates[listing] = search_ids
+    all_ids = set().union(*candidates.values())
+    if not all_ids:
+        return 0
+    searches = SavedSearch.objects.in_bulk(all_ids)
+
+    matches = [
+        SavedSearchMatch(search_id=search_id, listing=listing)
+        for listing, search_ids in candidates.items()
+        for search_id in sorted(search_ids)
+        if searches[search_id].user_id != listing.user_id
+        and searches[search_id].matches(listing)
+    ]
+    SavedSearchMatch.objects.bulk_create(matches, ignore_conflicts=True)
+    return len(matches)
+
+
+def build_alert_email(user, matches, connection=None):
+    """
+    Build the email listing new matches of a user's saved searches.
+
+    Args:
+        user: The owner of the saved searches.
+        matches (list): (search name, listing id, listing title) tuples.
+        connection: An open email backend connection to reuse.
+
+    Returns:
+        EmailMultiAlternatives: The email, ready to be sent.
+    """
+    count = len(matches)
+    subject = f'{count} new listing(s) match your saved searches - ' \
+        'Local Listing'
+    url = f"{settings.FRONTEND_URL}/listings"
+
+    lines = [f"- {title} ({name}): {url}/{listing_id}"
+             for name, listing_id, title in matches]
+    items = "".join(
+        f"<li><a href=\"{url}/{listing_id}\">{escape(title)}</a> "
+        f"({escape(name)})</li>"
+        for name, listing_id, title in matches
+    )
+
+    html_message = dedent(f"""
+    <!DOCTYPE html>
+    <html>
+    <body>
+        <h2>New Matches</h2>
+        <p>Hello {escape(user.username)},</p>
+        <p>{count} new listing(s) match your saved searches:</p>
+        <ul>{items}</ul>
+        <p>Thank you,<br>The Local Listing Team</p>
+    </body>
+    </html>
+    """)
+
+    plain_message = "\n".join([
+        f"Hello {user.username},",
+        "",
+        f"{count} new listing(s) match your saved searches:",
+        "",
+        *lines,
+        "",
+        "Thank you,",
+        "The Local Listing Team",
+    ])
+
+    email = EmailMultiAlternatives(
+        subject,
+        plain_message,
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+        connection=connection,
+    )
+    email.attach_alternative(html_message, 'text/html')
+    return email
+
+
+def send_saved_search_alerts():
+    """
+    Email each user the queued matches of their saved searches.
+
+    A listing matching several searches of a user is listed once. All
+    emails are delivered over a single connection; matches are deleted
+    once their email is sent, and matches of listings no longer active
+    or of users who cannot be emailed are dropped.
+
+    Returns:
+        int: The number of emails sent.
+    """
+    SavedSearchMatch.objects.filter(listing__is_active=False).delete()
+    pending = defaultdict(dict)
+    match_ids = defaultdict(list)
+    for match_id, user_id, name, search_id, listing_id, title in (
+        SavedSearchMatch.objects.order_by('created_at', 'pk')
+        .values_list('pk', 'search__user_id', 'search__name', 'search_id',
+                     'listing_id', 'listing__title')
+    ):
+        pending[user_id].setdefault(
+            listing_id, (name or f"Search {search_id}", listing_id, title))
+        match_ids[user_id].append(match_id)
+    if not pending:
+        return 0
+
+    users = get_user_model().objects.filter(
+        id__in=pending.keys(), is_active=True).exclude(email='')
+
+    sent = 0
+    unreachable = set(pending)
+    connection = get_connection()
+    with connection:
+        for user in users.iterator(chunk_size=500):
+            unreachable.discard(user.id)
+            matches = list(pending[user.id].values())
+            email = build_alert_email(user, matches, connection)
+            if email.send():
+                SavedSearchMatch.objects.filter(
+                    pk__in=match_ids[user.id]).delete()
+                sent += 1
+    SavedSearchMatch.objects.filter(search__user__in=unreachable).delete()
+    return sent
@@ -1,28 +1,36 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from rest_framework import serializers
-from .models import Category, Subcategory, Listing, ListingImage
+from .models import (
+    ArchivedListing, Category, Subcategory, Listing, ListingImage,
+    SavedSearch
+)
 from messaging.models import Conversation
+from locallisting.timing import TimedSerializerMixin
+from .tasks import enqueue_image_upload
 
 
 class CategorySerializer(serializers.ModelSerializer):
     """
     Serializer for the Category model.
 
-    Serializes the fields id and name of the category.
+    Serializes the fields id, name and active_listings of the category.
     """
     class Meta:
         model = Category
-        fields = ['id', 'name']
+        fields = ['id', 'name', 'active_listings']
 
 
 class SubcategorySerializer(serializers.ModelSerializer):
     """
     Serializer for the Subcategory model.
 
-    Serializes the fields id, name, and category of the subcategory.
+    Serializes the fields id, name, category and active_listings of the
+    subcategory.
     """
     class Meta:
         model = Subcategory
-        fields = ['id', 'name', 'category']
+        fields = ['id', 'name', 'category', 'active_listings']
 
 
 class ListingImageSerializer(serializers.ModelSerializer):
@@ -36,7 +44,7 @@ class ListingImageSerializer(serializers.ModelSerializer):
         fields = ['id', 'image', 'created_at']
 
 
-class ListingSerializer(serializers.ModelSerializer):
+class ListingSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for the Listing model.
 
@@ -55,20 +63,50 @@ class ListingSerializer(serializers.ModelSerializer):
             'id', 'title', 'description', 'user', 'listing_type',
             'category', 'category_name', 'subcategory',
             'subcategory_name', 'price', 'price_type', 'condition',
-            'delivery_option', 'location', 'event_date', 'created_at',
-            'updated_at', 'is_active', 'status', 'view_count',
+            'delivery_option', 'location', 'event_date', 'expires_at',
+            'created_at', 'updated_at', 'is_active', 'status', 'view_count',
             'favorite_count', 'images', 'is_favorited',
             'has_conversation'
         ]
-        read_only_fields = ['user', 'view_count',
+        read_only_fields = ['user', 'view_count', 'expires_at',
                             'favorite_count', 'is_favorited']
 
+    @staticmethod
+    def setup_eager_loading(queryset, user=None):
+        """
+        Load everything the serializer reads with the listings.
+
+        Related objects and images are fetched up front and the
+        is_favorited and has_conversation flags of ``user`` are
+        annotated, so serializing a page costs the same number of
+        queries whatever its size.
+
+        Args:
+            queryset (QuerySet): Listings to serialize.
+            user (User): The requesting user, if any.
+
+        Returns:
+            QuerySet: The listings with related data loaded.
+        """
+        queryset = queryset.select_related(
+            'user', 'category', 'subcategory').prefetch_related('images')
+        if user is not None and user.is_authenticated:
+            queryset = queryset.annotate(
+                user_has_favorited=Exists(Listing.objects.filter(
+                    pk=OuterRef('pk'), favorited_by=user)),
+                user_has_conversation=Exists(Conversation.objects.filter(
+                    listing=OuterRef('pk'), participants=user)),
+            )
+        return queryset
+
     def get_is_favorited(self, obj):
         """
         Check if the listing is favorited by the authenticated user.
         """
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            if hasattr(obj, 'user_has_favorited'):
+                return obj.user_has_favorited
             return obj.favorited_by.filter(id=request.user.id).exists()
         return False
 
@@ -79,6 +117,8 @@ class ListingSerializer(serializers.ModelSerializer):
         """
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            if hasattr(obj, 'user_has_conversation'):
+                return obj.user_has_conversation
             return Conversation.objects.filter(
                 listing=obj,
                 participants=request.user
@@ -138,11 +178,9 @@ class ListingSerializer(serializers.ModelSerializer):
         images_data = self.context.get('view').request.FILES
         listing = Listing.objects.create(**validated_data)
 
+        # Images are uploaded to Cloudinary by the task worker
         for image_data in images_data.values():
-            try:
-                ListingImage.objects.create(listing=listing, image=image_data)
-            except Exception as e:
-                print(f"Error uploading image: {str(e)}")
+            enqueue_image_upload(listing, image_data)
 
         return listing
 
@@ -157,10 +195,89 @@ class ListingSerializer(serializers.ModelSerializer):
         Returns:
             Listing: The updated Listing instance.
         """
+        if 'status' in validated_data:
+            instance.set_status(validated_data.pop('status'))
         instance = super().update(instance, validated_data)
 
         images_data = self.context.get('view').request.FILES
         for image_data in images_data.values():
-            ListingImage.objects.create(listing=instance, image=image_data)
+            enqueue_image_upload(instance, image_data)
 
         return instance
+
+
+class ArchivedListingSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the ArchivedListing model.
+
+    Has the fields of ListingSerializer, so archived listings can be
+    shown alongside live ones, plus archived_at.
+    """
+    category_name = serializers.ReadOnlyField(source='category.name')
+    subcategory_name = serializers.ReadOnlyField(source='subcategory.name')
+    user = serializers.ReadOnlyField(source='user.username')
+    is_active = serializers.ReadOnlyField()
+    is_favorited = serializers.SerializerMethodField()
+    has_conversation = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedListing
+        fields = ListingSerializer.Meta.fields + ['archived_at']
+        read_only_fields = fields
+
+    def get_is_favorited(self, obj):
+        """Favorites are dropped when a listing is archived."""
+        return False
+
+    def get_has_conversation(self, obj):
+        """Listings with conversations are never archived."""
+        return False
+
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the SavedSearch model.
+
+    The predicates take the values of the listings endpoint's
+    parameters.
+    """
+    class Meta:
+        model = SavedSearch
+        fields = [
+            'id', 'name', 'search', 'category', 'subcategory',
+            'listing_type', 'condition', 'delivery_option', 'location',
+            'min_price', 'max_price', 'created_at'
+        ]
+        read_only_fields = ['created_at']
+
+    def validate(self, data):
+        """
+        Check that the subcategory belongs to the category and that the
+        price range is not empty.
+        """
+        def get(field):
+            # Partial updates keep the saved values of other fields
+            return data.get(field, getattr(self.instance, field, None))
+
+        category = get('category')
+        subcategory = get('subcategory')
+        if category and subcategory and \
+                subcategory.category_id != category.pk:
+            raise serializers.ValidationError({
+                'subcategory': "Subcategory is not in this category."
+            })
+        min_price = get('min_price')
+        max_price = get('max_price')
+        if min_price is not None and max_price is not None \
+                and min_price > max_price:
+            raise serializers.ValidationError({
+                'max_price': "Maximum price is below the minimum price."
+            })
+        return data
+
+    def save(self, **kwargs):
+        """Save the search and update its reverse index entries."""
+        with transaction.atomic():
+            search = super().save(**kwargs)
+            search.update_keys()
+        return search
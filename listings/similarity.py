@@ -0,0 +1,217 @@
+"""
+Similar-listing recommendations from TF-IDF vectors.
+
+Each active listing is turned into a sparse TF-IDF vector of the words
+of its title and description plus its category and subcategory, and
+its nearest neighbors by cosine similarity are stored in the
+SimilarListing table, so the similar listings of a listing are read
+with one indexed query.
+
+Vectors are sparse dicts built in pure Python: listings have a few
+dozen distinct terms out of a vocabulary of tens of thousands, and the
+neighbors are found through an inverted index, so only listings
+sharing a term are ever compared. Terms used by more than
+SIMILAR_LISTINGS_MAX_DOC_FREQ listings are left out of the inverted
+index; they weigh little and would make every listing a candidate.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from heapq import nlargest
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+
+from taskqueue.batching import DEFAULT_BATCH_SIZE
+from .models import Listing, SimilarListing
+
+# Listing values a vector is built from
+VECTOR_FIELDS = ['pk', 'title', 'description', 'category_id',
+                 'subcategory_id']
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or
+    that the this to was were will with you your
+""".split())
+# Term count multipliers: a title word counts as this many description
+# words, and a shared category as this many shared words
+TITLE_WEIGHT = 2
+CATEGORY_WEIGHT = 3
+
+
+def tokenize(text):
+    """Return the lower-cased words of ``text``, without stop words."""
+    return [token for token in TOKEN_RE.findall(text.lower())
+            if len(token) > 1 and token not in STOP_WORDS]
+
+
+def listing_terms(title, description, category_id, subcategory_id):
+    """
+    Return the term counts of a listing.
+
+    Categories and subcategories are terms of their own, which no word
+    can match.
+    """
+    terms = Counter(tokenize(description))
+    for token in tokenize(title):
+        terms[token] += TITLE_WEIGHT
+    if category_id is not None:
+        terms[f'category:{category_id}'] += CATEGORY_WEIGHT
+    if subcategory_id is not None:
+        terms[f'subcategory:{subcategory_id}'] += CATEGORY_WEIGHT
+    return terms
+
+
+def build_vectors(rows):
+    """
+    Build unit-length TF-IDF vectors.
+
+    Args:
+        rows (iterable): Listing values, in VECTOR_FIELDS order.
+
+    Returns:
+        dict: Sparse vectors ({term: weight}) by listing id.
+    """
+    counts = {pk: listing_terms(*values) for pk, *values in rows}
+    doc_freq = Counter()
+    for terms in counts.values():
+        doc_freq.update(terms.keys())
+    total = len(counts)
+
+    vectors = {}
+    for pk, terms in counts.items():
+        # Sublinear term frequency and smoothed inverse document
+        # frequency, so terms shared by every listing still count a bit
+        vector = {
+            term: (1 + math.log(count))
+            * (1 + math.log((1 + total) / (1 + doc_freq[term])))
+            for term, count in terms.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        if norm:
+            vectors[pk] = {
+                term: weight / norm for term, weight in vector.items()}
+    return vectors
+
+
+def find_neighbors(vectors, listing_ids, count, max_doc_freq=None):
+    """
+    Find the nearest neighbors of listings.
+
+    Args:
+        vectors (dict): Vectors by listing id, from build_vectors().
+        listing_ids (iterable): Listings to find the neighbors of.
+        count (int): Number of neighbors per listing.
+        max_doc_freq (int): Leave terms of more listings than this out
+            of the inverted index; no limit if None.
+
+    Returns:
+        dict: (neighbor id, score) pairs by listing id, best first.
+    """
+    postings = defaultdict(list)
+    for pk, vector in vectors.items():
+        for term, weight in vector.items():
+            postings[term].append((pk, weight))
+    if max_doc_freq is not None:
+        postings = {term: entries for term, entries in postings.items()
+                    if len(entries) <= max_doc_freq}
+
+    neighbors = {}
+    for pk in listing_ids:
+        scores = defaultdict(float)
+        for term, weight in vectors.get(pk, {}).items():
+            for other, other_weight in postings.get(term, ()):
+                scores[other] += weight * other_weight
+        scores.pop(pk, None)
+        neighbors[pk] = nlargest(count, scores.items(), key=itemgetter(1))
+    return neighbors
+
+
+def save_neighbors(neighbors):
+    """
+    Replace the stored neighbors of listings.
+
+    Args:
+        neighbors (dict): (neighbor id, score) pairs by listing id.
+    """
+    with transaction.atomic():
+        SimilarListing.objects.filter(listing_id__in=neighbors).delete()
+        SimilarListing.objects.bulk_create([
+            SimilarListing(listing_id=pk, similar_id=other, rank=rank,
+                           score=score)
+            for pk, pairs in neighbors.items()
+            for rank, (other, score) in enumerate(pairs)
+        ])
+
+
+def build_similar_listings(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Rebuild the similar listings of every active listing.
+
+    The vectors of all active listings are held in memory; the
+    neighbors are written ``batch_size`` listings per transaction.
+    Neighbor lists of listings no longer active are dropped.
+
+    Returns:
+        int: Number of listings processed.
+    """
+    vectors = build_vectors(
+        Listing.objects.filter(is_active=True).order_by('pk')
+        .values_list(*VECTOR_FIELDS).iterator(chunk_size=2000))
+    listing_ids = list(vectors)
+    for start in range(0, len(listing_ids), batch_size):
+        save_neighbors(find_neighbors(
+            vectors, listing_ids[start:start + batch_size],
+            settings.SIMILAR_LISTINGS_COUNT,
+            settings.SIMILAR_LISTINGS_MAX_DOC_FREQ))
+    SimilarListing.objects.filter(listing__is_active=False).delete()
+    return len(listing_ids)
+
+
+def refresh_neighbors(listing_id):
+    """
+    Refresh the similar listings of a new or edited listing.
+
+    Rather than vectorizing the whole catalog, the listing is compared
+    with the SIMILAR_LISTINGS_CANDIDATES most recent active listings of
+    its category, and added to the neighbors of those it now ranks
+    among. Scores are approximate until the nightly rebuild, which also
+    drops the listing from neighbor lists it no longer belongs to.
+
+    Args:
+        listing_id (int): The listing to refresh.
+    """
+    row = Listing.objects.filter(
+        pk=listing_id, is_active=True).values_list(*VECTOR_FIELDS).first()
+    if row is None:
+        SimilarListing.objects.filter(listing_id=listing_id).delete()
+        return
+    candidates = Listing.objects.filter(is_active=True).exclude(
+        pk=listing_id)
+    category_id = row[VECTOR_FIELDS.index('category_id')]
+    if category_id is not None:
+        candidates = candidates.filter(category_id=category_id)
+    rows = [row] + list(
+        candidates.order_by('-created_at').values_list(*VECTOR_FIELDS)
+        [:settings.SIMILAR_LISTINGS_CANDIDATES])
+
+    count = settings.SIMILAR_LISTINGS_COUNT
+    found = find_neighbors(build_vectors(rows), [listing_id], count)
+    neighbors = {listing_id: found[listing_id]}
+
+    current = defaultdict(list)
+    for pk, other, score in SimilarListing.objects.filter(
+            listing_id__in=[other for other, _ in found[listing_id]]
+    ).order_by('listing_id', 'rank').values_list(
+            'listing_id', 'similar_id', 'score'):
+        current[pk].append((other, score))
+    for other, score in found[listing_id]:
+        pairs = [pair for pair in current[other] if pair[0] != listing_id]
+        pairs = nlargest(count, pairs + [(listing_id, score)],
+                         key=itemgetter(1))
+        if pairs != current[other]:
+            neighbors[other] = pairs
+    save_neighbors(neighbors)
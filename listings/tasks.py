@@ -0,0 +1,95 @@
+from cloudinary import CloudinaryResource, uploader
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+
+from locallisting.timing import track
+from taskqueue.queue import PRIORITY_HIGH, PRIORITY_LOW, task
+from .models import Listing, ListingImage, PendingImageUpload
+from .saved_searches import match_listings
+from .similarity import refresh_neighbors
+
+
+@task(priority=PRIORITY_HIGH)
+def upload_listing_image(upload_id):
+    """
+    Upload a pending image to Cloudinary and attach it to its listing.
+
+    Args:
+        upload_id (int): The PendingImageUpload holding the file; it is
+            deleted once uploaded.
+    """
+    upload = PendingImageUpload.objects.filter(pk=upload_id).first()
+    # Gone with its listing, or pruned after failing for too long
+    if upload is None:
+        return
+    image = SimpleUploadedFile(
+        upload.name, bytes(upload.content), upload.content_type)
+    with transaction.atomic():
+        with track('cloudinary'):
+            ListingImage.objects.create(
+                listing_id=upload.listing_id, image=image)
+        upload.delete()
+
+
+def enqueue_image_upload(listing, uploaded_file):
+    """
+    Stage an image file received with a request and queue its upload.
+    """
+    upload = PendingImageUpload.objects.create(
+        listing=listing,
+        name=uploaded_file.name,
+        content_type=uploaded_file.content_type or '',
+        content=uploaded_file.read(),
+    )
+    upload_listing_image.enqueue(upload_id=upload.pk)
+
+
+@task(priority=PRIORITY_LOW)
+def import_listing_image(listing_id, url):
+    """
+    Have Cloudinary fetch an image from a URL and attach it to a
+    listing; used by bulk imports.
+
+    Args:
+        listing_id (int): The listing the image belongs to.
+        url (str): Public URL of the image.
+    """
+    if not Listing.objects.filter(pk=listing_id).exists():
+        return
+    with track('cloudinary'):
+        result = uploader.upload(url)
+    image = CloudinaryResource(
+        result['public_id'], version=result.get('version'),
+        format=result.get('format'), type=result.get('type', 'upload'),
+        resource_type=result.get('resource_type', 'image'))
+    ListingImage.objects.create(listing_id=listing_id, image=image)
+
+
+@task(priority=PRIORITY_LOW)
+def refresh_similar_listings(listing_ids):
+    """
+    Refresh the similar listings of new or edited listings.
+
+    Args:
+        listing_ids (list): The listings to refresh.
+    """
+    for listing_id in listing_ids:
+        refresh_neighbors(listing_id)
+
+
+@task(priority=PRIORITY_LOW)
+def match_saved_searches(listing_ids):
+    """
+    Queue the saved search alerts of new listings.
+
+    Args:
+        listing_ids (list): The new listings.
+    """
+    match_listings(listing_ids)
+
+
+@task()
+def delete_cloudinary_image(public_id):
+    """Delete an image from Cloudinary."""
+    with track('cloudinary'):
+        uploader.destroy(public_id)
@@ -1,18 +1,58 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+import csv
+import json
 import os
+from datetime import timedelta
+from io import StringIO
+import cloudinary
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Category, Subcategory, Listing
+from .analytics import events, prune_listing_stats, record_event
+from .category_tree import clear_category_tree
+from .jobs import archive_listings, expire_listings, prune_pending_uploads
+from .saved_searches import (
+    get_candidate_searches, send_saved_search_alerts
+)
+from .similarity import build_similar_listings
+from .tasks import enqueue_image_upload, upload_listing_image
+from .trending import (
+    add_scores, current_score, event_score, update_trending_scores
+)
+from .models import (
+    ArchivedListing, Category, Subcategory, Listing, ListingChange,
+    ListingDailyStats, ListingImage, PendingImageUpload, SavedSearch,
+    SavedSearchMatch, SimilarListing, TrendingScore
+)
+from locallisting.testing import QueryBudgetTestCase
+from messaging.models import Conversation
 from profiles.models import Profile
+from taskqueue.models import Task
 from .serializers import (
     CategorySerializer,
     SubcategorySerializer,
     ListingSerializer
 )
 
+
+def use_test_cloud(testcase):
+    """
+    Set a Cloudinary cloud name for the test, so image URLs can be
+    built without credentials.
+    """
+    config = cloudinary.config()
+    testcase.addCleanup(setattr, config, 'cloud_name', config.cloud_name)
+    config.cloud_name = 'test-cloud'
+
+
 test_static_root = os.path.join(settings.BASE_DIR, 'test_static')
 os.makedirs(test_static_root, exist_ok=True)
 
@@ -112,7 +152,8 @@ class CategorySerializerTest(TestCase):
         Test that the serialized data contains the expected fields.
         """
         data = self.serializer.data
-        self.assertEqual(set(data.keys()), set(['id', 'name']))
+        self.assertEqual(set(data.keys()),
+                         set(['id', 'name', 'active_listings']))
 
 
 class SubcategorySerializerTest(TestCase):
@@ -135,7 +176,8 @@ class SubcategorySerializerTest(TestCase):
         Test that the serialized data contains the expected fields.
         """
         data = self.serializer.data
-        self.assertEqual(set(data.keys()), set(['id', 'name', 'category']))
+        self.assertEqual(set(data.keys()), set(
+            ['id', 'name', 'category', 'active_listings']))
 
 
 class ListingSerializerTest(TestCase):
@@ -174,9 +216,9 @@ class ListingSerializerTest(TestCase):
             'id', 'title', 'description', 'user', 'listing_type', 'category',
             'category_name', 'subcategory', 'subcategory_name', 'price',
             'price_type', 'condition', 'delivery_option', 'location',
-            'event_date', 'created_at', 'updated_at', 'is_active', 'status',
-            'view_count', 'favorite_count', 'images', 'is_favorited',
-            'has_conversation'
+            'event_date', 'expires_at', 'created_at', 'updated_at',
+            'is_active', 'status', 'view_count', 'favorite_count', 'images',
+            'is_favorited', 'has_conversation'
         ])
         self.assertEqual(set(data.keys()), expected_fields)
 
@@ -285,6 +327,35 @@ class ListingViewSetTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Listing.objects.filter(pk=self.listing.pk).exists())
 
+    def test_batch_retrieve_listings(self):
+        """
+        Test fetching listings by id, in request order, without counting
+        views.
+        """
+        other = Listing.objects.create(
+            title="Pixel 6", description="Used Pixel 6", user=self.user,
+            price=299, condition="good")
+        response = self.client.get(reverse('listing-batch'), {
+            'ids': f"{other.pk},999,{self.listing.pk},{other.pk}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['results']],
+                         [other.pk, self.listing.pk])
+        self.assertEqual(response.data['missing'], [999])
+        self.assertEqual(response.data['results'][1]['category_name'],
+                         "Electronics")
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.view_count, 0)
+
+    @override_settings(LISTING_BATCH_MAX=2)
+    def test_batch_retrieve_validation(self):
+        """
+        Test that missing, malformed and too many ids are rejected.
+        """
+        for ids in ['', 'a,b', '1,2,3']:
+            response = self.client.get(reverse('listing-batch'), {'ids': ids})
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
 
 class CategoryListTest(TestCase):
     """
@@ -343,6 +414,257 @@ class SubcategoryListTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
+class CategoryTreeTest(TestCase):
+    """
+    Test case for the cached category tree.
+    """
+
+    def setUp(self):
+        clear_category_tree()
+        self.addCleanup(clear_category_tree)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com",
+            password="testpass123")
+        self.electronics = Category.objects.create(name="Electronics")
+        self.clothing = Category.objects.create(name="Clothing")
+        self.phones = Subcategory.objects.create(
+            name="Smartphones", category=self.electronics)
+        self.laptops = Subcategory.objects.create(
+            name="Laptops", category=self.electronics)
+        for listing_status in ('active', 'active', 'sold'):
+            Listing.objects.create(
+                title="Phone", description="Test", user=self.user,
+                listing_type="item_sale", category=self.electronics,
+                subcategory=self.phones, price=100, condition="good",
+                status=listing_status)
+
+    def test_tree(self):
+        """
+        Test that categories are nested with their subcategories and
+        active listing counts.
+        """
+        response = self.client.get(reverse('category-tree'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {'id': self.clothing.id, 'name': "Clothing",
+             'active_listings': 0, 'subcategories': []},
+            {'id': self.electronics.id, 'name': "Electronics",
+             'active_listings': 2, 'subcategories': [
+                 {'id': self.laptops.id, 'name': "Laptops",
+                  'active_listings': 0},
+                 {'id': self.phones.id, 'name': "Smartphones",
+                  'active_listings': 2},
+             ]},
+        ])
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_cached(self):
+        """
+        Test that the tree is built with two queries and then served
+        from the cache.
+        """
+        with self.assertNumQueries(2):
+            self.client.get(reverse('category-tree'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('category-tree'))
+        self.assertEqual(len(response.data), 2)
+
+    def test_not_modified(self):
+        """
+        Test that a request with the current ETag gets an empty 304.
+        """
+        etag = self.client.get(reverse('category-tree'))['ETag']
+        response = self.client.get(
+            reverse('category-tree'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+
+    def test_category_change_invalidates(self):
+        """
+        Test that changing a category or subcategory rebuilds the tree
+        with a new ETag.
+        """
+        etag = self.client.get(reverse('category-tree'))['ETag']
+        self.laptops.name = "Notebooks"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.laptops.save()
+            # Not cleared before the change is committed
+            self.assertEqual(
+                self.client.get(reverse('category-tree'))['ETag'], etag)
+        response = self.client.get(
+            reverse('category-tree'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(
+            response.data[1]['subcategories'][0]['name'], "Notebooks")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clothing.delete()
+        response = self.client.get(reverse('category-tree'))
+        self.assertEqual([category['name'] for category in response.data],
+                         ["Electronics"])
+
+
+class CategoryCountTest(TestCase):
+    """
+    Test cases for the active listing counters of categories.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com",
+            password="testpass123")
+        Profile.objects.create(user=self.user)
+        self.electronics = Category.objects.create(name="Electronics")
+        self.phones = Subcategory.objects.create(
+            name="Phones", category=self.electronics)
+        self.clothing = Category.objects.create(name="Clothing")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_listing(self, **kwargs):
+        kwargs.setdefault('category', self.electronics)
+        kwargs.setdefault('subcategory', self.phones)
+        return Listing.objects.create(
+            title="Phone", description="Test", user=self.user,
+            listing_type="item_sale", price=100, condition="good", **kwargs)
+
+    def assertCounts(self, electronics, phones, clothing):
+        counts = (
+            Category.objects.get(pk=self.electronics.pk).active_listings,
+            Subcategory.objects.get(pk=self.phones.pk).active_listings,
+            Category.objects.get(pk=self.clothing.pk).active_listings,
+        )
+        self.assertEqual(counts, (electronics, phones, clothing))
+
+    def test_listing_changes(self):
+        """
+        Test that creating, closing, reopening, recategorizing and
+        deleting listings update the counters.
+        """
+        listing = self.create_listing()
+        self.create_listing(status='draft')
+        self.assertCounts(1, 1, 0)
+
+        listing.set_status('sold')
+        listing.save()
+        self.assertCounts(0, 0, 0)
+        listing.set_status('active')
+        listing.save()
+        self.assertCounts(1, 1, 0)
+
+        listing.category, listing.subcategory = self.clothing, None
+        listing.save()
+        self.assertCounts(0, 0, 1)
+
+        # Loaded without the counted fields
+        Listing.objects.only('title').get(pk=listing.pk).delete()
+        self.assertCounts(0, 0, 1)
+        call_command('reconcile_category_counts', stdout=StringIO())
+        self.assertCounts(0, 0, 0)
+
+        listing = Listing.objects.only('title').get(
+            pk=self.create_listing().pk)
+        listing.status = 'cancelled'
+        listing.save()
+        self.assertCounts(0, 0, 0)
+        Listing.objects.create(
+            title="Shirt", description="Test", user=self.user,
+            category=self.clothing).delete()
+        self.assertCounts(0, 0, 0)
+
+    def test_stale_instances(self):
+        """
+        Test that saving an instance loaded before another save moves
+        the counters from the stored state.
+        """
+        listing = self.create_listing()
+        self.create_listing()
+        first = Listing.objects.get(pk=listing.pk)
+        second = Listing.objects.get(pk=listing.pk)
+        first.set_status('sold')
+        first.save()
+        second.set_status('cancelled')
+        second.save()
+        self.assertCounts(1, 1, 0)
+
+        first.set_status('active')
+        first.save()
+        second.category, second.subcategory = self.clothing, None
+        second.set_status('active')
+        second.save()
+        self.assertCounts(1, 1, 1)
+
+    def test_category_save_keeps_counter(self):
+        """
+        Test that saving a category read before a counter update does
+        not undo it.
+        """
+        category = Category.objects.get(pk=self.electronics.pk)
+        self.create_listing()
+        category.name = "Gadgets"
+        category.save()
+        category.refresh_from_db()
+        self.assertEqual(category.name, "Gadgets")
+        self.assertEqual(category.active_listings, 1)
+
+    def test_bulk_changes(self):
+        """
+        Test that the expiry job, renewals and imports update the
+        counters.
+        """
+        past = timezone.now() - timedelta(minutes=1)
+        listing = self.create_listing(expires_at=past)
+        self.create_listing(category=self.clothing, subcategory=None)
+        self.assertCounts(1, 1, 1)
+        expire_listings()
+        self.assertCounts(0, 0, 1)
+
+        response = self.client.post(
+            reverse('listing-renew'), {'ids': [listing.pk]}, format='json')
+        self.assertEqual(response.data['renewed'], [listing.pk])
+        self.assertCounts(1, 1, 1)
+
+        row = {'title': "Phone", 'description': "A phone",
+               'listing_type': 'item_sale', 'price': '100.00',
+               'condition': 'good', 'category': "Electronics",
+               'subcategory': "Phones"}
+        response = self.client.post(reverse('listing-bulk-import'), {
+            'listings': [{**row, 'id': listing.pk, 'status': 'sold'}, row],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['created']), 1)
+        self.assertCounts(1, 1, 1)
+
+    def test_reconcile(self):
+        """
+        Test that the reconciliation command corrects drifted counters.
+        """
+        self.create_listing()
+        Category.objects.update(active_listings=5)
+        Subcategory.objects.update(active_listings=0)
+        out = StringIO()
+        call_command('reconcile_category_counts', stdout=out)
+        self.assertIn("Corrected 3 counter(s)", out.getvalue())
+        self.assertCounts(1, 1, 0)
+
+    def test_public_counts(self):
+        """
+        Test that the category endpoints expose the counters.
+        """
+        self.create_listing()
+        response = self.client.get(reverse('category-list'))
+        counts = {category['name']: category['active_listings']
+                  for category in response.data}
+        self.assertEqual(counts, {"Electronics": 1, "Clothing": 0})
+        response = self.client.get(
+            reverse('subcategory-detail', args=[self.phones.pk]))
+        self.assertEqual(response.data['active_listings'], 1)
+
+
 class MyListingsViewTest(TestCase):
     """
     Test case for the MyListingsView.
@@ -485,3 +807,1186 @@ class FavoriteToggleViewTest(TestCase):
         self.assertEqual(response.data['action'], 'unfavorited')
         self.assertFalse(self.listing.favorited_by.filter(
             id=self.user.id).exists())
+
+
+@override_settings(TASKS_EAGER=False)
+class PendingImageUploadTest(TestCase):
+    """
+    Test cases for staging uploaded images for the task worker.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="seller", email="seller@example.com",
+            password="testpass123")
+        self.listing = Listing.objects.create(
+            title="Phone", description="A phone", user=self.user)
+
+    def upload(self):
+        enqueue_image_upload(self.listing, SimpleUploadedFile(
+            "phone.png", b"image data", "image/png"))
+        return PendingImageUpload.objects.get()
+
+    def test_only_a_reference_is_queued(self):
+        upload = self.upload()
+        self.assertEqual(bytes(upload.content), b"image data")
+        self.assertEqual(upload.content_type, "image/png")
+        task = Task.objects.get(name=upload_listing_image.name)
+        self.assertEqual(task.kwargs, {'upload_id': upload.id})
+
+        # Deleting the listing drops its pending uploads
+        self.listing.delete()
+        self.assertFalse(PendingImageUpload.objects.exists())
+        upload_listing_image.func(upload_id=upload.id)
+        self.assertFalse(ListingImage.objects.exists())
+
+    def test_prune_pending_uploads(self):
+        upload = self.upload()
+        self.assertEqual(prune_pending_uploads(), 0)
+        PendingImageUpload.objects.filter(pk=upload.pk).update(
+            created_at=timezone.now() - timedelta(
+                days=settings.IMAGE_UPLOAD_RETENTION_DAYS + 1))
+        self.assertEqual(prune_pending_uploads(), 1)
+
+
+class ListingExpiryTest(TestCase):
+    """
+    Test cases for listing expiry dates, the expiry job and renewals.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com",
+            password="testpass123")
+        self.other = User.objects.create_user(
+            username="other", email="other@example.com",
+            password="testpass123")
+        self.profile = Profile.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_listing(self, **kwargs):
+        kwargs.setdefault('user', self.user)
+        return Listing.objects.create(
+            title="Listing", description="Description", **kwargs)
+
+    def test_expiry_date_per_listing_type(self):
+        now = timezone.now()
+        listing = self.create_listing(listing_type='item_free')
+        days = settings.LISTING_LIFETIME_DAYS['item_free']
+        self.assertAlmostEqual(listing.expires_at, now + timedelta(days=days),
+                               delta=timedelta(minutes=1))
+
+        event_date = now + timedelta(days=3)
+        event = self.create_listing(
+            listing_type='event', event_date=event_date)
+        self.assertEqual(event.expires_at, event_date)
+
+        with self.settings(LISTING_LIFETIME_DAYS={'other': None}):
+            self.assertIsNone(self.create_listing().expires_at)
+
+    def test_expire_listings_job(self):
+        past = timezone.now() - timedelta(minutes=1)
+        stale = self.create_listing(expires_at=past)
+        old_event = self.create_listing(listing_type='event', event_date=past)
+        fresh = self.create_listing()
+        self.profile.update_listing_counts()
+        self.assertEqual(self.profile.active_listings, 3)
+
+        self.assertEqual(expire_listings(batch_size=1), 2)
+        for listing in (stale, old_event):
+            listing.refresh_from_db()
+            self.assertEqual(listing.status, 'expired')
+            self.assertFalse(listing.is_active)
+        fresh.refresh_from_db()
+        self.assertTrue(fresh.is_active)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.active_listings, 1)
+        self.assertEqual(expire_listings(), 0)
+
+    def test_reactivating_gives_fresh_lifetime(self):
+        listing = self.create_listing(
+            status='expired', expires_at=timezone.now() - timedelta(days=1))
+        response = self.client.patch(
+            reverse('listing-status-update', args=[listing.id]),
+            {'status': 'active'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        listing.refresh_from_db()
+        self.assertTrue(listing.is_active)
+        self.assertGreater(listing.expires_at, timezone.now())
+
+    def test_type_change_recomputes_expiry(self):
+        event_date = timezone.now() + timedelta(days=200)
+        listing = self.create_listing(
+            listing_type='event', event_date=event_date)
+        self.assertEqual(listing.expires_at, event_date)
+
+        listing = Listing.objects.get(pk=listing.pk)
+        listing.listing_type = 'item_free'
+        listing.event_date = None
+        listing.save()
+        days = settings.LISTING_LIFETIME_DAYS['item_free']
+        self.assertAlmostEqual(
+            listing.expires_at, timezone.now() + timedelta(days=days),
+            delta=timedelta(minutes=1))
+
+        # Other edits keep the expiry date
+        expires_at = listing.expires_at
+        listing = Listing.objects.get(pk=listing.pk)
+        listing.title = "Renamed"
+        listing.save()
+        self.assertEqual(listing.expires_at, expires_at)
+
+    def test_bulk_renew(self):
+        past = timezone.now() - timedelta(days=1)
+        expired = self.create_listing(status='expired', expires_at=past)
+        active = self.create_listing(listing_type='job')
+        sold = self.create_listing(status='sold')
+        old_event = self.create_listing(
+            listing_type='event', event_date=past, status='expired')
+        others = self.create_listing(user=self.other, status='expired')
+
+        response = self.client.post(reverse('listing-renew'), {
+            'ids': [expired.id, active.id, sold.id, old_event.id, others.id],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['renewed'], [expired.id, active.id])
+        self.assertEqual(response.data['skipped'],
+                         [sold.id, old_event.id, others.id])
+
+        expired.refresh_from_db()
+        self.assertEqual(expired.status, 'active')
+        self.assertTrue(expired.is_active)
+        self.assertGreater(expired.expires_at, timezone.now())
+        active_expiry = active.expires_at
+        active.refresh_from_db()
+        self.assertGreaterEqual(active.expires_at, active_expiry)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.active_listings, 2)
+
+    def test_bulk_renew_validation(self):
+        url = reverse('listing-renew')
+        too_many = list(range(settings.LISTING_RENEW_MAX + 1))
+        for ids in [None, [], ['x'], too_many]:
+            response = self.client.post(url, {'ids': ids}, format='json')
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+
+class ListingArchiveTest(TestCase):
+    """
+    Test cases for moving closed listings to the archive.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com",
+            password="testpass123")
+        self.buyer = User.objects.create_user(
+            username="buyer", email="buyer@example.com",
+            password="testpass123")
+        self.profile = Profile.objects.create(user=self.user)
+        self.category = Category.objects.create(name="Electronics")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_listing(self, status='sold', days_ago=200):
+        listing = Listing.objects.create(
+            title=f"{status} listing", description="Description",
+            user=self.user, category=self.category, status=status)
+        Listing.objects.filter(pk=listing.pk).update(
+            updated_at=timezone.now() - timedelta(days=days_ago))
+        return listing
+
+    def test_archive_listings_job(self):
+        old = self.create_listing()
+        ListingImage.objects.create(listing=old, image="old-image")
+        old.favorited_by.add(self.buyer)
+        discussed = self.create_listing()
+        Conversation.objects.create(listing=discussed)
+        recent = self.create_listing(days_ago=1)
+        active = self.create_listing(status='active')
+
+        today = timezone.now().date()
+        ListingDailyStats.objects.create(listing=old, date=today, views=3)
+
+        self.assertEqual(archive_listings(batch_size=1), 1)
+        self.assertEqual(
+            set(Listing.objects.values_list('pk', flat=True)),
+            {discussed.pk, recent.pk, active.pk})
+        # The seller keeps the analytics of archived listings
+        response = self.client.get(reverse('listing-analytics'), {'days': 1})
+        self.assertEqual(response.data['results'], [{
+            'id': old.id, 'title': old.title, 'series': [
+                {'date': today, 'views': 3, 'favorites': 0, 'contacts': 0}],
+        }])
+        archived = ArchivedListing.objects.get()
+        self.assertEqual(archived.pk, old.pk)
+        self.assertEqual(archived.status, 'sold')
+        self.assertEqual(archived.category, self.category)
+        self.assertEqual(len(archived.images), 1)
+        self.assertFalse(ListingImage.objects.exists())
+        self.assertEqual(archive_listings(), 0)
+
+        self.profile.update_listing_counts()
+        self.assertEqual(self.profile.total_listings, 4)
+        self.assertEqual(self.profile.active_listings, 1)
+
+    def test_my_listings_include_archived(self):
+        live = self.create_listing(status='active')
+        old = self.create_listing()
+        archive_listings()
+
+        response = self.client.get(reverse('my-listings'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data],
+                         [live.id, old.id])
+        archived = response.data[1]
+        self.assertEqual(set(archived), set(response.data[0]) | {
+            'archived_at'})
+        self.assertEqual(archived['category_name'], "Electronics")
+        self.assertFalse(archived['is_active'])
+
+        newer = self.create_listing()
+        archive_listings()
+        with self.settings(MY_LISTINGS_ARCHIVED_MAX=1):
+            response = self.client.get(reverse('my-listings'))
+        self.assertEqual([item['id'] for item in response.data],
+                         [live.id, newer.id])
+
+        # Archived listings are gone from the public feed
+        response = self.client.get(reverse('listing-detail', args=[old.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(LISTING_CHANGES_DELAY=0)
+class ListingChangeFeedTest(TestCase):
+    """
+    Test cases for the incremental listing change feed.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com",
+            password="testpass123")
+        Profile.objects.create(user=self.user)
+        self.client = APIClient()
+        self.url = reverse('listing-changes')
+
+    def create_listing(self, title):
+        return Listing.objects.create(
+            title=title, description="Description", user=self.user)
+
+    def get_changes(self, since=0, **params):
+        response = self.client.get(self.url, {'since': since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_feed_returns_latest_changes_and_tombstones(self):
+        first = self.create_listing("First")
+        second = self.create_listing("Second")
+        third = self.create_listing("Third")
+        first.title = "First, edited"
+        first.save()
+        second_id = second.id
+        second.delete()
+
+        data = self.get_changes()
+        self.assertEqual([(item['id'], item['deleted'])
+                          for item in data['results']],
+                         [(third.id, False), (first.id, False),
+                          (second_id, True)])
+        self.assertEqual(data['results'][1]['listing']['title'],
+                         "First, edited")
+        self.assertIsNone(data['results'][2]['listing'])
+        self.assertFalse(data['has_more'])
+
+        # Nothing new after the cursor
+        self.assertEqual(
+            self.get_changes(data['next_since'])['results'], [])
+
+    def test_paging_with_cursor(self):
+        listings = [self.create_listing(f"Listing {i}") for i in range(5)]
+        seen = []
+        since = 0
+        while True:
+            data = self.get_changes(since, limit=2)
+            seen += [item['id'] for item in data['results']]
+            since = data['next_since']
+            if not data['has_more']:
+                break
+        self.assertEqual(seen, [listing.id for listing in listings])
+
+    def test_bulk_changes_are_recorded_but_views_are_not(self):
+        listing = self.create_listing("Listing")
+        since = self.get_changes()['next_since']
+
+        self.client.get(reverse('listing-detail', args=[listing.id]))
+        self.assertEqual(self.get_changes(since)['results'], [])
+
+        Listing.objects.filter(pk=listing.pk).update(
+            expires_at=timezone.now())
+        expire_listings()
+        results = self.get_changes(since)['results']
+        self.assertEqual(results[0]['listing']['status'], 'expired')
+
+    @override_settings(LISTING_CHANGES_DELAY=60)
+    def test_recent_changes_are_held_back(self):
+        self.create_listing("Listing")
+        data = self.get_changes()
+        self.assertEqual(data['results'], [])
+        self.assertEqual(data['next_since'], 0)
+        ListingChange.objects.update(
+            changed_at=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(len(self.get_changes()['results']), 1)
+
+    def test_latest_change_in_transaction_wins(self):
+        listing = self.create_listing("Listing")
+        first_seq = ListingChange.objects.get(listing_id=listing.id).seq
+        with transaction.atomic():
+            ListingChange.objects.record([listing.id])
+            ListingChange.objects.record([listing.id], deleted=True)
+        change = ListingChange.objects.get(listing_id=listing.id)
+        self.assertTrue(change.deleted)
+        self.assertGreater(change.seq, first_seq)
+
+        with transaction.atomic():
+            ListingChange.objects.record([listing.id], deleted=True)
+            ListingChange.objects.record([listing.id, listing.id])
+        self.assertFalse(
+            ListingChange.objects.get(listing_id=listing.id).deleted)
+
+    def test_changes_of_long_transactions_move_after_commit(self):
+        listing = self.create_listing("Listing")
+        with override_settings(LISTING_CHANGES_DELAY=60):
+            with self.captureOnCommitCallbacks(execute=True):
+                ListingChange.objects.record([listing.id])
+                seq = ListingChange.objects.get(listing_id=listing.id).seq
+        # Committed in time
+        self.assertEqual(
+            ListingChange.objects.get(listing_id=listing.id).seq, seq)
+
+        # Committed later than the feed holds changes back
+        with self.captureOnCommitCallbacks(execute=True):
+            ListingChange.objects.record([listing.id])
+            in_transaction = ListingChange.objects.get(
+                listing_id=listing.id).seq
+        self.assertGreater(in_transaction, seq)
+        self.assertGreater(
+            ListingChange.objects.get(listing_id=listing.id).seq,
+            in_transaction)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'since': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ListingExportTest(TestCase):
+    """
+    Test cases for the streaming listing export and its command.
+    """
+
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username="staff", email="staff@example.com",
+            password="testpass123", is_staff=True)
+        self.category = Category.objects.create(name="Electronics")
+        self.phone = Listing.objects.create(
+            title="Phone", description="A phone, barely used",
+            user=self.staff, category=self.category, price=100)
+        ListingImage.objects.create(listing=self.phone, image="phone")
+        self.bike = Listing.objects.create(
+            title="Bike", description="A bike", user=self.staff, price=50)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.staff)
+        self.url = reverse('listing-export')
+        use_test_cloud(self)
+
+    def test_ndjson_export(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in
+                b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['id'] for row in rows],
+                         [self.phone.id, self.bike.id])
+        self.assertEqual(rows[0]['category'], "Electronics")
+        self.assertEqual(rows[0]['user'], "staff")
+        self.assertEqual(rows[0]['price'], "100.00")
+        self.assertEqual(rows[0]['images'], [
+            'http://res.cloudinary.com/test-cloud/image/upload/phone'])
+        self.assertEqual(rows[1]['images'], [])
+
+    def test_csv_export_with_filters(self):
+        response = self.client.get(
+            self.url, {'output': 'csv', 'min_price': 60})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([row['title'] for row in rows], ["Phone"])
+        self.assertEqual(rows[0]['description'], "A phone, barely used")
+
+    def test_export_is_staff_only(self):
+        user = User.objects.create_user(
+            username="user", email="user@example.com", password="pass")
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_parameters(self):
+        for params in [{'output': 'xml'}, {'min_price': 'cheap'}]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_listings', '--filter', 'max_price=60',
+                     '--chunk-size', '1', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row['title'] for row in rows], ["Bike"])
+
+
+@override_settings(TASKS_EAGER=False)
+class ListingImportTest(TestCase):
+    """
+    Test cases for the bulk listing import endpoint and command.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="seller", email="seller@example.com",
+            password="testpass123")
+        self.other = User.objects.create_user(
+            username="other", email="other@example.com",
+            password="testpass123")
+        self.profile = Profile.objects.create(user=self.user)
+        self.category = Category.objects.create(name="Electronics")
+        self.subcategory = Subcategory.objects.create(
+            name="Phones", category=self.category)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('listing-bulk-import')
+
+    def row(self, **fields):
+        return {
+            'title': "Phone", 'description': "A phone",
+            'listing_type': 'item_sale', 'price': '100.00',
+            'condition': 'good', **fields,
+        }
+
+    def test_import_creates_and_updates_listings(self):
+        listing = Listing.objects.create(
+            title="Old", description="Old", user=self.user,
+            category=self.category, status='draft')
+        response = self.client.post(self.url, {'listings': [
+            self.row(category="electronics", subcategory="PHONES",
+                     image_urls=["https://example.com/phone.jpg"]),
+            self.row(title="Free chair", listing_type='item_free',
+                     price=None),
+            self.row(id=listing.id, title="Renamed", status='active'),
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['updated'], [listing.id])
+        phone, chair = Listing.objects.filter(
+            pk__in=response.data['created']).order_by('pk')
+        self.assertEqual(phone.category, self.category)
+        self.assertEqual(phone.subcategory, self.subcategory)
+        self.assertTrue(phone.is_active)
+        self.assertIsNotNone(phone.expires_at)
+        self.assertEqual(chair.price_type, 'free')
+        listing.refresh_from_db()
+        self.assertEqual(listing.title, "Renamed")
+        self.assertEqual(listing.category, self.category)
+        self.assertTrue(listing.is_active)
+        self.assertIsNotNone(listing.expires_at)
+        self.assertEqual(ListingChange.objects.count(), 3)
+
+        tasks = {task.name: task.kwargs for task in Task.objects.all()}
+        self.assertEqual(tasks['listings.tasks.import_listing_image'], {
+            'listing_id': phone.id, 'url': "https://example.com/phone.jpg"})
+        self.assertEqual(tasks['profiles.tasks.update_listing_counts'],
+                         {'user_id': self.user.id})
+
+    def test_invalid_rows_are_reported_and_nothing_is_written(self):
+        foreign = Listing.objects.create(
+            title="Theirs", description="Theirs", user=self.other)
+        response = self.client.post(self.url, {'listings': [
+            self.row(),
+            self.row(condition=''),
+            self.row(category="Unknown"),
+            self.row(category="Electronics", subcategory="Laptops"),
+            self.row(id=foreign.id),
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data['errors']), {1, 2, 3, 4})
+        self.assertIn('condition', response.data['errors'][1])
+        self.assertIn('category', response.data['errors'][2])
+        self.assertIn('subcategory', response.data['errors'][3])
+        self.assertIn('id', response.data['errors'][4])
+        self.assertEqual(Listing.objects.filter(user=self.user).count(), 0)
+
+    def test_partial_update(self):
+        listing = Listing.objects.create(
+            title="Phone", description="A phone", user=self.user,
+            listing_type='item_sale', category=self.category,
+            subcategory=self.subcategory, price=100, condition='good')
+        for row in [{'id': listing.id, 'price': '80.00'},
+                    # Checked with the stored condition
+                    {'id': listing.id, 'listing_type': 'item_wanted'}]:
+            response = self.client.post(
+                self.url, {'listings': [row]}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        listing.refresh_from_db()
+        self.assertEqual(listing.price, 80)
+        self.assertEqual(listing.listing_type, 'item_wanted')
+        self.assertEqual(listing.title, "Phone")
+        self.assertEqual(listing.condition, 'good')
+        self.assertEqual(listing.subcategory, self.subcategory)
+
+        response = self.client.post(self.url, {'listings': [
+            {'id': listing.id, 'listing_type': 'event'},
+            {'id': listing.id, 'price': '70.00'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('event_date', response.data['errors'][0])
+        self.assertIn('id', response.data['errors'][1])
+
+    def test_partial_update_of_category(self):
+        tablets = Subcategory.objects.create(
+            name="Tablets", category=self.category)
+        clothing = Category.objects.create(name="Clothing")
+        shirts = Subcategory.objects.create(name="Shirts", category=clothing)
+        listing = Listing.objects.create(
+            title="Phone", description="A phone", user=self.user,
+            listing_type='item_sale', category=self.category,
+            subcategory=self.subcategory, price=100, condition='good')
+
+        # A subcategory alone is looked up in the listing's category
+        response = self.client.post(self.url, {'listings': [
+            {'id': listing.id, 'subcategory': "Tablets"}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        listing.refresh_from_db()
+        self.assertEqual(listing.category, self.category)
+        self.assertEqual(listing.subcategory, tablets)
+
+        # A category alone must fit the listing's subcategory
+        response = self.client.post(self.url, {'listings': [
+            {'id': listing.id, 'category': "Clothing"}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('subcategory', response.data['errors'][0])
+        listing.refresh_from_db()
+        self.assertEqual(listing.subcategory, tablets)
+
+        response = self.client.post(self.url, {'listings': [
+            {'id': listing.id, 'category': "Clothing",
+             'subcategory': "Shirts"}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        listing.refresh_from_db()
+        self.assertEqual(listing.category, clothing)
+        self.assertEqual(listing.subcategory, shirts)
+
+    @override_settings(LISTING_IMPORT_MAX=2)
+    def test_import_validation(self):
+        for data in [{}, {'listings': []}, {'listings': [self.row()] * 3}]:
+            response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+    def test_import_command(self):
+        path = os.path.join(test_static_root, 'import.csv')
+        self.addCleanup(os.remove, path)
+        with open(path, 'w', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=[
+                'title', 'description', 'listing_type', 'category',
+                'price', 'condition', 'image_urls'])
+            writer.writeheader()
+            writer.writerow(self.row(category="Electronics", image_urls=(
+                "https://example.com/1.jpg https://example.com/2.jpg")))
+            writer.writerow(self.row(title="Broken", condition=''))
+            writer.writerow(self.row(title="Tablet"))
+
+        err = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('import_listings', path, '--user',
+                         self.user.email, stderr=err)
+        self.assertIn('Line 3', err.getvalue())
+        self.assertFalse(Listing.objects.exists())
+
+        out = StringIO()
+        call_command('import_listings', path, '--user', self.user.email,
+                     '--skip-invalid', '--batch-size', '2',
+                     stdout=out, stderr=StringIO())
+        self.assertIn('Created 2, updated 0, skipped 1', out.getvalue())
+        self.assertEqual(
+            sorted(Listing.objects.values_list('title', flat=True)),
+            ["Phone", "Tablet"])
+        self.assertEqual(Task.objects.filter(
+            name='listings.tasks.import_listing_image').count(), 2)
+
+
+class TrendingListingsTest(TestCase):
+    """
+    Test cases for trending scores, their update job and endpoint.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="seller", email="seller@example.com",
+            password="testpass123")
+        self.category = Category.objects.create(name="Electronics")
+        self.viewed = self.create_listing(
+            category=self.category, location="Springfield")
+        self.favorited = self.create_listing(location="Shelbyville")
+        self.discussed = self.create_listing(category=self.category)
+        self.quiet = self.create_listing(category=self.category)
+        self.client = APIClient()
+        self.url = reverse('listing-trending')
+
+    def create_listing(self, **kwargs):
+        return Listing.objects.create(
+            title="Listing", description="Description", user=self.user,
+            **kwargs)
+
+    def get_trending(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in response.data]
+
+    def test_scores_decay(self):
+        now = timezone.now()
+        old = event_score(20, now - timedelta(
+            hours=2 * settings.TRENDING_HALF_LIFE_HOURS))
+        self.assertAlmostEqual(current_score(old, now), 5)
+        self.assertAlmostEqual(
+            current_score(add_scores(old, event_score(3, now)), now), 8)
+        self.assertEqual(add_scores(None, old), old)
+
+    def test_update_counts_new_activity_only(self):
+        Listing.objects.filter(pk=self.viewed.pk).update(view_count=20)
+        Listing.objects.filter(pk=self.favorited.pk).update(favorite_count=1)
+        Conversation.objects.create(listing=self.discussed)
+        self.assertEqual(update_trending_scores(), 3)
+        self.assertEqual(self.get_trending(), [
+            self.viewed.id, self.discussed.id, self.favorited.id])
+        self.assertEqual(update_trending_scores(), 0)
+
+        # Two half-lives later, 20 views count as 5, less than 6 new ones
+        TrendingScore.objects.filter(listing=self.viewed).update(
+            score=event_score(20, timezone.now() - timedelta(
+                hours=2 * settings.TRENDING_HALF_LIFE_HOURS)))
+        Listing.objects.filter(pk=self.quiet.pk).update(view_count=6)
+        self.assertEqual(update_trending_scores(), 1)
+        self.assertEqual(self.get_trending()[:2],
+                         [self.discussed.id, self.quiet.id])
+
+    def test_late_conversations_are_counted(self):
+        Listing.objects.filter(pk=self.viewed.pk).update(view_count=1)
+        self.assertEqual(update_trending_scores(), 1)
+        # Started before the last update but committed after it
+        conversation = Conversation.objects.create(listing=self.discussed)
+        Conversation.objects.filter(pk=conversation.pk).update(
+            created_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(update_trending_scores(), 1)
+        self.assertEqual(self.get_trending(),
+                         [self.discussed.id, self.viewed.id])
+        self.assertEqual(update_trending_scores(), 0)
+
+    def test_filters_and_limit(self):
+        for views, listing in enumerate([
+                self.viewed, self.favorited, self.discussed], start=1):
+            Listing.objects.filter(pk=listing.pk).update(view_count=views)
+        self.discussed.set_status('sold')
+        self.discussed.save()
+        update_trending_scores()
+        self.assertEqual(self.get_trending(),
+                         [self.favorited.id, self.viewed.id])
+        self.assertEqual(self.get_trending(category=self.category.id),
+                         [self.viewed.id])
+        self.assertEqual(self.get_trending(location="shelby"),
+                         [self.favorited.id])
+        self.assertEqual(self.get_trending(limit=1), [self.favorited.id])
+
+
+class ListingAnalyticsTest(TestCase):
+    """
+    Test cases for buffered listing analytics and the seller endpoint.
+    """
+
+    def setUp(self):
+        events.clear()
+        self.seller = User.objects.create_user(
+            username="seller", email="seller@example.com",
+            password="testpass123")
+        self.buyer = User.objects.create_user(
+            username="buyer", email="buyer@example.com",
+            password="testpass123")
+        self.listing = Listing.objects.create(
+            title="Phone", description="A phone", user=self.seller)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.buyer)
+        self.today = timezone.now().date()
+
+    def test_events_are_buffered_then_written(self):
+        detail = reverse('listing-detail', args=[self.listing.id])
+        self.client.get(detail)
+        self.client.get(detail)
+        self.client.post(reverse('favorite-toggle', args=[self.listing.id]))
+        response = self.client.post(reverse('conversation-list-create'),
+                                    {'listing_id': self.listing.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(ListingDailyStats.objects.exists())
+
+        self.assertEqual(events.flush(), 1)
+        self.client.get(detail)
+        events.flush()
+        stats = ListingDailyStats.objects.get()
+        self.assertEqual(stats.date, self.today)
+        self.assertEqual((stats.views, stats.favorites, stats.contacts),
+                         (3, 1, 1))
+
+    @override_settings(ANALYTICS_BUFFER_SIZE=2)
+    def test_full_buffer_is_written(self):
+        other = Listing.objects.create(
+            title="Bike", description="A bike", user=self.seller)
+        record_event(self.listing.id, 'views')
+        self.assertFalse(ListingDailyStats.objects.exists())
+        record_event(other.id, 'views')
+        self.assertEqual(ListingDailyStats.objects.count(), 2)
+
+    def test_events_of_deleted_listings_are_dropped(self):
+        record_event(self.listing.id, 'views')
+        self.listing.delete()
+        self.assertEqual(events.flush(), 0)
+        with self.assertRaises(ValueError):
+            record_event(self.listing.id, 'clicks')
+
+    def test_seller_stats(self):
+        other = Listing.objects.create(
+            title="Bike", description="A bike", user=self.buyer)
+        ListingDailyStats.objects.create(
+            listing=self.listing, date=self.today, views=5, favorites=1)
+        ListingDailyStats.objects.create(
+            listing=self.listing, date=self.today - timedelta(days=2),
+            views=2, contacts=1)
+        ListingDailyStats.objects.create(
+            listing=self.listing, date=self.today - timedelta(days=3),
+            views=7)
+        ListingDailyStats.objects.create(
+            listing=other, date=self.today, views=9)
+
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.get(reverse('listing-analytics'), {'days': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [listing] = response.data['results']
+        self.assertEqual(listing['id'], self.listing.id)
+        self.assertEqual(listing['title'], "Phone")
+        self.assertEqual(listing['series'], [
+            {'date': self.today - timedelta(days=2),
+             'views': 2, 'favorites': 0, 'contacts': 1},
+            {'date': self.today - timedelta(days=1),
+             'views': 0, 'favorites': 0, 'contacts': 0},
+            {'date': self.today, 'views': 5, 'favorites': 1, 'contacts': 0},
+        ])
+
+        for days in ['0', '1000', 'week']:
+            response = self.client.get(
+                reverse('listing-analytics'), {'days': days})
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(prune_listing_stats(days=2), 1)
+
+
+class SavedSearchTest(TestCase):
+    """
+    Test cases for saved searches, their matching and alerts.
+    """
+
+    def setUp(self):
+        self.seller = User.objects.create_user(
+            username="seller", email="seller@example.com",
+            password="testpass123")
+        self.buyer = User.objects.create_user(
+            username="buyer", email="buyer@example.com",
+            password="testpass123")
+        Profile.objects.create(user=self.seller)
+        self.electronics = Category.objects.create(name="Electronics")
+        self.phones = Subcategory.objects.create(
+            name="Phones", category=self.electronics)
+        self.furniture = Category.objects.create(name="Furniture")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.buyer)
+        self.url = reverse('saved-search-list')
+
+    def save_search(self, **data):
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return SavedSearch.objects.get(pk=response.data['id'])
+
+    def test_searches_are_indexed_by_price_bucket(self):
+        search = self.save_search(
+            name="Phones", category=self.electronics.id, min_price=100,
+            max_price=300)
+        self.assertEqual(
+            sorted(search.keys.values_list('price_bucket', flat=True)),
+            [7, 8, 9])
+        self.assertEqual(
+            list(self.save_search(min_price=100).keys.values_list(
+                'price_bucket', flat=True)), [None])
+        self.assertEqual(
+            list(self.save_search(max_price=1000000).keys.values_list(
+                'price_bucket', flat=True)), [None])
+
+        response = self.client.patch(
+            reverse('saved-search-detail', args=[search.id]),
+            {'max_price': 150}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(search.keys.values_list('price_bucket', flat=True)),
+            [7, 8])
+
+    @override_settings(SAVED_SEARCH_MAX_PER_USER=1)
+    def test_validation(self):
+        for data in [
+            {'category': self.furniture.id, 'subcategory': self.phones.id},
+            {'min_price': 10, 'max_price': 5},
+        ]:
+            response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+        self.save_search(search="sofa")
+        response = self.client.post(self.url, {'search': "bike"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_searches_are_private(self):
+        search = self.save_search(search="sofa")
+        self.client.force_authenticate(user=self.seller)
+        self.assertEqual(self.client.get(self.url).data, [])
+        response = self.client.delete(
+            reverse('saved-search-detail', args=[search.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_new_listings_are_matched_and_alerted(self):
+        phones = self.save_search(
+            name="Cheap phones", category=self.electronics.id,
+            subcategory=self.phones.id, min_price=100, max_price=300)
+        iphones = self.save_search(search="iphone")
+        furniture = self.save_search(category=self.furniture.id)
+        self.save_search(listing_type='job')
+        self.client.force_authenticate(user=self.seller)
+        self.save_search(search="iphone")
+
+        response = self.client.post(reverse('listing-list'), {
+            'title': "iPhone 12", 'description': "Barely used",
+            'category': self.electronics.id, 'subcategory': self.phones.id,
+            'price': '250.00', 'listing_type': 'item_sale',
+            'condition': 'good',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        listing = Listing.objects.get(pk=response.data['id'])
+        # The furniture search is not even a candidate
+        candidates = get_candidate_searches(
+            self.electronics.id, 'item_sale', 8)
+        self.assertIn(phones.id, candidates)
+        self.assertNotIn(furniture.id, candidates)
+        self.assertEqual(
+            set(SavedSearchMatch.objects.values_list('search', 'listing')),
+            {(phones.id, listing.id), (iphones.id, listing.id)})
+
+        self.assertEqual(send_saved_search_alerts(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.buyer.email])
+        self.assertEqual(mail.outbox[0].body.count("iPhone 12"), 1)
+        self.assertFalse(SavedSearchMatch.objects.exists())
+        self.assertEqual(send_saved_search_alerts(), 0)
+
+
+class SimilarListingsTest(TestCase):
+    """
+    Test cases for the similar listings table, its refresh and endpoint.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="seller", email="seller@example.com",
+            password="testpass123")
+        Profile.objects.create(user=self.user)
+        self.sports = Category.objects.create(name="Sports")
+        self.furniture = Category.objects.create(name="Furniture")
+        self.red_bike = self.create_listing(
+            "Red mountain bike", "Mountain bike with disc brakes",
+            self.sports)
+        self.blue_bike = self.create_listing(
+            "Blue mountain bike", "Hardtail mountain bike, disc brakes",
+            self.sports)
+        self.road_bike = self.create_listing(
+            "Road bike", "Light road bike", self.sports)
+        self.sofa = self.create_listing(
+            "Red sofa", "Comfortable three seat sofa", self.furniture)
+        self.client = APIClient()
+
+    def create_listing(self, title, description, category, **kwargs):
+        return Listing.objects.create(
+            title=title, description=description, user=self.user,
+            category=category, **kwargs)
+
+    def get_similar(self, listing):
+        response = self.client.get(
+            reverse('listing-similar', args=[listing.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in response.data]
+
+    def test_build_ranks_by_similarity(self):
+        closed = self.create_listing(
+            "Green mountain bike", "Mountain bike", self.sports,
+            status='sold')
+        self.assertEqual(build_similar_listings(), 4)
+        similar = self.get_similar(self.red_bike)
+        self.assertEqual(similar[:2], [self.blue_bike.id, self.road_bike.id])
+        self.assertNotIn(closed.id, similar)
+        scores = list(SimilarListing.objects.filter(
+            listing=self.red_bike).order_by('rank').values_list(
+                'score', flat=True))
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    @override_settings(SIMILAR_LISTINGS_COUNT=2)
+    def test_rebuild_drops_inactive_listings(self):
+        build_similar_listings()
+        Listing.objects.update(view_count=F('id'))
+        update_trending_scores()
+        self.assertEqual(len(self.get_similar(self.red_bike)), 2)
+        self.blue_bike.set_status('sold')
+        self.blue_bike.save()
+        self.assertNotIn(self.blue_bike.id, self.get_similar(self.red_bike))
+        build_similar_listings()
+        Listing.objects.update(view_count=F('id'))
+        update_trending_scores()
+        self.assertFalse(SimilarListing.objects.filter(
+            listing=self.blue_bike).exists())
+        self.assertEqual(self.get_similar(self.red_bike),
+                         [self.road_bike.id, self.sofa.id])
+
+    @override_settings(SIMILAR_LISTINGS_COUNT=2)
+    def test_new_listing_is_refreshed(self):
+        build_similar_listings()
+        Listing.objects.update(view_count=F('id'))
+        update_trending_scores()
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('listing-list'), {
+            'title': "Red mountain bike", 'description': (
+                "Mountain bike with disc brakes, like new"),
+            'category': self.sports.id,
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        new_id = response.data['id']
+        self.assertEqual(
+            self.get_similar(Listing.objects.get(pk=new_id))[0],
+            self.red_bike.id)
+        self.assertEqual(self.get_similar(self.red_bike)[0], new_id)
+        self.assertNotIn(new_id, self.get_similar(self.sofa))
+
+
+class IndexAdvisorCommandTest(TestCase):
+    """
+    Test case for the index_advisor management command.
+    """
+
+    def test_hot_queries_use_indexes(self):
+        """
+        Test that every representative query shape uses an index.
+        """
+        out = StringIO()
+        call_command('index_advisor', '--fail-on-issues', stdout=out)
+        self.assertIn('listing-list: ok', out.getvalue())
+        self.assertIn('review-list: ok', out.getvalue())
+
+
+@override_settings(LISTING_CHANGES_DELAY=0)
+class ListingQueryBudgetTest(QueryBudgetTestCase):
+    """
+    Query budgets of the listings endpoints, which must not grow with
+    the number of listings, images, favorites or categories.
+    """
+    urls_module = 'listings.urls'
+    exempt = {'api-root'}
+    budgets = {
+        'listing-list': 4,
+        'listing-detail': 4,
+        'listing-status-update': 18,
+        'listing-renew': 12,
+        'listing-changes': 4,
+        'listing-batch': 4,
+        'listing-analytics': 2,
+        'listing-trending': 4,
+        'listing-similar': 4,
+        'listing-export': 3,
+        'listing-bulk-import': 20,
+        'category-list': 2,
+        'category-detail': 2,
+        'category-tree': 3,
+        'subcategory-list': 2,
+        'subcategory-detail': 2,
+        'subcategory-by-category': 2,
+        'my-listings': 4,
+        'saved-search-list': 2,
+        'saved-search-detail': 2,
+        'favorite-list': 3,
+        'favorite-toggle': 16,
+    }
+
+    def setUp(self):
+        # Staff, for the export
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com",
+            password="testpass123", is_staff=True)
+        self.seller = User.objects.create_user(
+            username="seller", email="seller@example.com",
+            password="testpass123")
+        Profile.objects.create(user=self.user)
+        Profile.objects.create(user=self.seller)
+        self.authenticate(self.user)
+        self.listings = []
+        self.own_listings = []
+        self.category_names = []
+        self.saved_searches = []
+        use_test_cloud(self)
+
+    def grow(self, size):
+        """
+        Add categories and listings of both users with an image each;
+        the user favorites and has a conversation about the seller's.
+        """
+        for i in range(len(self.listings), size):
+            category = Category.objects.create(name=f"Category {i}")
+            subcategory = Subcategory.objects.create(
+                name=f"Subcategory {i}", category=category)
+            self.category_names.append((category.name, subcategory.name))
+            for owner in (self.seller, self.user):
+                listing = Listing.objects.create(
+                    title=f"Listing {i}", description="Description",
+                    user=owner, category=category, subcategory=subcategory,
+                    price=10, condition="good")
+                ListingImage.objects.create(
+                    listing=listing, image=f"listing-{listing.id}")
+            listing.favorited_by.add(self.seller)
+            self.own_listings.append(listing)
+            self.saved_searches.append(SavedSearch.objects.create(
+                user=self.user, category=category, subcategory=subcategory,
+                max_price=i * 10))
+            ListingDailyStats.objects.create(
+                listing=listing, date=timezone.now().date(), views=i)
+            ArchivedListing.objects.create(
+                id=10000 + i, title=f"Archived {i}", description="",
+                user=self.user, category=category, subcategory=subcategory,
+                status='sold', created_at=listing.created_at,
+                updated_at=listing.updated_at)
+            seller_listing = Listing.objects.filter(
+                user=self.seller).latest('id')
+            seller_listing.favorited_by.add(self.user)
+            conversation = Conversation.objects.create(listing=seller_listing)
+            conversation.participants.add(self.user, self.seller)
+            self.listings.append(seller_listing)
+        self.category = self.listings[0].category
+        build_similar_listings()
+        Listing.objects.update(view_count=F('id'))
+        update_trending_scores()
+
+    def request_listing_list(self):
+        return self.client.get(reverse('listing-list'))
+
+    def request_listing_detail(self):
+        return self.client.get(
+            reverse('listing-detail', args=[self.listings[0].id]))
+
+    def request_listing_status_update(self):
+        listing = Listing.objects.filter(user=self.user).first()
+        return self.client.patch(
+            reverse('listing-status-update', args=[listing.id]),
+            {'status': 'sold'}, format='json')
+
+    def request_listing_renew(self):
+        return self.client.post(
+            reverse('listing-renew'),
+            {'ids': [listing.id for listing in self.own_listings]},
+            format='json')
+
+    def request_listing_changes(self):
+        return self.client.get(reverse('listing-changes'))
+
+    def request_listing_bulk_import(self):
+        rows = [{
+            'title': f"Imported {subcategory}", 'description': "Imported",
+            'listing_type': 'item_sale', 'price': '10.00',
+            'condition': 'good', 'category': category,
+            'subcategory': subcategory,
+            'image_urls': ["https://example.com/image.jpg"],
+        } for category, subcategory in self.category_names]
+        rows += [{'id': listing.id, 'title': "Updated",
+                  'description': "Updated"}
+                 for listing in self.own_listings]
+        return self.client.post(
+            reverse('listing-bulk-import'), {'listings': rows},
+            format='json')
+
+    def request_listing_batch(self):
+        ids = [listing.id for listing in self.listings + self.own_listings]
+        return self.client.get(
+            reverse('listing-batch'), {'ids': ','.join(map(str, ids))})
+
+    def request_listing_trending(self):
+        return self.client.get(reverse('listing-trending'))
+
+    def request_listing_analytics(self):
+        return self.client.get(reverse('listing-analytics'))
+
+    def request_listing_similar(self):
+        return self.client.get(
+            reverse('listing-similar', args=[self.listings[0].id]))
+
+    def request_listing_export(self):
+        response = self.client.get(reverse('listing-export'))
+        # The listings are read while the response is streamed
+        b''.join(response.streaming_content)
+        return response
+
+    def request_category_list(self):
+        return self.client.get(reverse('category-list'))
+
+    def request_category_detail(self):
+        return self.client.get(
+            reverse('category-detail', args=[self.category.id]))
+
+    def request_category_tree(self):
+        # Measure building the tree; the changes of grow() are never
+        # committed, so they do not clear the cache
+        clear_category_tree()
+        return self.client.get(reverse('category-tree'))
+
+    def request_subcategory_list(self):
+        return self.client.get(reverse('subcategory-list'))
+
+    def request_subcategory_detail(self):
+        return self.client.get(reverse(
+            'subcategory-detail', args=[self.listings[0].subcategory_id]))
+
+    def request_subcategory_by_category(self):
+        return self.client.get(
+            reverse('subcategory-by-category', args=[self.category.id]))
+
+    def request_my_listings(self):
+        return self.client.get(reverse('my-listings'))
+
+    def request_saved_search_list(self):
+        return self.client.get(reverse('saved-search-list'))
+
+    def request_saved_search_detail(self):
+        return self.client.get(reverse(
+            'saved-search-detail', args=[self.saved_searches[0].id]))
+
+    def request_favorite_list(self):
+        return self.client.get(reverse('favorite-list'))
+
+    def request_favorite_toggle(self):
+        return self.client.post(
+            reverse('favorite-toggle', args=[self.listings[0].id]))
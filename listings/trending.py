@@ -0,0 +1,145 @@
+"""
+Time-decayed trending scores of listings.
+
+Views, favorites and new conversations count towards a listing's
+popularity with weights from TRENDING_WEIGHTS, and each contribution
+halves every TRENDING_HALF_LIFE_HOURS. Rather than decaying every
+score on every update, contributions are scaled up by the time elapsed
+since a fixed epoch, and scores are stored as base-2 logarithms so they
+never overflow: ordering by the stored score orders by popularity now,
+and only listings with new activity are written.
+
+Views and favorites are not recorded individually, so the update job
+compares the listings' counters with the values it saw last time and
+counts the difference as activity at the time of the update.
+Conversations are counted the same way, so ones committed late are not
+missed, and each new one is scored at the time it was started.
+"""
+
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from messaging.models import Conversation
+from taskqueue.batching import DEFAULT_BATCH_SIZE
+from .models import Listing, TrendingScore
+
+
+def decay_units(moment):
+    """Return the number of half-lives from the Unix epoch to ``moment``."""
+    return moment.timestamp() / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def add_scores(first, second):
+    """
+    Add two log2 scores, i.e. return log2(2**first + 2**second) without
+    overflowing. None stands for no score.
+    """
+    if first is None:
+        return second
+    if second is None:
+        return first
+    high, low = max(first, second), min(first, second)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def event_score(weight, moment):
+    """Return the log2 score of activity of ``weight`` at ``moment``."""
+    return math.log2(weight) + decay_units(moment)
+
+
+def current_score(score, now=None):
+    """Return the popularity at ``now`` of a stored log2 score."""
+    return 2 ** (score - decay_units(now or timezone.now()))
+
+
+def count_conversations(listing):
+    """Return an expression counting the conversations of ``listing``."""
+    return Coalesce(Subquery(
+        Conversation.objects.filter(listing=OuterRef(listing))
+        .values('listing').annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def update_trending_scores(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Add the activity since the last update to the trending scores.
+
+    Only listings whose view, favorite or conversation counts changed
+    since the last update are written.
+
+    Returns:
+        int: Number of scores updated or created.
+    """
+    now = timezone.now()
+    weights = settings.TRENDING_WEIGHTS
+
+    updated = list(TrendingScore.objects.annotate(
+        views=F('listing__view_count'),
+        favorites=F('listing__favorite_count'),
+        conversation_count=count_conversations('listing_id'),
+    ).filter(
+        ~Q(views_seen=F('views'), favorites_seen=F('favorites'),
+           conversations_seen=F('conversation_count'))
+    ).only('listing_id', 'score', 'views_seen', 'favorites_seen',
+           'conversations_seen'))
+    created = []
+    for listing_id, views, favorites, conversations in Listing.objects \
+            .annotate(conversation_count=count_conversations('pk')).filter(
+                Q(view_count__gt=0) | Q(favorite_count__gt=0)
+                | Q(conversation_count__gt=0),
+                trending__isnull=True,
+            ).values_list('pk', 'view_count', 'favorite_count',
+                          'conversation_count'):
+        trending = TrendingScore(listing_id=listing_id, score=None)
+        trending.views = views
+        trending.favorites = favorites
+        trending.conversation_count = conversations
+        created.append(trending)
+
+    # The newest conversations of each listing are the new ones
+    new_conversations = {
+        trending.listing_id:
+            trending.conversation_count - trending.conversations_seen
+        for trending in updated + created
+        if trending.conversation_count > trending.conversations_seen
+    }
+    started = {}
+    for listing_id, created_at in Conversation.objects.filter(
+            listing_id__in=list(new_conversations)).order_by(
+            'listing_id', '-created_at').values_list(
+            'listing_id', 'created_at'):
+        times = started.setdefault(listing_id, [])
+        if len(times) < new_conversations[listing_id]:
+            times.append(created_at)
+
+    for trending in updated + created:
+        score = trending.score
+        views = trending.views - trending.views_seen
+        favorites = trending.favorites - trending.favorites_seen
+        if views > 0:
+            score = add_scores(
+                score, event_score(views * weights['view'], now))
+        if favorites > 0:
+            score = add_scores(
+                score, event_score(favorites * weights['favorite'], now))
+        for created_at in started.get(trending.listing_id, []):
+            score = add_scores(score, event_score(
+                weights['conversation'], min(created_at, now)))
+        trending.score = score
+        trending.views_seen = trending.views
+        trending.favorites_seen = trending.favorites
+        trending.conversations_seen = trending.conversation_count
+        trending.updated_at = now
+
+    with transaction.atomic():
+        TrendingScore.objects.bulk_update(
+            updated, ['score', 'views_seen', 'favorites_seen',
+                      'conversations_seen', 'updated_at'],
+            batch_size=batch_size)
+        TrendingScore.objects.bulk_create(created, batch_size=batch_size)
+    return len(updated) + len(created)
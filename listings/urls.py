@@ -6,16 +6,37 @@ router = DefaultRouter()
 router.register(r'listings', views.ListingViewSet)
 
 urlpatterns = [
+    # Before the router, whose detail route would match these
+    path('listings/renew/', views.ListingRenewView.as_view(),
+         name='listing-renew'),
+    path('listings/changes/', views.ListingChangesView.as_view(),
+         name='listing-changes'),
+    path('listings/trending/', views.TrendingListingsView.as_view(),
+         name='listing-trending'),
+    path('listings/batch/', views.ListingBatchView.as_view(),
+         name='listing-batch'),
+    path('listings/analytics/', views.ListingAnalyticsView.as_view(),
+         name='listing-analytics'),
+    path('listings/bulk/', views.ListingBulkImportView.as_view(),
+         name='listing-bulk-import'),
+    path('listings/export/', views.ListingExportView.as_view(),
+         name='listing-export'),
+
     # Router URLs (for ListingViewSet)
     path('', include(router.urls)),
     path('listings/<int:pk>/update-status/',
          views.ListingStatusUpdateView.as_view(),
          name='listing-status-update'),
 
+    path('listings/<int:pk>/similar/', views.ListingSimilarView.as_view(),
+         name='listing-similar'),
+
     # Category URLs
     path('categories/', views.CategoryList.as_view(), name='category-list'),
     path('categories/<int:pk>/', views.CategoryDetail.as_view(),
          name='category-detail'),
+    path('category-tree/', views.CategoryTreeView.as_view(),
+         name='category-tree'),
 
     # Subcategory URLs
     path('subcategories/', views.SubcategoryList.as_view(),
@@ -29,6 +50,12 @@ urlpatterns = [
     # My Listings URL
     path('my-listings/', views.MyListingsView.as_view(), name='my-listings'),
 
+    # Saved search URLs
+    path('saved-searches/', views.SavedSearchList.as_view(),
+         name='saved-search-list'),
+    path('saved-searches/<int:pk>/', views.SavedSearchDetail.as_view(),
+         name='saved-search-detail'),
+
     # Favorite Listings URLs
     path('favorites/', views.FavoriteListView.as_view(), name='favorite-list'),
     path('listings/<int:pk>/favorite/',
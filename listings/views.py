@@ -1,4 +1,11 @@
-from django.db.models import Q
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from rest_framework import (
     generics, permissions, status,
     viewsets, filters as drf_filters
@@ -7,14 +14,27 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Category, Subcategory, Listing, ListingImage
+from .models import (
+    ArchivedListing, Category, Subcategory, Listing, ListingChange,
+    SavedSearch, adjust_active_listings
+)
 from .serializers import (
+    ArchivedListingSerializer,
     CategorySerializer,
     SubcategorySerializer,
-    ListingSerializer
+    ListingSerializer,
+    SavedSearchSerializer
 )
-from cloudinary import uploader
+from .analytics import get_seller_stats, record_event
+from .category_tree import get_category_tree
+from .export import EXPORT_FORMATS, export_listings
 from .filters import ListingFilter
+from .imports import import_listings
+from .tasks import (
+    delete_cloudinary_image, enqueue_image_upload, match_saved_searches,
+    refresh_similar_listings
+)
+from profiles.tasks import update_listing_counts
 
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -67,8 +87,10 @@ class ListingViewSet(viewsets.ModelViewSet):
         Save the listing with the authenticated user
         and set status to 'active'.
         """
-        serializer.save(user=self.request.user, status='active')
-        self.request.user.profile.update_listing_counts()
+        listing = serializer.save(user=self.request.user, status='active')
+        update_listing_counts.enqueue(user_id=self.request.user.pk)
+        refresh_similar_listings.enqueue(listing_ids=[listing.pk])
+        match_saved_searches.enqueue(listing_ids=[listing.pk])
 
     def get_queryset(self):
         """
@@ -83,10 +105,9 @@ class ListingViewSet(viewsets.ModelViewSet):
                 Q(category__name__icontains=search_term) |
                 Q(subcategory__name__icontains=search_term)
             )
-        if self.action == 'list':
-            queryset = queryset.select_related(
-                'user', 'category', 'subcategory')
-            queryset = queryset.prefetch_related('images')
+        if self.action in ('list', 'retrieve'):
+            queryset = ListingSerializer.setup_eager_loading(
+                queryset, self.request.user)
         return queryset
 
     def update(self, request, *args, **kwargs):
@@ -106,7 +127,8 @@ class ListingViewSet(viewsets.ModelViewSet):
         if getattr(instance, '_prefetched_objects_cache', None):
             instance._prefetched_objects_cache = {}
 
-        instance.user.profile.update_listing_counts()
+        update_listing_counts.enqueue(user_id=instance.user_id)
+        refresh_similar_listings.enqueue(listing_ids=[instance.pk])
         return Response(serializer.data)
 
     def _handle_image_updates(self, instance, data):
@@ -125,16 +147,15 @@ class ListingViewSet(viewsets.ModelViewSet):
 
         # Add new images
         for image in new_images:
-            ListingImage.objects.create(listing=instance, image=image)
+            enqueue_image_upload(instance, image)
 
     def _delete_image(self, image):
         """
-        Delete an image from Cloudinary and from the database.
+        Delete an image from the database and queue its removal from
+        Cloudinary.
         """
-        try:
-            uploader.destroy(image.image.public_id)
-        except Exception as e:
-            print(f"Error deleting image from Cloudinary: {e}")
+        if image.image:
+            delete_cloudinary_image.enqueue(public_id=image.image.public_id)
         image.delete()
 
     def perform_destroy(self, instance):
@@ -144,15 +165,19 @@ class ListingViewSet(viewsets.ModelViewSet):
         for image in instance.images.all():
             self._delete_image(image)
         instance.delete()
-        instance.user.profile.update_listing_counts()
+        update_listing_counts.enqueue(user_id=instance.user_id)
 
     def retrieve(self, request, *args, **kwargs):
         """
         Retrieve a listing and increment its view count.
         """
         instance = self.get_object()
+        # Counted with a bulk update: concurrent views do not overwrite
+        # each other, and views are not changes in the change feed
+        Listing.objects.filter(pk=instance.pk).update(
+            view_count=F('view_count') + 1)
         instance.view_count += 1
-        instance.save()
+        record_event(instance.pk, 'views')
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
@@ -182,13 +207,344 @@ class ListingStatusUpdateView(APIView):
             return Response({"error": "Status is required"},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        listing.status = new_status
+        listing.set_status(new_status)
         listing.save()
+        update_listing_counts.enqueue(user_id=listing.user_id)
 
         serializer = ListingSerializer(listing)
         return Response(serializer.data)
 
 
+class ListingRenewView(APIView):
+    """
+    View for renewing several of the user's listings at once.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renewable_statuses = ('active', 'expired')
+
+    def post(self, request):
+        """
+        Give the listings in ``ids`` a fresh lifetime from now and make
+        expired ones active again.
+
+        Listings that are not the user's, are sold, cancelled or drafts,
+        or are events whose date has passed are skipped.
+        """
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids:
+            return Response({"error": "A list of listing ids is required"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > settings.LISTING_RENEW_MAX:
+            return Response(
+                {"error": f"At most {settings.LISTING_RENEW_MAX} listings "
+                          "can be renewed at once"},
+                status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = {int(pk) for pk in ids}
+        except (TypeError, ValueError):
+            return Response({"error": "Listing ids must be integers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        listings = (
+            Listing.objects.filter(
+                user=request.user, pk__in=ids,
+                status__in=self.renewable_statuses)
+            .exclude(listing_type='event', event_date__lte=now)
+            .only('pk', 'listing_type', 'event_date', 'is_active',
+                  'category', 'subcategory')
+        )
+        with transaction.atomic():
+            # One bulk update per expiry date: per listing type, or per
+            # event date
+            by_expiry = {}
+            activated = []
+            for listing in listings.select_for_update():
+                by_expiry.setdefault(
+                    listing.get_expiry_date(now), []).append(listing.pk)
+                if not listing.is_active:
+                    activated.append(
+                        (listing.category_id, listing.subcategory_id))
+            for expires_at, pks in by_expiry.items():
+                Listing.objects.filter(pk__in=pks).update(
+                    status='active', is_active=True, expires_at=expires_at,
+                    updated_at=now)
+            renewed = sorted(pk for pks in by_expiry.values() for pk in pks)
+            ListingChange.objects.record(renewed)
+            adjust_active_listings(added=activated)
+
+        if renewed:
+            update_listing_counts.enqueue(user_id=request.user.pk)
+        return Response({
+            "renewed": renewed,
+            "skipped": sorted(ids.difference(renewed)),
+        }, status=status.HTTP_200_OK)
+
+
+class ListingChangesView(APIView):
+    """
+    Incremental change feed of listings.
+
+    Clients keep the ``next_since`` cursor of the last response and ask
+    for the changes after it, so they download only the listings
+    created, updated, deleted or archived since their last sync.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        """
+        Return up to ``limit`` changes after the ``since`` cursor,
+        oldest first.
+
+        Changed listings are returned in full; deleted and archived ones
+        as tombstones. Changes younger than LISTING_CHANGES_DELAY
+        seconds are held back, since transactions still in flight may
+        commit changes with lower sequence numbers; changes of
+        transactions that commit later are moved past the cursor again
+        (see ``ListingChangeManager.record``).
+        """
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get(
+                'limit', settings.LISTING_CHANGES_PAGE_SIZE))
+        except ValueError:
+            return Response({"error": "since and limit must be integers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.LISTING_CHANGES_MAX_PAGE_SIZE))
+
+        settled = timezone.now() - timedelta(
+            seconds=settings.LISTING_CHANGES_DELAY)
+        changes = []
+        for change in ListingChange.objects.filter(
+                seq__gt=since).order_by('seq')[:limit + 1]:
+            if change.changed_at > settled:
+                break
+            changes.append(change)
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        listings = ListingSerializer.setup_eager_loading(
+            Listing.objects.filter(pk__in=[
+                change.listing_id for change in changes
+                if not change.deleted]),
+            request.user)
+        serialized = {
+            item['id']: item for item in ListingSerializer(
+                listings, many=True, context={'request': request}).data
+        }
+
+        results = []
+        for change in changes:
+            listing = serialized.get(change.listing_id)
+            results.append({
+                'seq': change.seq,
+                'id': change.listing_id,
+                # A listing deleted since its change was read is gone too
+                'deleted': listing is None,
+                'listing': listing,
+            })
+        return Response({
+            'results': results,
+            'next_since': changes[-1].seq if changes else since,
+            'has_more': has_more,
+        })
+
+
+class ListingBatchView(APIView):
+    """
+    View for fetching several listings by id in one request.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        """
+        Return the listings in ``ids`` (comma-separated), in request
+        order, and the ids that do not exist.
+
+        Unlike retrieving a single listing, this does not count as a
+        view.
+        """
+        try:
+            ids = [int(pk) for pk in
+                   request.query_params.get('ids', '').split(',') if pk]
+        except ValueError:
+            return Response({"error": "Listing ids must be integers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        # Duplicates are returned once, at their first position
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return Response({"error": "ids is required"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > settings.LISTING_BATCH_MAX:
+            return Response(
+                {"error": f"At most {settings.LISTING_BATCH_MAX} listings "
+                          "can be fetched at once"},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        listings = ListingSerializer.setup_eager_loading(
+            Listing.objects.filter(pk__in=ids), request.user)
+        serialized = {
+            item['id']: item for item in ListingSerializer(
+                listings, many=True, context={'request': request}).data
+        }
+        return Response({
+            'results': [serialized[pk] for pk in ids if pk in serialized],
+            'missing': [pk for pk in ids if pk not in serialized],
+        })
+
+
+class ListingAnalyticsView(APIView):
+    """
+    View for the daily views, favorites and contacts of the user's
+    listings.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        """
+        Return the daily counts of the last ``days`` days (30 by
+        default) of each of the user's listings with any.
+
+        Counts of the last minute or so may not be written yet.
+        """
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            return Response({"error": "days must be an integer"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= days <= settings.ANALYTICS_MAX_DAYS:
+            return Response(
+                {"error": f"days must be between 1 and "
+                          f"{settings.ANALYTICS_MAX_DAYS}"},
+                status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "results": get_seller_stats(request.user, days),
+        })
+
+
+class ListingBulkImportView(APIView):
+    """
+    View for creating and updating many of the user's listings at once.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        """
+        Import the listings in ``listings``.
+
+        Categories are given by name and images by URL. Rows with an
+        ``id`` update that listing of the user. Nothing is written if
+        any row is invalid; the errors are returned by row index.
+        """
+        rows = request.data.get('listings')
+        if not isinstance(rows, list) or not rows:
+            return Response({"error": "A list of listings is required"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.LISTING_IMPORT_MAX:
+            return Response(
+                {"error": f"At most {settings.LISTING_IMPORT_MAX} listings "
+                          "can be imported at once"},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        result = import_listings(request.user, rows)
+        if result['errors']:
+            return Response({"errors": result['errors']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "created": result['created'],
+            "updated": result['updated'],
+        }, status=status.HTTP_201_CREATED)
+
+
+class ListingExportView(APIView):
+    """
+    Staff-only streaming export of listings as NDJSON or CSV.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        """
+        Stream the listings matching the ListingFilter parameters.
+
+        The format is chosen with ``output`` (ndjson or csv); DRF
+        reserves ``format`` for content negotiation.
+        """
+        export_format = request.query_params.get('output', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"output must be one of "
+                          f"{', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST)
+        filterset = ListingFilter(
+            request.query_params, queryset=Listing.objects.all())
+        if not filterset.is_valid():
+            return Response({"error": filterset.errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            export_listings(filterset.qs, export_format,
+                            chunk_size=settings.LISTING_EXPORT_CHUNK_SIZE),
+            content_type=EXPORT_FORMATS[export_format])
+        filename = f"listings-{timezone.now():%Y%m%d}.{export_format}"
+        response['Content-Disposition'] = \
+            f'attachment; filename="{filename}"'
+        return response
+
+
+class TrendingListingsView(generics.ListAPIView):
+    """
+    View for retrieving the active listings trending now.
+
+    Accepts the ListingFilter parameters, e.g. ``category`` and
+    ``location``, and ``limit``.
+    """
+    serializer_class = ListingSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = ListingFilter
+
+    def get_queryset(self):
+        """
+        Return the active listings with a trending score, read in score
+        order from its index.
+        """
+        return ListingSerializer.setup_eager_loading(
+            Listing.objects.filter(is_active=True, trending__isnull=False)
+            .order_by('-trending__score'),
+            self.request.user)
+
+    def filter_queryset(self, queryset):
+        """Keep the top ``limit`` listings matching the filters."""
+        try:
+            limit = int(self.request.query_params.get(
+                'limit', settings.TRENDING_LISTINGS_COUNT))
+        except ValueError:
+            limit = settings.TRENDING_LISTINGS_COUNT
+        limit = max(1, min(limit, settings.TRENDING_LISTINGS_MAX))
+        return super().filter_queryset(queryset)[:limit]
+
+
+class ListingSimilarView(generics.ListAPIView):
+    """
+    View for retrieving the active listings most similar to a listing.
+    """
+    serializer_class = ListingSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+
+    def get_queryset(self):
+        """
+        Return the precomputed neighbors of the listing, most similar
+        first.
+        """
+        return ListingSerializer.setup_eager_loading(
+            Listing.objects.filter(
+                similar_to__listing_id=self.kwargs['pk'], is_active=True)
+            .order_by('similar_to__rank'),
+            self.request.user)
+
+
 class CategoryList(generics.ListAPIView):
     """
     List all categories.
@@ -205,6 +561,34 @@ class CategoryDetail(generics.RetrieveAPIView):
     serializer_class = CategorySerializer
 
 
+class CategoryTreeView(APIView):
+    """
+    View for the categories with their subcategories and active listing
+    counts.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        """
+        Return the cached category tree.
+
+        The response carries an ETag, and a request whose If-None-Match
+        has it gets an empty 304 response. Clients and proxies must
+        revalidate their copy on every use, so they see category
+        changes as soon as the server does.
+        """
+        etag, tree = get_category_tree()
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')] \
+                or if_none_match.strip() == '*':
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(tree)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+
 class SubcategoryList(generics.ListAPIView):
     """
     List all subcategories.
@@ -257,13 +641,30 @@ class ListingList(generics.ListCreateAPIView):
 
 class MyListingsView(generics.ListAPIView):
     """
-    List all listings created by the authenticated user.
+    List all listings created by the authenticated user, followed by
+    their most recent archived listings.
     """
     serializer_class = ListingSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Listing.objects.filter(user=self.request.user)
+        return ListingSerializer.setup_eager_loading(
+            Listing.objects.filter(user=self.request.user),
+            self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        """
+        List the live listings, then the newest MY_LISTINGS_ARCHIVED_MAX
+        archived ones.
+        """
+        response = super().list(request, *args, **kwargs)
+        archived = (
+            ArchivedListing.objects.filter(user=request.user)
+            .select_related('user', 'category', 'subcategory')
+            .order_by('-created_at')[:settings.MY_LISTINGS_ARCHIVED_MAX]
+        )
+        response.data += ArchivedListingSerializer(archived, many=True).data
+        return response
 
 
 class FavoriteListView(generics.ListAPIView):
@@ -274,7 +675,8 @@ class FavoriteListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return self.request.user.favorite_listings.all()
+        return ListingSerializer.setup_eager_loading(
+            self.request.user.favorite_listings.all(), self.request.user)
 
 
 class FavoriteToggleView(APIView):
@@ -294,12 +696,13 @@ class FavoriteToggleView(APIView):
                             status=status.HTTP_404_NOT_FOUND)
 
         user = request.user
-        if user in listing.favorited_by.all():
+        if listing.favorited_by.filter(pk=user.pk).exists():
             listing.favorited_by.remove(user)
             action = 'unfavorited'
         else:
             listing.favorited_by.add(user)
             action = 'favorited'
+            record_event(listing.pk, 'favorites')
 
         listing.update_favorite_count()
 
@@ -308,3 +711,42 @@ class FavoriteToggleView(APIView):
             "action": action,
             "listing": serializer.data
         }, status=status.HTTP_200_OK)
+
+
+class SavedSearchList(generics.ListCreateAPIView):
+    """
+    View for listing and creating the user's saved searches.
+    """
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(
+            user=self.request.user).order_by('-created_at')
+
+    def create(self, request, *args, **kwargs):
+        """
+        Save a search, up to SAVED_SEARCH_MAX_PER_USER per user.
+        """
+        if self.get_queryset().count() >= settings.SAVED_SEARCH_MAX_PER_USER:
+            return Response(
+                {"error": f"At most {settings.SAVED_SEARCH_MAX_PER_USER} "
+                          "searches can be saved"},
+                status=status.HTTP_400_BAD_REQUEST)
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class SavedSearchDetail(generics.RetrieveUpdateDestroyAPIView):
+    """
+    View for retrieving, updating and deleting one of the user's saved
+    searches.
+    """
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
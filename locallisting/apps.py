@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class LocallistingConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "locallisting"
+
+    def ready(self):
+        # Register the database connection statistics receivers
+        from . import db_pool  # noqa: F401
+
+        if settings.METRICS_ENABLED:
+            from . import metrics
+            metrics.install()
@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_lock = threading.Lock()
+# Per-alias counters shared by all threads of the process
+_opened = defaultdict(int)
+# Per-thread creation time of the current connection, keyed by alias
+_local = threading.local()
+
+
+@receiver(connection_created)
+def track_connection_created(sender, connection, **kwargs):
+    """Count new database connections and remember when they opened."""
+    with _lock:
+        _opened[connection.alias] += 1
+    if not hasattr(_local, 'created_at'):
+        _local.created_at = {}
+    _local.created_at[connection.alias] = time.monotonic()
+
+
+def get_connection_stats():
+    """
+    Return connection statistics of this process for every database.
+
+    Each entry reports the connection mode, whether the current thread
+    holds an open connection and its age, and how many connections the
+    process has opened. With the 'pool' mode the psycopg pool counters
+    (size, available, waiting requests) are included.
+
+    Returns:
+        dict: Statistics keyed by database alias.
+    """
+    now = time.monotonic()
+    created_at = getattr(_local, 'created_at', {})
+    stats = {}
+    for alias in connections:
+        connection = connections[alias]
+        connected = connection.connection is not None
+        entry = {
+            'mode': settings.DATABASE_CONN_MODE,
+            'max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+            'health_checks': connection.settings_dict.get(
+                'CONN_HEALTH_CHECKS', False),
+            'connected': connected,
+            'in_use': connected and connection.in_atomic_block,
+            'age_seconds': (
+                round(now - created_at[alias], 3)
+                if connected and alias in created_at else None
+            ),
+            'opened_total': _opened[alias],
+        }
+        pool = getattr(connection, 'pool', None)
+        if pool is not None:
+            pool_stats = pool.get_stats()
+            entry.update({
+                'pool_size': pool_stats.get('pool_size', 0),
+                'pool_available': pool_stats.get('pool_available', 0),
+                'in_use': (pool_stats.get('pool_size', 0)
+                           - pool_stats.get('pool_available', 0)),
+                'waiting': pool_stats.get('requests_waiting', 0),
+                'waits_total': pool_stats.get('requests_queued', 0),
+                'wait_ms_total': pool_stats.get('requests_wait_ms', 0),
+            })
+        stats[alias] = entry
+    return stats
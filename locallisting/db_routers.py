@@ -0,0 +1,75 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Set per request by ReplicaRoutingMiddleware
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def use_replica(enabled):
+    """
+    Allow or forbid replica reads for the current request context.
+
+    Returns:
+        Token: A token to pass to reset_replica once the request is done.
+    """
+    return _use_replica.set(enabled)
+
+
+def reset_replica(token):
+    """Restore the replica routing state saved by use_replica."""
+    _use_replica.reset(token)
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """
+    Send the user's reads to the primary for REPLICA_STICKINESS_SECONDS,
+    so they always see their own writes despite replication lag.
+
+    The pin is kept in the shared cache (CACHE_BACKEND), so it holds
+    across worker processes; settings refuse replicas without one.
+    """
+    cache.set(_pin_key(user_id), True, settings.REPLICA_STICKINESS_SECONDS)
+
+
+def is_pinned_to_primary(user_id):
+    """Return True if the user wrote recently and must read the primary."""
+    return user_id is not None and cache.get(_pin_key(user_id), False)
+
+
+class PrimaryReplicaRouter:
+    """
+    Database router sending permitted reads to a random replica.
+
+    Reads only go to a replica inside a request marked by
+    ReplicaRoutingMiddleware, and only for models of REPLICA_READ_APPS.
+    Users, tokens and sessions are always read from the primary so that
+    authentication never sees replication lag. Writes and reads outside
+    such requests use the primary ('default') database, and migrations
+    only run on the primary; replicas receive them through replication.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (replicas and _use_replica.get()
+                and model._meta.app_label in settings.REPLICA_READ_APPS):
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,83 @@
+import io
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from locallisting.db_pool import get_connection_stats
+
+
+def build_environ(path, query_string=''):
+    """Return a minimal WSGI environ for a GET request to ``path``."""
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': 'localhost',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+
+def set_persistent(persistent):
+    """Switch every database between per-request and persistent mode."""
+    for connection in connections.all():
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = (
+            settings.DATABASE_CONN_MAX_AGE if persistent else 0)
+        connection.settings_dict['CONN_HEALTH_CHECKS'] = persistent
+
+
+class Command(BaseCommand):
+    """
+    Measure requests per second with and without persistent connections.
+
+    Requests go through the full WSGI handler, so connections are opened
+    and closed exactly as under gunicorn. Run it against PostgreSQL to
+    include the TCP, TLS and authentication cost of new connections.
+    """
+    help = 'Benchmark requests per second with and without ' \
+           'persistent database connections.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Number of requests per mode.')
+        parser.add_argument(
+            '--path', default='/api/listings/categories/',
+            help='URL path to request.')
+
+    def handle(self, *args, **options):
+        handler = WSGIHandler()
+        count = options['requests']
+
+        def start_response(status, headers):
+            if not status.startswith('2'):
+                raise RuntimeError(f"Request failed: {status}")
+
+        for persistent in (False, True):
+            set_persistent(persistent)
+            opened = get_connection_stats()['default']['opened_total']
+            started = time.perf_counter()
+            for _ in range(count):
+                response = handler(build_environ(options['path']),
+                                   start_response)
+                response.close()
+            elapsed = time.perf_counter() - started
+            opened = get_connection_stats()['default']['opened_total'] \
+                - opened
+            mode = 'persistent' if persistent else 'per-request'
+            self.stdout.write(
+                f"{mode}: {count / elapsed:.1f} req/s, "
+                f"{opened} connection(s) opened")
+        set_persistent(settings.DATABASE_CONN_MODE == 'persistent')
@@ -0,0 +1,100 @@
+import json
+from itertools import cycle, islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from locallisting.replay import Replayer, read_request_log
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Replay a recorded request log against a running server.
+
+    The log is a file of JSON lines with ``method``, ``path`` and
+    optionally ``query`` and ``user_id``, such as the output of the
+    'locallisting.timing' logger. Requests of logged-in users are sent
+    with a fresh access token for the same user id, so the database of
+    this process must be the one the server uses (e.g. a staging copy).
+    """
+    help = 'Replay recorded API traffic against a running server and ' \
+           'report throughput, latency percentiles and error rates.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', help='Request log (JSON lines).')
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8000',
+            help='Server to replay against (runserver or gunicorn).')
+        parser.add_argument(
+            '--rate', type=float, default=50,
+            help='Target requests per second; 0 for as fast as possible.')
+        parser.add_argument(
+            '--concurrency', type=int, default=20,
+            help='Number of concurrent connections.')
+        parser.add_argument(
+            '--requests', type=int,
+            help='Number of requests to send, cycling through the log.')
+        parser.add_argument(
+            '--methods', default='GET,HEAD',
+            help='Comma-separated HTTP methods to replay. Logs contain no '
+                 'request bodies, so writes are skipped by default.')
+        parser.add_argument(
+            '--timeout', type=float, default=30,
+            help='Seconds before a request counts as an error.')
+        parser.add_argument(
+            '--output', help='Write the summary as JSON to this file.')
+
+    def get_tokens(self, requests):
+        """Return an access token for every user id in the log."""
+        user_ids = {request.user_id for request in requests
+                    if request.user_id is not None}
+        users = User.objects.filter(id__in=user_ids, is_active=True)
+        return {user.id: str(RefreshToken.for_user(user).access_token)
+                for user in users}
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['log']) as log:
+                requests = read_request_log(
+                    log, options['methods'].split(','))
+        except OSError as e:
+            raise CommandError(f"Could not read {options['log']}: {e}")
+        if not requests:
+            raise CommandError('The log contains no requests to replay.')
+        if options['requests']:
+            requests = list(islice(cycle(requests), options['requests']))
+
+        try:
+            replayer = Replayer(
+                options['url'], rate=options['rate'],
+                concurrency=options['concurrency'],
+                tokens=self.get_tokens(requests),
+                timeout=options['timeout'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"Replaying {len(requests)} requests against {options['url']}...")
+        summary = replayer.run(requests).summary()
+
+        self.stdout.write(
+            f"{'url name':<32} {'reqs':>6} {'req/s':>8} {'err %':>6} "
+            f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+        for url_name, entry in summary['endpoints'].items():
+            self.stdout.write(
+                f"{url_name:<32} {entry['requests']:>6} "
+                f"{entry['throughput']:>8.1f} "
+                f"{entry['error_rate'] * 100:>6.1f} "
+                f"{entry['p50_ms']:>8.1f} {entry['p90_ms']:>8.1f} "
+                f"{entry['p99_ms']:>8.1f}")
+        self.stdout.write(
+            f"Total: {summary['requests']} requests in "
+            f"{summary['elapsed_seconds']}s, {summary['throughput']} req/s, "
+            f"{summary['error_rate'] * 100:.1f}% errors")
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(summary, output, indent=2)
@@ -0,0 +1,145 @@
+import os
+
+from django.db.backends.signals import connection_created
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY,
+    generate_latest, multiprocess, start_http_server
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from .timing import observe_spans
+
+# Set by gunicorn.conf.py; metrics of every worker are then written to
+# files in this directory and aggregated when scraped. A task worker
+# started with the same directory on the same host is included.
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests by URL name.',
+    ['method', 'url_name', 'status'])
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by URL name.',
+    ['url_name'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+DB_QUERIES = Counter(
+    'db_queries_total', 'Database queries by URL name.', ['url_name'])
+DB_CONNECTIONS_OPENED = Counter(
+    'db_connections_opened_total', 'Database connections opened.',
+    ['alias'])
+DB_CONNECTION_WAITING = Gauge(
+    'db_pool_requests_waiting', 'Requests waiting for a pooled connection.',
+    ['alias'], multiprocess_mode='livesum')
+DB_CONNECTION_AGE = Gauge(
+    'db_connection_age_seconds', 'Age of the oldest open connection.',
+    ['alias'], multiprocess_mode='livemax')
+CACHE_LOOKUPS = Counter(
+    'cache_lookups_total', 'Cache lookups by cache name and result.',
+    ['cache', 'result'])
+EXTERNAL_CALL_LATENCY = Histogram(
+    'external_call_duration_seconds',
+    'Latency of external calls (Cloudinary uploads and deletes, SMTP).',
+    ['service'])
+TASKS_RUN = Counter(
+    'tasks_run_total', 'Background tasks run by task name and result.',
+    ['task', 'result'])
+TASK_DURATION = Histogram(
+    'task_duration_seconds', 'Background task run time by task name.',
+    ['task'], buckets=(.05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 300))
+
+# Name -> callable returning the current depth of a background queue
+_queue_depth_providers = {}
+
+
+def register_queue_depth(name, provider):
+    """
+    Report ``provider()`` as the depth of the ``name`` background queue.
+
+    Providers are called by the process serving the scrape, so they
+    should read shared state such as the database.
+    """
+    _queue_depth_providers[name] = provider
+
+
+def record_cache_lookup(cache_name, hit):
+    """Count a cache lookup as a hit or a miss."""
+    CACHE_LOOKUPS.labels(cache_name, 'hit' if hit else 'miss').inc()
+
+
+def record_task(name, succeeded, seconds):
+    """Count a background task run and observe its duration."""
+    TASKS_RUN.labels(name, 'succeeded' if succeeded else 'failed').inc()
+    TASK_DURATION.labels(name).observe(seconds)
+
+
+def update_connection_metrics(stats):
+    """
+    Publish this process's database connection statistics.
+
+    Connections in use are not published: sampled between requests,
+    they would always be about zero.
+    """
+    for alias, entry in stats.items():
+        DB_CONNECTION_WAITING.labels(alias).set(entry.get('waiting', 0))
+        DB_CONNECTION_AGE.labels(alias).set(entry['age_seconds'] or 0)
+
+
+class QueueDepthCollector:
+    """Collect background queue depths at scrape time."""
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            'background_queue_depth', 'Pending jobs per background queue.',
+            labels=['queue'])
+        for name, provider in _queue_depth_providers.items():
+            family.add_metric([name], provider())
+        yield family
+
+
+def get_registry():
+    """
+    Return the registry of this process's metrics, aggregated across
+    processes in multiprocess mode.
+    """
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def generate_metrics():
+    """
+    Return the Prometheus text exposition of all metrics, aggregated
+    across worker processes in multiprocess mode.
+    """
+    output = generate_latest(get_registry())
+    scrape_registry = CollectorRegistry()
+    scrape_registry.register(QueueDepthCollector())
+    return output + generate_latest(scrape_registry)
+
+
+def start_metrics_server(port):
+    """
+    Serve the metrics of a process without the /metrics view, such as
+    the task worker, over HTTP on ``port``.
+
+    The server does not check METRICS_TOKEN, so the port must only be
+    reachable by the Prometheus server.
+    """
+    start_http_server(port, registry=get_registry())
+
+
+def _count_connection_created(sender, connection, **kwargs):
+    DB_CONNECTIONS_OPENED.labels(connection.alias).inc()
+
+
+def _observe_external_call(service, seconds):
+    EXTERNAL_CALL_LATENCY.labels(service).observe(seconds)
+
+
+def install():
+    """Start recording connection and external call metrics."""
+    connection_created.connect(
+        _count_connection_created, dispatch_uid='metrics_connections')
+    observe_spans('cloudinary', _observe_external_call)
+    observe_spans('smtp', _observe_external_call)
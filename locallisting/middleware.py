@@ -0,0 +1,185 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from . import metrics
+from .db_pool import get_connection_stats
+from .db_routers import (
+    is_pinned_to_primary, pin_to_primary, reset_replica, use_replica
+)
+from .timing import start_request_timings, stop_request_timings
+
+timing_logger = logging.getLogger('locallisting.timing')
+
+
+def get_token_user_id(request):
+    """
+    Return the user id of the request's JWT access token, or None.
+
+    The token is only validated, the user is not loaded from the database.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    try:
+        token = authentication.get_validated_token(raw_token)
+    except (InvalidToken, TokenError):
+        return None
+    return token.get(api_settings.USER_ID_CLAIM)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route safe-method reads of the REPLICA_READ_APPS views to replicas.
+
+    A user who sends a write request is pinned to the primary for
+    REPLICA_STICKINESS_SECONDS so they read their own writes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        request.token_user_id = get_token_user_id(request)
+        token = use_replica(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_replica(token)
+
+        if (request.method not in SAFE_METHODS
+                and request.token_user_id is not None):
+            pin_to_primary(request.token_user_id)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.DATABASE_REPLICAS:
+            return None
+        app_label = view_func.__module__.split('.')[0]
+        use_replica(
+            request.method in SAFE_METHODS
+            and app_label in settings.REPLICA_READ_APPS
+            and not is_pinned_to_primary(request.token_user_id)
+        )
+        return None
+
+
+class RequestTimingMiddleware:
+    """
+    Record query count, DB time, serializer time and external call time
+    (Cloudinary, SMTP) for every request.
+
+    The timings are returned as a Server-Timing header and logged as a
+    JSON line on the 'locallisting.timing' logger, which the
+    replay_traffic command can replay; requests over
+    REQUEST_QUERY_BUDGET or REQUEST_LATENCY_BUDGET_MS are logged as
+    warnings. The middleware is removed entirely unless
+    REQUEST_TIMING_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings, token = start_request_timings()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timings.db_wrapper))
+                response = self.get_response(request)
+        finally:
+            stop_request_timings(token)
+
+        total_ms = timings.total * 1000
+        durations = {
+            name: round(seconds * 1000, 2)
+            for name, seconds in timings.durations.items()
+        }
+        response['Server-Timing'] = ', '.join(
+            [f'db;dur={durations.get("db", 0)};desc="{timings.queries} '
+             f'queries"']
+            + [f'{name};dur={duration}'
+               for name, duration in durations.items() if name != 'db']
+            + [f'total;dur={total_ms:.2f}']
+        )
+
+        over_budget = (
+            timings.queries > settings.REQUEST_QUERY_BUDGET
+            or total_ms > settings.REQUEST_LATENCY_BUDGET_MS
+        )
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'query': request.META.get('QUERY_STRING', ''),
+            'user_id': get_token_user_id(request),
+            'url_name': match.url_name if match else None,
+            'status': response.status_code,
+            'queries': timings.queries,
+            'total_ms': round(total_ms, 2),
+            **{f'{name}_ms': value for name, value in durations.items()},
+            'over_budget': over_budget,
+        }
+        if over_budget:
+            timing_logger.warning(json.dumps(record))
+        else:
+            timing_logger.info(json.dumps(record))
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record Prometheus request counts, latency and query counts per URL
+    name, and publish the worker's database connection statistics.
+
+    Removed entirely unless METRICS_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(count_queries))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        url_name = (match and match.url_name) or 'unmatched'
+        metrics.REQUESTS.labels(
+            request.method, url_name, response.status_code).inc()
+        metrics.REQUEST_LATENCY.labels(url_name).observe(elapsed)
+        metrics.DB_QUERIES.labels(url_name).inc(queries)
+        metrics.update_connection_metrics(get_connection_stats())
+        return response
@@ -0,0 +1,302 @@
+"""
+Replay recorded API traffic against a running server with asyncio.
+
+Request logs are JSON lines with at least ``method`` and ``path`` and
+optionally ``query`` and ``user_id``, as written by the
+'locallisting.timing' logger. Requests are sent at a fixed target rate
+(open loop), so a slow server builds up a backlog instead of silently
+lowering the load; latency is measured from each request's scheduled
+send time and therefore includes that queueing delay.
+"""
+
+import asyncio
+import json
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.urls import Resolver404, resolve
+
+
+class ReplayRequest:
+    """One request to replay."""
+
+    def __init__(self, method, path, query='', user_id=None):
+        self.method = method.upper()
+        self.path = path
+        self.query = query or ''
+        self.user_id = user_id
+        try:
+            self.url_name = resolve(path).url_name or 'unnamed'
+        except Resolver404:
+            self.url_name = 'unmatched'
+
+    @property
+    def target(self):
+        return f'{self.path}?{self.query}' if self.query else self.path
+
+
+def read_request_log(lines, methods=('GET', 'HEAD')):
+    """
+    Parse request log lines into ReplayRequests.
+
+    Text before the first '{' (e.g. a log prefix) is ignored, as are
+    lines that are not JSON and requests whose method is not in
+    ``methods``.
+
+    Args:
+        lines (iterable): Log lines.
+        methods (iterable): HTTP methods to replay.
+
+    Returns:
+        list: The ReplayRequests in log order.
+    """
+    methods = {method.upper() for method in methods}
+    requests = []
+    for line in lines:
+        start = line.find('{')
+        if start < 0:
+            continue
+        try:
+            record = json.loads(line[start:])
+        except ValueError:
+            continue
+        if not isinstance(record, dict) or 'path' not in record:
+            continue
+        method = record.get('method', 'GET').upper()
+        if method not in methods:
+            continue
+        path = record['path']
+        query = record.get('query', '')
+        if '?' in path:
+            path, query = path.split('?', 1)
+        requests.append(ReplayRequest(
+            method, path, query, record.get('user_id')))
+    return requests
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    index = max(0, int(round(fraction * len(ordered))) - 1)
+    return ordered[index]
+
+
+class ReplayStats:
+    """Latencies, status codes and errors per URL name."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.started = None
+        self.finished = None
+
+    def record(self, url_name, seconds, status=None):
+        self.latencies[url_name].append(seconds)
+        if status is None or status >= 400:
+            self.errors[url_name] += 1
+        self.statuses[url_name][status or 'error'] += 1
+
+    def summary(self):
+        """
+        Summarize the replay.
+
+        Returns:
+            dict: Overall throughput and, per URL name, request count,
+            throughput, error rate and latency percentiles in ms.
+        """
+        elapsed = max((self.finished or time.perf_counter())
+                      - (self.started or 0), 1e-9)
+        endpoints = {}
+        for url_name, latencies in sorted(self.latencies.items()):
+            latencies_ms = [seconds * 1000 for seconds in latencies]
+            endpoints[url_name] = {
+                'requests': len(latencies),
+                'throughput': round(len(latencies) / elapsed, 2),
+                'error_rate': round(self.errors[url_name] / len(latencies), 4),
+                'statuses': {str(status): count for status, count
+                             in self.statuses[url_name].items()},
+                'p50_ms': round(percentile(latencies_ms, 0.50), 2),
+                'p90_ms': round(percentile(latencies_ms, 0.90), 2),
+                'p99_ms': round(percentile(latencies_ms, 0.99), 2),
+                'max_ms': round(max(latencies_ms), 2),
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        errors = sum(self.errors.values())
+        return {
+            'requests': total,
+            'elapsed_seconds': round(elapsed, 2),
+            'throughput': round(total / elapsed, 2),
+            'error_rate': round(errors / total, 4) if total else 0,
+            'endpoints': endpoints,
+        }
+
+
+class HTTPConnection:
+    """
+    Minimal keep-alive HTTP/1.1 client connection over asyncio streams.
+
+    Only plain HTTP is supported, which is all that runserver and a
+    local gunicorn speak.
+    """
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, target, headers):
+        """
+        Send a request and return its status code.
+
+        A request on a reused connection is retried once on a new one,
+        as the server may have closed the idle connection.
+        """
+        reused = self.writer is not None
+        try:
+            return await asyncio.wait_for(
+                self._request(method, target, headers), self.timeout)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            if not reused:
+                raise
+        except BaseException:
+            await self.close()
+            raise
+        return await self.request(method, target, headers)
+
+    async def _request(self, method, target, headers):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port)
+        lines = [f'{method} {target} HTTP/1.1',
+                 f'Host: {self.host}:{self.port}',
+                 'Connection: keep-alive']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('Connection closed by server')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            pass
+        elif 'content-length' in response_headers:
+            await self.reader.readexactly(
+                int(response_headers['content-length']))
+        elif response_headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await self.reader.read()
+            await self.close()
+            return status
+
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status
+
+
+class Replayer:
+    """
+    Replay requests against ``base_url`` at ``rate`` requests per second
+    using at most ``concurrency`` connections.
+
+    Args:
+        base_url (str): Server to replay against, e.g.
+            http://127.0.0.1:8000.
+        rate (float): Target requests per second; 0 sends as fast as the
+            connections allow.
+        concurrency (int): Number of concurrent connections.
+        tokens (dict): Access token per user id for authenticated
+            requests.
+        timeout (float): Seconds before a request counts as an error.
+    """
+
+    def __init__(self, base_url, rate=50, concurrency=20, tokens=None,
+                 timeout=30):
+        url = urlsplit(base_url)
+        if url.scheme != 'http':
+            raise ValueError('Only http:// servers can be replayed against.')
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.prefix = url.path.rstrip('/')
+        self.rate = rate
+        self.concurrency = concurrency
+        self.tokens = tokens or {}
+        self.timeout = timeout
+
+    def headers_for(self, request):
+        headers = {'Accept': 'application/json'}
+        token = self.tokens.get(request.user_id)
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        return headers
+
+    async def _worker(self, queue, stats):
+        connection = HTTPConnection(self.host, self.port, self.timeout)
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                request, scheduled = item
+                scheduled = scheduled or time.perf_counter()
+                try:
+                    status = await connection.request(
+                        request.method, self.prefix + request.target,
+                        self.headers_for(request))
+                except (OSError, ValueError, IndexError,
+                        asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    status = None
+                stats.record(
+                    request.url_name, time.perf_counter() - scheduled, status)
+        finally:
+            await connection.close()
+
+    async def replay(self, requests):
+        """Replay ``requests`` and return their ReplayStats."""
+        stats = ReplayStats()
+        queue = asyncio.Queue()
+        workers = [asyncio.create_task(self._worker(queue, stats))
+                   for _ in range(self.concurrency)]
+        stats.started = time.perf_counter()
+        for index, request in enumerate(requests):
+            scheduled = stats.started + (
+                index / self.rate if self.rate else 0)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Without a target rate latency is measured from the send
+            await queue.put((request, scheduled if self.rate else None))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+        stats.finished = time.perf_counter()
+        return stats
+
+    def run(self, requests):
+        return asyncio.run(self.replay(requests))
@@ -0,0 +1,473 @@
+"""
+Deterministic generator of realistic marketplace data at scale.
+
+Rows are inserted with chunked bulk_create, every user shares one
+precomputed password hash, and the state Listing.save() and its signals
+maintain (expiry dates, category counters, the change feed) is written
+in bulk alongside. Popularity follows heavy-tailed
+(Pareto) distributions so that a few power sellers own many listings
+and a few hot listings attract most favorites, conversations and views.
+"""
+
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from listings.models import (
+    Category, Listing, ListingChange, Subcategory, adjust_active_listings
+)
+from messaging.models import Conversation, Message
+from profiles.models import Profile
+from reviews.models import Review
+
+User = get_user_model()
+
+CATEGORY_TREE = {
+    'Electronics': ['Phones', 'Laptops', 'TVs', 'Cameras', 'Audio'],
+    'Furniture': ['Sofas', 'Tables', 'Chairs', 'Beds', 'Storage'],
+    'Vehicles': ['Cars', 'Bikes', 'Motorcycles', 'Parts'],
+    'Clothing': ['Women', 'Men', 'Kids', 'Shoes', 'Accessories'],
+    'Home & Garden': ['Tools', 'Kitchen', 'Garden', 'Decor'],
+    'Sports': ['Fitness', 'Outdoor', 'Team Sports', 'Water Sports'],
+    'Services': ['Cleaning', 'Tutoring', 'Repairs', 'Moving'],
+    'Jobs': ['Full-time', 'Part-time', 'Freelance'],
+    'Housing': ['Rent', 'Sale', 'Shared'],
+    'Events': ['Concerts', 'Workshops', 'Markets', 'Meetups'],
+}
+GOODS_CATEGORIES = [
+    'Electronics', 'Furniture', 'Vehicles', 'Clothing',
+    'Home & Garden', 'Sports',
+]
+LISTING_TYPE_CATEGORIES = {
+    'item_sale': GOODS_CATEGORIES,
+    'item_free': GOODS_CATEGORIES,
+    'item_wanted': GOODS_CATEGORIES,
+    'other': GOODS_CATEGORIES,
+    'service': ['Services'],
+    'job': ['Jobs'],
+    'housing': ['Housing'],
+    'event': ['Events'],
+}
+LISTING_TYPE_WEIGHTS = {
+    'item_sale': 50, 'item_free': 8, 'item_wanted': 10, 'service': 10,
+    'job': 6, 'housing': 8, 'event': 5, 'other': 3,
+}
+STATUS_WEIGHTS = {
+    'active': 80, 'sold': 10, 'expired': 5, 'cancelled': 3,
+    'pending': 1, 'draft': 1,
+}
+FIRST_NAMES = [
+    'anna', 'ben', 'chloe', 'david', 'emma', 'felix', 'grace', 'harry',
+    'isla', 'jack', 'kate', 'liam', 'mia', 'noah', 'olivia', 'paul',
+]
+LAST_NAMES = [
+    'smith', 'jones', 'brown', 'taylor', 'wilson', 'davies', 'evans',
+    'thomas', 'johnson', 'roberts', 'walker', 'wright',
+]
+ADJECTIVES = [
+    'Vintage', 'Modern', 'Compact', 'Large', 'Barely used', 'Classic',
+    'Premium', 'Handmade', 'Refurbished', 'Spacious',
+]
+CITIES = [
+    'London', 'Manchester', 'Birmingham', 'Leeds', 'Glasgow', 'Bristol',
+    'Liverpool', 'Edinburgh', 'Cardiff', 'Belfast', 'Dublin', 'Cork',
+]
+CONDITIONS = ['new', 'like_new', 'good', 'fair', 'poor']
+MESSAGE_LINES = [
+    'Hi, is this still available?', 'Could you do a lower price?',
+    'When can I pick it up?', 'Yes, it is still available.',
+    'Can you send more photos?', 'Deal, see you tomorrow.',
+    'Does it come with the original box?', 'Sorry, it has been sold.',
+]
+REVIEW_LINES = [
+    'Great seller, quick replies.', 'Item exactly as described.',
+    'Friendly and punctual.', 'Took a while to respond.',
+    'Smooth transaction, recommended.',
+]
+
+DEFAULT_VOLUMES = {
+    'users': 1000,
+    'listings': 10000,
+    'favorites': 20000,
+    'conversations': 3000,
+    'messages': 30000,
+    'reviews': 5000,
+}
+
+
+@contextmanager
+def manual_timestamps(*models):
+    """
+    Let generated created_at/updated_at/timestamp values through by
+    disabling auto_now and auto_now_add while bulk inserting.
+    """
+    fields = [
+        field for model in models for field in model._meta.fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class MarketplaceSeeder:
+    """
+    Generate users, profiles, categories, listings, favorites,
+    conversations, messages and reviews.
+
+    The same seed and volumes always produce the same data on an empty
+    database.
+    """
+
+    def __init__(self, volumes=None, seed=42, chunk_size=5000,
+                 password='marketplace-pass-123', stdout=None):
+        self.volumes = {**DEFAULT_VOLUMES, **(volumes or {})}
+        self.rng = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.password = password
+        self.stdout = stdout
+        self.now = timezone.now().replace(microsecond=0)
+
+    def log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+
+    def bulk_create(self, model, objects):
+        """Insert objects from any iterable in chunks."""
+        objects = iter(objects)
+        total = 0
+        while True:
+            chunk = list(islice(objects, self.chunk_size))
+            if not chunk:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(chunk)
+            total += len(chunk)
+        self.log(f"Created {total} {model._meta.verbose_name_plural}.")
+
+    def new_ids(self, model, after_id):
+        """Return ids of rows inserted after ``after_id``, in order."""
+        return list(
+            model.objects.filter(id__gt=after_id).order_by('id')
+            .values_list('id', flat=True))
+
+    def pareto_weights(self, count, alpha):
+        """Return cumulative heavy-tailed weights for ``count`` items."""
+        return list(accumulate(
+            self.rng.paretovariate(alpha) for _ in range(count)))
+
+    def random_past(self, days, start=None):
+        """Return a timestamp within the last ``days`` (after ``start``)."""
+        earliest = self.now - timedelta(days=days)
+        if start and start > earliest:
+            earliest = start
+        span = max(1, int((self.now - earliest).total_seconds()))
+        # Skewed towards recent activity
+        offset = int(span * (1 - self.rng.random() ** 2))
+        return earliest + timedelta(seconds=offset)
+
+    def last_id(self, model):
+        return model.objects.order_by('-id').values_list(
+            'id', flat=True).first() or 0
+
+    def run(self):
+        with manual_timestamps(Listing, Conversation, Message, Review):
+            self.create_categories()
+            self.create_users()
+            self.create_listings()
+            self.create_favorites()
+            self.create_conversations()
+            self.create_messages()
+            self.create_reviews()
+            self.create_profiles()
+
+    def create_categories(self):
+        self.subcategories = {}
+        for name, children in CATEGORY_TREE.items():
+            category, _ = Category.objects.get_or_create(name=name)
+            self.subcategories[name] = [
+                Subcategory.objects.get_or_create(
+                    name=child, category=category)[0]
+                for child in children
+            ]
+
+    def create_users(self):
+        count = self.volumes['users']
+        password = make_password(self.password)
+        after = self.last_id(User)
+
+        def generate():
+            for i in range(count):
+                first = self.rng.choice(FIRST_NAMES)
+                last = self.rng.choice(LAST_NAMES)
+                yield User(
+                    email=f'{first}.{last}.{i}@example.com',
+                    username=f'{first}_{last}_{i}',
+                    password=password,
+                    city=self.rng.choice(CITIES),
+                    date_joined=self.random_past(730),
+                )
+
+        self.bulk_create(User, generate())
+        self.user_ids = self.new_ids(User, after)
+        # Power sellers: a few users own most of the listings
+        self.seller_weights = self.pareto_weights(len(self.user_ids), 1.16)
+
+    def create_listings(self):
+        count = self.volumes['listings']
+        rng = self.rng
+        types = list(LISTING_TYPE_WEIGHTS)
+        type_weights = list(accumulate(LISTING_TYPE_WEIGHTS.values()))
+        statuses = list(STATUS_WEIGHTS)
+        status_weights = list(accumulate(STATUS_WEIGHTS.values()))
+
+        owners = rng.choices(
+            range(len(self.user_ids)), cum_weights=self.seller_weights,
+            k=count)
+        # Hot listings: a few attract most views, favorites and messages
+        self.listing_weights = self.pareto_weights(count, 1.3)
+        self.listing_owners = [self.user_ids[i] for i in owners]
+        self.listing_created = []
+        self.listing_counts = {}
+        counted = []
+        after = self.last_id(Listing)
+        previous = 0.0
+
+        def generate():
+            nonlocal previous
+            for i in range(count):
+                listing_type = rng.choices(types, cum_weights=type_weights)[0]
+                status = rng.choices(
+                    statuses, cum_weights=status_weights)[0]
+                category_name = rng.choice(
+                    LISTING_TYPE_CATEGORIES[listing_type])
+                subcategory = rng.choice(self.subcategories[category_name])
+                created = self.random_past(365)
+                popularity = self.listing_weights[i] - previous
+                previous = self.listing_weights[i]
+                owner = self.listing_owners[i]
+                total, active = self.listing_counts.get(owner, (0, 0))
+                self.listing_counts[owner] = (
+                    total + 1, active + (status == 'active'))
+                self.listing_created.append(created)
+
+                price, price_type, condition = None, 'fixed', None
+                delivery_option = 'na'
+                if category_name in GOODS_CATEGORIES:
+                    delivery_option = rng.choice(
+                        ['pickup', 'delivery', 'both'])
+                if listing_type in ('item_sale', 'item_wanted', 'other'):
+                    price = Decimal(rng.randint(1, 2000))
+                    price_type = rng.choice(['fixed', 'negotiable'])
+                    condition = rng.choice(CONDITIONS)
+                elif listing_type == 'item_free':
+                    price, price_type = Decimal(0), 'free'
+                    condition = rng.choice(CONDITIONS)
+                elif listing_type in ('service', 'job', 'housing'):
+                    price = Decimal(rng.randint(10, 3000))
+                    price_type = rng.choice(['fixed', 'negotiable',
+                                             'contact'])
+                else:
+                    price_type = 'na'
+
+                event_date = None
+                if listing_type == 'event':
+                    event_date = created + timedelta(
+                        days=rng.randint(1, 90))
+
+                listing = Listing(
+                    title=f'{rng.choice(ADJECTIVES)} {subcategory.name} {i}',
+                    description=(
+                        f'{subcategory.name} in {category_name}, '
+                        f'listed by a local seller. Reference {i}.'),
+                    user_id=owner,
+                    listing_type=listing_type,
+                    category_id=subcategory.category_id,
+                    subcategory=subcategory,
+                    price=price,
+                    price_type=price_type,
+                    condition=condition,
+                    delivery_option=delivery_option,
+                    location=rng.choice(CITIES),
+                    event_date=event_date,
+                    created_at=created,
+                    updated_at=created,
+                    status=status,
+                    view_count=int(popularity * 20),
+                )
+                # Active listings were last renewed within their
+                # lifetime, so they are not all overdue for expiry
+                renewed = created
+                days = settings.LISTING_LIFETIME_DAYS.get(listing_type)
+                if status == 'active' and days is not None:
+                    renewed = self.random_past(days, start=created)
+                listing.update_derived_fields(renewed)
+                if listing.is_active:
+                    counted.append(listing.get_counted_as())
+                yield listing
+
+        self.bulk_create(Listing, generate())
+        self.listing_ids = self.new_ids(Listing, after)
+        with transaction.atomic():
+            adjust_active_listings(added=counted)
+        self.bulk_create(ListingChange, (
+            ListingChange(listing_id=listing_id, changed_at=created)
+            for listing_id, created in zip(
+                self.listing_ids, self.listing_created)
+        ))
+
+    def create_favorites(self):
+        target = self.volumes['favorites']
+        rng = self.rng
+        indexes = rng.choices(
+            range(len(self.listing_ids)),
+            cum_weights=self.listing_weights, k=target)
+        pairs = set()
+        for index in indexes:
+            user_id = rng.choice(self.user_ids)
+            if user_id != self.listing_owners[index]:
+                pairs.add((self.listing_ids[index], user_id))
+
+        Favorites = Listing.favorited_by.through
+        self.bulk_create(Favorites, (
+            Favorites(listing_id=listing_id, customuser_id=user_id)
+            for listing_id, user_id in sorted(pairs)
+        ))
+        counts = {}
+        for listing_id, _ in pairs:
+            counts[listing_id] = counts.get(listing_id, 0) + 1
+        self.update_favorite_counts(counts)
+
+    def update_favorite_counts(self, counts):
+        listings = [
+            Listing(id=listing_id, favorite_count=count)
+            for listing_id, count in sorted(counts.items())
+        ]
+        for start in range(0, len(listings), self.chunk_size):
+            Listing.objects.bulk_update(
+                listings[start:start + self.chunk_size], ['favorite_count'])
+
+    def create_conversations(self):
+        # Conversations are unique per listing; hot listings get one first
+        target = min(self.volumes['conversations'], len(self.listing_ids))
+        rng = self.rng
+        chosen = []
+        seen = set()
+        while len(chosen) < target:
+            for index in rng.choices(
+                    range(len(self.listing_ids)),
+                    cum_weights=self.listing_weights,
+                    k=target - len(chosen)):
+                if index not in seen:
+                    seen.add(index)
+                    chosen.append(index)
+            if len(seen) >= len(self.listing_ids):
+                break
+
+        after = self.last_id(Conversation)
+        self.conversation_pairs = []
+        for index in chosen:
+            owner = self.listing_owners[index]
+            buyer = rng.choice(self.user_ids)
+            while buyer == owner and len(self.user_ids) > 1:
+                buyer = rng.choice(self.user_ids)
+            self.conversation_pairs.append(
+                (owner, buyer, self.listing_created[index]))
+
+        self.bulk_create(Conversation, (
+            Conversation(
+                listing_id=self.listing_ids[index],
+                created_at=self.listing_created[index],
+                updated_at=self.listing_created[index])
+            for index in chosen
+        ))
+        self.conversation_ids = self.new_ids(Conversation, after)
+
+        Participants = Conversation.participants.through
+        self.bulk_create(Participants, (
+            Participants(conversation_id=conversation_id, customuser_id=user)
+            for conversation_id, (owner, buyer, _) in zip(
+                self.conversation_ids, self.conversation_pairs)
+            for user in (buyer, owner)
+        ))
+
+    def create_messages(self):
+        if not self.conversation_ids:
+            return
+        rng = self.rng
+        count = self.volumes['messages']
+        weights = self.pareto_weights(len(self.conversation_ids), 1.5)
+        indexes = rng.choices(
+            range(len(self.conversation_ids)), cum_weights=weights, k=count)
+
+        def generate():
+            for index in indexes:
+                owner, buyer, created = self.conversation_pairs[index]
+                timestamp = self.random_past(365, start=created)
+                yield Message(
+                    conversation_id=self.conversation_ids[index],
+                    sender_id=rng.choice((buyer, owner)),
+                    content=rng.choice(MESSAGE_LINES),
+                    timestamp=timestamp,
+                    is_read=timestamp < self.now - timedelta(days=2)
+                    or rng.random() < 0.5,
+                )
+
+        self.bulk_create(Message, generate())
+
+    def create_reviews(self):
+        rng = self.rng
+        count = self.volumes['reviews']
+        reviewed = rng.choices(
+            self.user_ids, cum_weights=self.seller_weights, k=count)
+        self.ratings = {}
+
+        def generate():
+            for reviewed_id in reviewed:
+                reviewer_id = rng.choice(self.user_ids)
+                if reviewer_id == reviewed_id:
+                    continue
+                rating = rng.choices([5, 4, 3, 2, 1],
+                                     weights=[50, 25, 12, 8, 5])[0]
+                total, number = self.ratings.get(reviewed_id, (0, 0))
+                self.ratings[reviewed_id] = (total + rating, number + 1)
+                yield Review(
+                    reviewer_id=reviewer_id,
+                    reviewed_user_id=reviewed_id,
+                    rating=rating,
+                    content=rng.choice(REVIEW_LINES),
+                    created_at=self.random_past(365),
+                )
+
+        self.bulk_create(Review, generate())
+
+    def create_profiles(self):
+        def generate():
+            for user_id in self.user_ids:
+                total, active = self.listing_counts.get(user_id, (0, 0))
+                rating_total, ratings = self.ratings.get(user_id, (0, 0))
+                yield Profile(
+                    user_id=user_id,
+                    location=self.rng.choice(CITIES),
+                    total_listings=total,
+                    active_listings=active,
+                    rating=(Decimal(rating_total / ratings).quantize(
+                        Decimal('0.01')) if ratings else Decimal('0.00')),
+                    num_ratings=ratings,
+                )
+
+        self.bulk_create(Profile, generate())
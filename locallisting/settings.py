@@ -18,6 +18,7 @@ import cloudinary
 import cloudinary.uploader
 import cloudinary.api
 import sys
+from django.core.exceptions import ImproperlyConfigured
 
 # Load environment variables
 if os.path.exists("env.py"):
@@ -65,6 +66,8 @@ INSTALLED_APPS = [
     "profiles",
     "messaging",
     "reviews",
+    "locallisting",
+    "taskqueue",
 ]
 
 # JWT settings and filters
@@ -144,6 +147,8 @@ SESSION_COOKIE_SAMESITE = 'Lax'  # or 'None' for cross-site cookies
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",  # This should be at the top
+    "locallisting.middleware.MetricsMiddleware",
+    "locallisting.middleware.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -152,8 +157,106 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "locallisting.middleware.ReplicaRoutingMiddleware",
 ]
 
+# Per-request SQL and timing instrumentation (Server-Timing headers)
+REQUEST_TIMING_ENABLED = os.environ.get('REQUEST_TIMING_ENABLED') == 'True'
+REQUEST_QUERY_BUDGET = int(os.environ.get('REQUEST_QUERY_BUDGET', 30))
+REQUEST_LATENCY_BUDGET_MS = int(
+    os.environ.get('REQUEST_LATENCY_BUDGET_MS', 500))
+
+# Prometheus metrics, served at /metrics only when METRICS_TOKEN is set;
+# the scraper must send it as a bearer token
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+# Port on which `manage.py run_worker` serves its own metrics (task runs,
+# Cloudinary upload latency), without the token; 0 disables it. A worker
+# sharing PROMETHEUS_MULTIPROC_DIR with gunicorn is served by /metrics
+METRICS_WORKER_PORT = int(os.environ.get('METRICS_WORKER_PORT', 0))
+
+# Background task queue stored in the database, run by
+# `manage.py run_worker`; eager mode runs tasks inline (tests)
+TASKS_EAGER = (os.environ.get('TASKS_EAGER') == 'True'
+               or 'test' in sys.argv or 'test_coverage' in sys.argv)
+TASK_WORKER_THREADS = int(os.environ.get('TASK_WORKER_THREADS', 4))
+TASK_POLL_INTERVAL = float(os.environ.get('TASK_POLL_INTERVAL', 1))
+TASK_MAX_ATTEMPTS = int(os.environ.get('TASK_MAX_ATTEMPTS', 5))
+# Retry delays double from TASK_RETRY_BACKOFF up to TASK_RETRY_BACKOFF_MAX
+TASK_RETRY_BACKOFF = int(os.environ.get('TASK_RETRY_BACKOFF', 10))
+TASK_RETRY_BACKOFF_MAX = int(os.environ.get('TASK_RETRY_BACKOFF_MAX', 3600))
+# Workers refresh the locks of their running tasks every
+# TASK_HEARTBEAT_INTERVAL seconds; a task whose lock is not refreshed for
+# TASK_LOCK_TIMEOUT seconds belongs to a dead worker and is retried
+TASK_HEARTBEAT_INTERVAL = float(
+    os.environ.get('TASK_HEARTBEAT_INTERVAL', 60))
+TASK_LOCK_TIMEOUT = int(os.environ.get('TASK_LOCK_TIMEOUT', 600))
+
+# Periodic jobs run by the scheduler thread of `manage.py run_worker`.
+# Each job is a dotted path to a function and a cron expression (UTC);
+# a database lease makes sure only one worker dyno runs each job.
+SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'True') == 'True'
+SCHEDULER_POLL_INTERVAL = int(os.environ.get('SCHEDULER_POLL_INTERVAL', 30))
+# Seconds after which the lease of a job whose scheduler died expires;
+# the worker heartbeat extends the leases of running jobs
+SCHEDULER_LEASE_TIMEOUT = int(
+    os.environ.get('SCHEDULER_LEASE_TIMEOUT', 3600))
+SCHEDULER_HISTORY_DAYS = int(os.environ.get('SCHEDULER_HISTORY_DAYS', 30))
+SCHEDULED_JOBS = {
+    'send_message_digests': {
+        'job': 'messaging.digests.send_message_digests',
+        'schedule': '*/5 * * * *',
+    },
+    'archive_messages': {
+        'job': 'messaging.archive.archive_messages',
+        'schedule': '30 2 * * *',
+    },
+    'flush_expired_tokens': {
+        'job': 'users.jobs.flush_expired_tokens',
+        'schedule': '0 3 * * *',
+    },
+    'reconcile_listing_counts': {
+        'job': 'profiles.jobs.reconcile_listing_counts',
+        'schedule': '30 3 * * *',
+    },
+    'reconcile_category_counts': {
+        'job': 'listings.counts.reconcile_category_counts',
+        'schedule': '45 3 * * *',
+    },
+    'expire_listings': {
+        'job': 'listings.jobs.expire_listings',
+        'schedule': '*/15 * * * *',
+    },
+    'archive_listings': {
+        'job': 'listings.jobs.archive_listings',
+        'schedule': '0 2 * * *',
+    },
+    'update_trending_scores': {
+        'job': 'listings.trending.update_trending_scores',
+        'schedule': '*/10 * * * *',
+    },
+    'prune_listing_stats': {
+        'job': 'listings.analytics.prune_listing_stats',
+        'schedule': '15 4 * * *',
+    },
+    'send_saved_search_alerts': {
+        'job': 'listings.saved_searches.send_saved_search_alerts',
+        'schedule': '*/15 * * * *',
+    },
+    'build_similar_listings': {
+        'job': 'listings.similarity.build_similar_listings',
+        'schedule': '0 5 * * *',
+    },
+    'prune_pending_uploads': {
+        'job': 'listings.jobs.prune_pending_uploads',
+        'schedule': '30 4 * * *',
+    },
+    'prune_job_runs': {
+        'job': 'taskqueue.scheduler.prune_job_runs',
+        'schedule': '0 4 * * 0',
+    },
+}
+
 ROOT_URLCONF = "locallisting.urls"
 
 TEMPLATES = [
@@ -174,6 +277,26 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "locallisting.wsgi.application"
 
+# Database connection management:
+# 'none' opens a new connection for every request,
+# 'persistent' keeps one health-checked connection per worker thread
+# for DATABASE_CONN_MAX_AGE seconds,
+# 'pool' uses a psycopg 3 connection pool of at most
+# DATABASE_POOL_MAX_SIZE connections per process (requires psycopg[pool]).
+DATABASE_CONN_MODE = os.environ.get('DATABASE_CONN_MODE', 'persistent')
+DATABASE_CONN_MAX_AGE = int(os.environ.get('DATABASE_CONN_MAX_AGE', 600))
+DATABASE_POOL_MIN_SIZE = int(os.environ.get('DATABASE_POOL_MIN_SIZE', 1))
+DATABASE_POOL_MAX_SIZE = int(os.environ.get('DATABASE_POOL_MAX_SIZE', 4))
+DATABASE_POOL_TIMEOUT = int(os.environ.get('DATABASE_POOL_TIMEOUT', 10))
+
+if DATABASE_CONN_MODE == 'persistent':
+    DATABASE_CONN_OPTIONS = {
+        'conn_max_age': DATABASE_CONN_MAX_AGE,
+        'conn_health_checks': True,
+    }
+else:
+    DATABASE_CONN_OPTIONS = {}
+
 # Database
 if 'test' in sys.argv or 'test_coverage' in sys.argv:
     # Use SQLite for tests
@@ -186,8 +309,71 @@ if 'test' in sys.argv or 'test_coverage' in sys.argv:
 else:
     # Production and development database
     DATABASES = {
-        'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
+        'default': dj_database_url.parse(
+            os.environ.get('DATABASE_URL'), **DATABASE_CONN_OPTIONS)
+    }
+
+# Read replicas, as a comma separated list of database URLs
+DATABASE_REPLICAS = []
+if 'test' in sys.argv or 'test_coverage' in sys.argv:
+    # Separate SQLite database to verify routing; tests enable it
+    # with override_settings(DATABASE_REPLICAS=['replica'])
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'test_replica_db.sqlite3'),
+    }
+else:
+    replica_urls = os.environ.get('DATABASE_REPLICA_URLS', '')
+    for index, url in enumerate(filter(None, replica_urls.split(','))):
+        alias = f'replica_{index}'
+        DATABASES[alias] = dj_database_url.parse(
+            url.strip(), **DATABASE_CONN_OPTIONS)
+        DATABASE_REPLICAS.append(alias)
+
+    if DATABASE_CONN_MODE == 'pool':
+        for database in DATABASES.values():
+            database.setdefault('OPTIONS', {})['pool'] = {
+                'min_size': DATABASE_POOL_MIN_SIZE,
+                'max_size': DATABASE_POOL_MAX_SIZE,
+                'timeout': DATABASE_POOL_TIMEOUT,
+            }
+
+DATABASE_ROUTERS = ['locallisting.db_routers.PrimaryReplicaRouter']
+
+# Apps whose safe-method views may read from replicas
+REPLICA_READ_APPS = ['listings', 'profiles', 'reviews']
+
+# Seconds a user's reads stay on the primary after a write
+REPLICA_STICKINESS_SECONDS = int(
+    os.environ.get('REPLICA_STICKINESS_SECONDS', 5))
+
+# Cache shared by all processes, holding the replica stickiness pins and
+# the category tree: the 'database' backend stores it in the
+# django_cache table, created by `manage.py createcachetable`. 'locmem'
+# keeps a separate cache in each process, for single-process
+# development only
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'database')
+if 'test' in sys.argv or 'test_coverage' in sys.argv:
+    CACHE_BACKEND = 'locmem'
+if CACHE_BACKEND == 'database':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+elif CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
+else:
+    raise ImproperlyConfigured(f"Unknown CACHE_BACKEND {CACHE_BACKEND!r}")
+# A user's stickiness pin must be seen by every web process
+if DATABASE_REPLICAS and CACHE_BACKEND == 'locmem':
+    raise ImproperlyConfigured(
+        "Read replicas need a shared cache; set CACHE_BACKEND=database")
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -243,3 +429,91 @@ EMAIL_HOST_PASSWORD = os.environ.get('SENDGRID_API_KEY')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL')
 
 FRONTEND_URL = os.environ.get('FRONTEND_URL')
+
+# Unread message digests: at most one summary email per user per window
+MESSAGE_DIGEST_WINDOW = timedelta(
+    minutes=int(os.environ.get('MESSAGE_DIGEST_WINDOW_MINUTES', 60)))
+
+# Messages of closed conversations idle this long are archived
+MESSAGE_RETENTION_DAYS = int(os.environ.get('MESSAGE_RETENTION_DAYS', 180))
+
+# Days a listing stays active before it expires, per listing type; None
+# never expires. Events with a date expire once the date has passed.
+LISTING_LIFETIME_DAYS = {
+    'item_sale': 60,
+    'item_free': 14,
+    'item_wanted': 30,
+    'service': 90,
+    'job': 45,
+    'housing': 30,
+    'event': 90,
+    'other': 60,
+}
+# Maximum number of listings renewed in one request
+LISTING_RENEW_MAX = int(os.environ.get('LISTING_RENEW_MAX', 100))
+# Listing change feed page sizes; changes younger than the delay (in
+# seconds) are held back until concurrent transactions have committed,
+# and changes of transactions that take longer are recorded again after
+# they commit
+LISTING_CHANGES_PAGE_SIZE = int(
+    os.environ.get('LISTING_CHANGES_PAGE_SIZE', 500))
+LISTING_CHANGES_MAX_PAGE_SIZE = int(
+    os.environ.get('LISTING_CHANGES_MAX_PAGE_SIZE', 2000))
+LISTING_CHANGES_DELAY = int(os.environ.get('LISTING_CHANGES_DELAY', 5))
+# Listings fetched per query by the NDJSON/CSV export
+LISTING_EXPORT_CHUNK_SIZE = int(
+    os.environ.get('LISTING_EXPORT_CHUNK_SIZE', 2000))
+# Maximum number of listings fetched by id in one request
+LISTING_BATCH_MAX = int(os.environ.get('LISTING_BATCH_MAX', 100))
+# Maximum number of listings in one bulk import request, and rows per
+# insert statement
+LISTING_IMPORT_MAX = int(os.environ.get('LISTING_IMPORT_MAX', 500))
+LISTING_IMPORT_BATCH_SIZE = int(
+    os.environ.get('LISTING_IMPORT_BATCH_SIZE', 500))
+# Similar listings stored per listing; the nightly rebuild leaves terms
+# of more listings than MAX_DOC_FREQ out of its inverted index, and the
+# refresh of an edited listing compares it with the CANDIDATES most
+# recent listings of its category
+SIMILAR_LISTINGS_COUNT = int(os.environ.get('SIMILAR_LISTINGS_COUNT', 10))
+SIMILAR_LISTINGS_MAX_DOC_FREQ = int(
+    os.environ.get('SIMILAR_LISTINGS_MAX_DOC_FREQ', 5000))
+SIMILAR_LISTINGS_CANDIDATES = int(
+    os.environ.get('SIMILAR_LISTINGS_CANDIDATES', 1000))
+# Trending listings: activity weights, the time after which activity
+# counts half, and the default and maximum number of listings returned
+TRENDING_WEIGHTS = {'view': 1, 'favorite': 5, 'conversation': 10}
+TRENDING_HALF_LIFE_HOURS = float(
+    os.environ.get('TRENDING_HALF_LIFE_HOURS', 24))
+TRENDING_LISTINGS_COUNT = int(os.environ.get('TRENDING_LISTINGS_COUNT', 20))
+TRENDING_LISTINGS_MAX = int(os.environ.get('TRENDING_LISTINGS_MAX', 100))
+# Listing analytics events are counted in memory and written once this
+# many counters are pending or the oldest is this many seconds old; tests
+# write them explicitly. Daily stats are kept for RETENTION_DAYS, and
+# sellers can read up to MAX_DAYS of them at once.
+ANALYTICS_BUFFER_SIZE = int(os.environ.get('ANALYTICS_BUFFER_SIZE', 1000))
+ANALYTICS_FLUSH_INTERVAL = (
+    None if 'test' in sys.argv or 'test_coverage' in sys.argv
+    else int(os.environ.get('ANALYTICS_FLUSH_INTERVAL', 60)))
+ANALYTICS_RETENTION_DAYS = int(
+    os.environ.get('ANALYTICS_RETENTION_DAYS', 400))
+ANALYTICS_MAX_DAYS = int(os.environ.get('ANALYTICS_MAX_DAYS', 90))
+# The category tree is cached for CATEGORY_TREE_CACHE_TTL seconds in the
+# shared cache and CATEGORY_TREE_LOCAL_TTL seconds in each process;
+# processes other than the one saving a category serve the old tree
+# until their own copy expires
+CATEGORY_TREE_CACHE_TTL = int(
+    os.environ.get('CATEGORY_TREE_CACHE_TTL', 300))
+CATEGORY_TREE_LOCAL_TTL = int(os.environ.get('CATEGORY_TREE_LOCAL_TTL', 30))
+# Maximum number of saved searches per user
+SAVED_SEARCH_MAX_PER_USER = int(
+    os.environ.get('SAVED_SEARCH_MAX_PER_USER', 20))
+# Sold, expired and cancelled listings idle this long move to the archive
+LISTING_ARCHIVE_AFTER_DAYS = int(
+    os.environ.get('LISTING_ARCHIVE_AFTER_DAYS', 180))
+# Image files whose upload to Cloudinary kept failing are deleted after
+# this many days
+IMAGE_UPLOAD_RETENTION_DAYS = int(
+    os.environ.get('IMAGE_UPLOAD_RETENTION_DAYS', 7))
+# Maximum number of archived listings shown in the user's listings
+MY_LISTINGS_ARCHIVED_MAX = int(
+    os.environ.get('MY_LISTINGS_ARCHIVED_MAX', 100))
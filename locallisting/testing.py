@@ -0,0 +1,102 @@
+"""
+Query-count budgets for API endpoints.
+
+Each app's tests declare the maximum number of queries per URL name and
+the test checks every endpoint at two data sizes: over budget at either
+size, or more queries at the larger size (an N+1 pattern), fails.
+"""
+
+from importlib import import_module
+
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+def get_url_names(urls_module):
+    """Return the URL names declared by ``urls_module``."""
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLPattern):
+                if pattern.name:
+                    yield pattern.name
+            else:
+                yield from walk(pattern.url_patterns)
+
+    return set(walk(import_module(urls_module).urlpatterns))
+
+
+@override_settings(TASKS_EAGER=False)
+class QueryBudgetTestCase(TestCase):
+    """
+    Check the query count of every endpoint of ``urls_module`` against
+    ``budgets`` at each of ``sizes``.
+
+    Background tasks are queued rather than run eagerly, so budgets
+    cover the request itself.
+
+    Subclasses implement ``grow(size)``, which adds data until each
+    endpoint returns ``size`` items, and a ``request_<url_name>``
+    method per budget (dashes become underscores) returning the
+    response. Every request runs in a transaction that is rolled back,
+    so requests that write or delete do not affect the others.
+    """
+    urls_module = None
+    # URL name -> maximum number of queries
+    budgets = {}
+    # URL names that serve no API data (e.g. the browsable API root)
+    exempt = set()
+    sizes = (3, 15)
+
+    def grow(self, size):
+        raise NotImplementedError
+
+    def authenticate(self, user):
+        """Send a JWT access token of ``user`` with every request."""
+        self.client = APIClient()
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def measure(self, url_name):
+        """Return the query count and status code of one request."""
+        handler = getattr(self, f"request_{url_name.replace('-', '_')}")
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                response = handler()
+            transaction.set_rollback(True)
+        return len(queries), response.status_code
+
+    def test_every_endpoint_has_a_budget(self):
+        if not self.budgets:
+            return
+        missing = get_url_names(self.urls_module) - set(self.budgets) \
+            - self.exempt
+        self.assertFalse(
+            missing, f"No query budget for {', '.join(sorted(missing))}")
+
+    def test_query_budgets(self):
+        if not self.budgets:
+            return
+        counts = {}
+        for size in self.sizes:
+            self.grow(size)
+            for url_name in self.budgets:
+                count, status_code = self.measure(url_name)
+                self.assertLess(
+                    status_code, 400, f"{url_name} failed with {status_code}")
+                counts.setdefault(url_name, []).append(count)
+
+        for url_name, budget in self.budgets.items():
+            with self.subTest(url_name=url_name):
+                small, large = counts[url_name][0], counts[url_name][-1]
+                self.assertLessEqual(
+                    max(counts[url_name]), budget,
+                    f"{url_name} ran {max(counts[url_name])} queries, "
+                    f"budget is {budget}")
+                self.assertEqual(
+                    small, large,
+                    f"{url_name} ran {small} queries for {self.sizes[0]} "
+                    f"items but {large} for {self.sizes[-1]}")
@@ -0,0 +1,320 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections, router
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from listings.counts import reconcile_category_counts
+from listings.models import Category, Listing, ListingChange
+from messaging.models import Conversation, Message
+from profiles.models import Profile
+from reviews.models import Review
+from .db_pool import get_connection_stats
+from .metrics import _queue_depth_providers, register_queue_depth
+from .replay import Replayer, read_request_log
+from .timing import track
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    """
+    Test case for routing safe-method reads to the read replica.
+
+    The 'replica' test database is a separate, empty SQLite database,
+    so reads served by it do not see rows written to the primary.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com',
+            password='testpass123')
+        Profile.objects.create(user=self.user)
+        self.category = Category.objects.create(name='Electronics')
+        self.listing = Listing.objects.create(
+            title='iPhone', description='A great iPhone', user=self.user,
+            category=self.category, price=500, condition='new')
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_reads_go_to_replica(self):
+        """
+        Test that listing reads are served by the replica.
+        """
+        response = self.client.get(reverse('listing-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 0)
+
+    def test_reads_after_write_stick_to_primary(self):
+        """
+        Test that a user's reads use the primary after a write.
+        """
+        response = self.client.post(
+            reverse('favorite-toggle', kwargs={'pk': self.listing.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse('listing-list'))
+        self.assertEqual(response.data['count'], 1)
+
+        # Other users still read from the replica
+        self.client.credentials()
+        response = self.client.get(reverse('listing-list'))
+        self.assertEqual(response.data['count'], 0)
+
+    def test_other_apps_read_primary(self):
+        """
+        Test that views outside REPLICA_READ_APPS use the primary.
+        """
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse('unread-message-count'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(any('messaging_' in query['sql']
+                            for query in primary.captured_queries))
+        self.assertEqual(replica.captured_queries, [])
+
+    def test_migrations_skip_replicas(self):
+        """
+        Test that migrations only run on the primary.
+        """
+        self.assertFalse(router.allow_migrate('replica', 'listings'))
+        self.assertTrue(router.allow_migrate('default', 'listings'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        """
+        Test that all reads use the primary without replicas.
+        """
+        response = self.client.get(reverse('listing-list'))
+        self.assertEqual(response.data['count'], 1)
+
+
+class ConnectionStatsTests(TestCase):
+    """
+    Test case for the database connection statistics.
+    """
+
+    def test_connection_stats(self):
+        """
+        Test that the open default connection is reported.
+        """
+        User.objects.exists()
+        stats = get_connection_stats()['default']
+        self.assertTrue(stats['connected'])
+        self.assertEqual(stats['mode'], 'persistent')
+        self.assertIn('opened_total', stats)
+        self.assertIn('age_seconds', stats)
+
+
+@override_settings(REQUEST_TIMING_ENABLED=True)
+class RequestTimingTests(TestCase):
+    """
+    Test case for the per-request SQL and timing instrumentation.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com',
+            password='testpass123')
+        Listing.objects.create(
+            title='iPhone', description='A great iPhone', user=self.user,
+            price=500, condition='new')
+
+    def test_server_timing_header(self):
+        """
+        Test that query count, DB and serializer time are reported.
+        """
+        with self.assertLogs('locallisting.timing', 'INFO') as logs:
+            response = self.client.get(reverse('listing-list'))
+        header = response['Server-Timing']
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('serializer;dur=', header)
+        self.assertIn('total;dur=', header)
+        self.assertIn('"url_name": "listing-list"', logs.output[0])
+
+    @override_settings(REQUEST_QUERY_BUDGET=0)
+    def test_over_budget_is_flagged(self):
+        """
+        Test that requests over the query budget are logged as warnings.
+        """
+        with self.assertLogs('locallisting.timing', 'WARNING') as logs:
+            self.client.get(reverse('listing-list'))
+        self.assertIn('"over_budget": true', logs.output[0])
+
+    @override_settings(REQUEST_TIMING_ENABLED=False)
+    def test_disabled(self):
+        """
+        Test that no header is added and tracking is a no-op when disabled.
+        """
+        response = self.client.get(reverse('listing-list'))
+        self.assertNotIn('Server-Timing', response)
+        with track('smtp'):
+            pass
+
+
+class MetricsEndpointTests(TestCase):
+    """
+    Test case for the Prometheus metrics endpoint.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_request_metrics_are_exposed(self):
+        """
+        Test that request, latency and query metrics are labelled with
+        the URL name.
+        """
+        register_queue_depth('test-queue', lambda: 3)
+        self.addCleanup(_queue_depth_providers.pop, 'test-queue')
+        self.client.get(reverse('category-list'))
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn(
+            'http_requests_total{method="GET",status="200",'
+            'url_name="category-list"}', body)
+        self.assertIn(
+            'http_request_duration_seconds_bucket{le="0.005",'
+            'url_name="category-list"}', body)
+        self.assertIn('db_queries_total{url_name="category-list"}', body)
+        self.assertIn('background_queue_depth{queue="test-queue"} 3.0', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_is_required(self):
+        """
+        Test that the endpoint requires the configured bearer token.
+        """
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_not_served_without_token(self):
+        """
+        Test that the endpoint does not exist unless a token is set.
+        """
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SeedMarketplaceCommandTests(TestCase):
+    """Tests for the seed_marketplace command."""
+
+    def seed(self):
+        call_command(
+            'seed_marketplace', users=30, listings=200, favorites=300,
+            conversations=40, messages=150, reviews=60, chunk_size=50,
+            stdout=StringIO())
+
+    def test_generates_requested_volumes(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Profile.objects.count(), 30)
+        self.assertEqual(Listing.objects.count(), 200)
+        self.assertEqual(Conversation.objects.count(), 40)
+        self.assertEqual(Message.objects.count(), 150)
+        types = set(Listing.objects.values_list('listing_type', flat=True))
+        self.assertEqual(
+            types, {choice for choice, _ in Listing.LISTING_TYPE_CHOICES})
+
+    def test_counters_match_generated_rows(self):
+        self.seed()
+        for listing in Listing.objects.all()[:50]:
+            self.assertEqual(
+                listing.favorite_count, listing.favorited_by.count())
+        for profile in Profile.objects.select_related('user'):
+            self.assertEqual(profile.total_listings,
+                             profile.user.listings.count())
+            self.assertEqual(profile.num_ratings,
+                             profile.user.reviews_received.count())
+        # The state Listing.save() maintains
+        self.assertEqual(reconcile_category_counts(), 0)
+        self.assertFalse(Listing.objects.filter(
+            is_active=True, expires_at__isnull=True).exists())
+        self.assertEqual(ListingChange.objects.count(), 200)
+
+    def test_same_seed_generates_same_data(self):
+        self.seed()
+        first = list(Listing.objects.order_by('id').values_list(
+            'title', 'user__username', 'status'))
+        Review.objects.all().delete()
+        Listing.objects.all().delete()
+        User.objects.all().delete()
+        self.seed()
+        second = list(Listing.objects.order_by('id').values_list(
+            'title', 'user__username', 'status'))
+        self.assertEqual(first, second)
+
+    def test_refuses_to_seed_twice(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+class TrafficReplayTests(LiveServerTestCase):
+    """Tests for replaying request logs against a live server."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com',
+            password='testpass123')
+        Profile.objects.create(user=self.user)
+        self.lines = [
+            'INFO ' + json.dumps({'method': 'GET',
+                                  'path': '/api/listings/listings/',
+                                  'query': 'page=1'}),
+            json.dumps({'method': 'GET', 'path': '/api/profiles/profile/',
+                        'user_id': self.user.id}),
+            json.dumps({'method': 'POST', 'path': '/api/users/login/'}),
+            'not json',
+        ]
+
+    def test_read_request_log(self):
+        requests = read_request_log(self.lines)
+        self.assertEqual(len(requests), 2)
+        self.assertEqual(requests[0].url_name, 'listing-list')
+        self.assertEqual(requests[0].target, '/api/listings/listings/?page=1')
+        self.assertEqual(requests[1].user_id, self.user.id)
+
+    def test_replay_reports_per_url_name(self):
+        requests = read_request_log(self.lines) * 3
+        token = str(RefreshToken.for_user(self.user).access_token)
+        summary = Replayer(
+            self.live_server_url, rate=0, concurrency=2,
+            tokens={self.user.id: token}).run(requests).summary()
+        self.assertEqual(summary['requests'], 6)
+        self.assertEqual(summary['error_rate'], 0)
+        self.assertEqual(summary['endpoints']['listing-list']['requests'], 3)
+        self.assertIn('p99_ms', summary['endpoints']['profile-detail'])
+
+    def test_command_counts_errors(self):
+        """Requests of users without a token fail with 401 errors."""
+        with tempfile.NamedTemporaryFile('w', suffix='.log',
+                                         delete=False) as log:
+            log.write(json.dumps({'path': '/api/profiles/profile/',
+                                  'user_id': 0}) + '\n')
+        self.addCleanup(os.unlink, log.name)
+        out = StringIO()
+        call_command('replay_traffic', log.name, url=self.live_server_url,
+                     rate=0, requests=4, stdout=out)
+        self.assertIn('Total: 4 requests', out.getvalue())
+        self.assertIn('100.0% errors', out.getvalue())
@@ -0,0 +1,110 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Timings of the request being handled, None when timing is disabled
+_current = ContextVar('request_timings', default=None)
+# Callbacks receiving the duration of every span, keyed by span name
+_span_observers = defaultdict(list)
+
+
+class RequestTimings:
+    """
+    Accumulates query counts and named time spans for one request.
+
+    Spans of the same name are not counted twice when nested, e.g. a
+    ListingSerializer inside a ConversationSerializer.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.queries = 0
+        self._depth = defaultdict(int)
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        """Database execute wrapper counting queries and their time."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add('db', time.perf_counter() - started)
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+def start_request_timings():
+    """
+    Start collecting timings for the current request.
+
+    Returns:
+        tuple: The RequestTimings and a token for stop_request_timings.
+    """
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop_request_timings(token):
+    """Stop collecting timings started by start_request_timings."""
+    _current.reset(token)
+
+
+def get_request_timings():
+    """Return the timings of the current request, or None."""
+    return _current.get()
+
+
+def observe_spans(name, callback):
+    """
+    Call ``callback(name, seconds)`` whenever a ``name`` span finishes,
+    whether or not request timing is enabled.
+    """
+    _span_observers[name].append(callback)
+
+
+@contextmanager
+def track(name):
+    """
+    Time a block of work under ``name`` for the current request.
+
+    Does nothing when request timing is disabled and nobody observes
+    ``name`` spans.
+    """
+    timings = _current.get()
+    observers = _span_observers.get(name)
+    if timings is None and not observers:
+        yield
+        return
+    if timings is not None and timings._depth[name]:
+        # Already timed by an enclosing span of the same name
+        yield
+        return
+    if timings is not None:
+        timings._depth[name] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if timings is not None:
+            timings._depth[name] -= 1
+            timings.add(name, elapsed)
+        for callback in observers or ():
+            callback(name, elapsed)
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin recording representation time as 'serializer'.
+    """
+
+    def to_representation(self, instance):
+        with track('serializer'):
+            return super().to_representation(instance)
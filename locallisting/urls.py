@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.contrib.sitemaps.views import sitemap
 from .sitemaps import ListingSitemap
+from .views import metrics_view
 
 sitemaps = {
     'listings': ListingSitemap,
@@ -15,4 +16,5 @@ urlpatterns = [
     path('api/messaging/', include('messaging.urls')),
     path('api/reviews/', include('reviews.urls')),
     path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='sitemap'),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from .metrics import generate_metrics
+
+
+def metrics_view(request):
+    """
+    Expose application metrics in the Prometheus text format.
+
+    Metrics of all gunicorn workers are aggregated. The endpoint only
+    exists when METRICS_TOKEN is configured, and the request must carry
+    it as a bearer token.
+    """
+    token = settings.METRICS_TOKEN
+    if not settings.METRICS_ENABLED or not token:
+        raise Http404
+    if request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    return HttpResponse(generate_metrics(), content_type=CONTENT_TYPE_LATEST)
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Conversation, Message
+from .models import (
+    Conversation, ConversationArchive, Message, MessageDigest
+)
 
 
 class MessageInline(admin.TabularInline):
@@ -38,3 +40,25 @@ class MessageAdmin(admin.ModelAdmin):
     search_fields = ('content', 'sender__username',
                      'conversation__listing__title')
     readonly_fields = ('conversation', 'sender', 'timestamp')
+
+
+@admin.register(MessageDigest)
+class MessageDigestAdmin(admin.ModelAdmin):
+    """
+    Admin view for the history of unread-message digest emails.
+    """
+    list_display = ('id', 'recipient', 'sent_at', 'message_count')
+    list_filter = ('sent_at',)
+    search_fields = ('recipient__username', 'recipient__email')
+    readonly_fields = ('recipient', 'sent_at', 'message_count')
+
+
+@admin.register(ConversationArchive)
+class ConversationArchiveAdmin(admin.ModelAdmin):
+    """
+    Admin view for compressed message archives of closed conversations.
+    """
+    list_display = ('conversation', 'message_count', 'archived_at')
+    search_fields = ('conversation__listing__title',)
+    readonly_fields = ('conversation', 'message_count', 'archived_at')
+    exclude = ('data',)
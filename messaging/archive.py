@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Conversation, ConversationArchive, Message
+
+# Listing statuses for which a conversation is considered closed
+CLOSED_LISTING_STATUSES = ['sold', 'expired', 'cancelled']
+
+
+def get_archivable_conversations(older_than=None):
+    """
+    Return closed conversations whose newest message is older than
+    ``older_than`` days (defaults to MESSAGE_RETENTION_DAYS).
+    """
+    days = settings.MESSAGE_RETENTION_DAYS if older_than is None \
+        else older_than
+    cutoff = timezone.now() - timedelta(days=days)
+    return (
+        Conversation.objects
+        .filter(listing__status__in=CLOSED_LISTING_STATUSES)
+        .annotate(last_message_at=Max('messages__timestamp'))
+        .filter(last_message_at__lt=cutoff)
+        .order_by('id')
+    )
+
+
+@transaction.atomic
+def archive_conversation(conversation):
+    """
+    Move all live messages of a conversation into its compressed archive.
+
+    New messages are appended to any existing archive, and the live rows
+    are deleted in the same transaction.
+
+    Returns:
+        int: The number of messages archived.
+    """
+    messages = Message.objects.filter(
+        conversation=conversation).order_by('timestamp', 'id')
+    rows = [
+        {
+            'id': message['id'],
+            'sender': message['sender_id'],
+            'content': message['content'],
+            'timestamp': message['timestamp'].isoformat(),
+            'is_read': message['is_read'],
+        }
+        for message in messages.values(
+            'id', 'sender_id', 'content', 'timestamp', 'is_read')
+    ]
+    if not rows:
+        return 0
+
+    archive, _ = ConversationArchive.objects.select_for_update() \
+        .get_or_create(conversation=conversation)
+    archive.store(archive.load() + rows)
+    archive.save()
+    Message.objects.filter(id__in=[row['id'] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_messages(older_than=None, batch_size=500):
+    """
+    Archive messages of every closed conversation past the retention age.
+
+    Conversations are processed in batches of ``batch_size``, each in its
+    own short transaction.
+
+    Returns:
+        tuple: The number of conversations and messages archived.
+    """
+    conversations = 0
+    archived = 0
+    last_id = 0
+    queryset = get_archivable_conversations(older_than)
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        for conversation in batch:
+            archived += archive_conversation(conversation)
+            conversations += 1
+        last_id = batch[-1].id
+    return conversations, archived
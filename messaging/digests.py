@@ -0,0 +1,160 @@
+from collections import defaultdict
+from textwrap import dedent
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F, Max, OuterRef, Q, Subquery
+from django.utils import timezone
+from django.utils.html import escape
+
+from .models import Message, MessageDigest
+
+
+def collect_unread_digests(now=None):
+    """
+    Collect unread messages per recipient that are due for a digest.
+
+    A recipient is due when their last digest was sent more than
+    ``MESSAGE_DIGEST_WINDOW`` ago (or never). Only messages received
+    since that last digest are included, so a message is summarised
+    at most once per recipient.
+
+    Args:
+        now (datetime): The reference time, defaults to the current time.
+
+    Returns:
+        dict: Mapping of recipient id to a list of message value dicts,
+        oldest first.
+    """
+    now = now or timezone.now()
+    window_start = now - settings.MESSAGE_DIGEST_WINDOW
+
+    last_sent = MessageDigest.objects.filter(
+        recipient=OuterRef('recipient_id')
+    ).values('recipient').annotate(last=Max('sent_at')).values('last')
+
+    # One row per (message, recipient) pair, excluding the sender; only
+    # recipients who are due and messages since their last digest
+    rows = (
+        Message.objects.filter(is_read=False, timestamp__lte=now)
+        .annotate(recipient_id=F('conversation__participants'))
+        .exclude(recipient_id=F('sender_id'))
+        .filter(recipient_id__isnull=False)
+        .annotate(last_sent=Subquery(last_sent))
+        .filter(Q(last_sent__isnull=True)
+                | Q(last_sent__lte=window_start,
+                    timestamp__gt=F('last_sent')))
+        .order_by('timestamp')
+        .values(
+            'id', 'recipient_id', 'content', 'timestamp',
+            'sender__username', 'conversation__listing__title'
+        )
+    )
+
+    digests = defaultdict(list)
+    for row in rows.iterator(chunk_size=2000):
+        digests[row['recipient_id']].append(row)
+    return dict(digests)
+
+
+def build_digest_email(user, messages, connection=None):
+    """
+    Build the summary email for a user's unread messages.
+
+    Args:
+        user: The recipient of the digest.
+        messages (list): Message value dicts from collect_unread_digests.
+        connection: An open email backend connection to reuse.
+
+    Returns:
+        EmailMultiAlternatives: The email, ready to be sent.
+    """
+    count = len(messages)
+    subject = f'You have {count} unread message(s) - Local Listing'
+    inbox_url = f"{settings.FRONTEND_URL}/messages"
+
+    lines = [
+        f"- {m['sender__username']} about "
+        f"\"{m['conversation__listing__title']}\": {m['content'][:140]}"
+        for m in messages
+    ]
+    items = "".join(
+        f"<li><strong>{escape(m['sender__username'])}</strong> about "
+        f"<em>{escape(m['conversation__listing__title'])}</em>: "
+        f"{escape(m['content'][:140])}</li>"
+        for m in messages
+    )
+
+    html_message = dedent(f"""
+    <!DOCTYPE html>
+    <html>
+    <body>
+        <h2>Unread Messages</h2>
+        <p>Hello {escape(user.username)},</p>
+        <p>You have {count} unread message(s) on Local Listing:</p>
+        <ul>{items}</ul>
+        <p><a href="{inbox_url}">Open your inbox</a></p>
+        <p>Thank you,<br>The Local Listing Team</p>
+    </body>
+    </html>
+    """)
+
+    plain_message = "\n".join([
+        f"Hello {user.username},",
+        "",
+        f"You have {count} unread message(s) on Local Listing:",
+        "",
+        *lines,
+        "",
+        f"Open your inbox: {inbox_url}",
+        "",
+        "Thank you,",
+        "The Local Listing Team",
+    ])
+
+    email = EmailMultiAlternatives(
+        subject,
+        plain_message,
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+        connection=connection,
+    )
+    email.attach_alternative(html_message, 'text/html')
+    return email
+
+
+def send_message_digests(now=None):
+    """
+    Send one unread-message digest email per due recipient.
+
+    All emails are delivered over a single email backend connection,
+    and a MessageDigest row is recorded for every recipient so the next
+    run only picks up newer messages.
+
+    Args:
+        now (datetime): The reference time, defaults to the current time.
+
+    Returns:
+        int: The number of digest emails sent.
+    """
+    now = now or timezone.now()
+    digests = collect_unread_digests(now)
+    if not digests:
+        return 0
+
+    users = get_user_model().objects.filter(
+        id__in=digests.keys(), is_active=True).exclude(email='')
+
+    sent = 0
+    connection = get_connection()
+    with connection:
+        for user in users.iterator(chunk_size=500):
+            messages = digests[user.id]
+            email = build_digest_email(user, messages, connection)
+            if email.send():
+                MessageDigest.objects.create(
+                    recipient=user, sent_at=now,
+                    message_count=len(messages))
+                sent += 1
+    return sent
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from messaging.archive import archive_messages
+
+
+class Command(BaseCommand):
+    """
+    Move messages of closed conversations into compressed archives.
+
+    A conversation is closed when its listing is sold, expired or
+    cancelled, and it is archived once its newest message is older
+    than the retention age.
+    """
+    help = 'Archive messages of closed conversations past retention.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.MESSAGE_RETENTION_DAYS,
+            help='Archive conversations idle for at least this many days.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of conversations processed per batch.')
+
+    def handle(self, *args, **options):
+        conversations, messages = archive_messages(
+            older_than=options['days'], batch_size=options['batch_size'])
+        self.stdout.write(
+            f"Archived {messages} message(s) from "
+            f"{conversations} conversation(s).")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from messaging.digests import send_message_digests
+
+
+class Command(BaseCommand):
+    """
+    Send batched unread-message digest emails once.
+
+    The task worker runs the digests periodically as the
+    send_message_digests scheduled job.
+    """
+    help = 'Send one unread-message digest email per recipient.'
+
+    def handle(self, *args, **options):
+        sent = send_message_digests()
+        self.stdout.write(f"Sent {sent} message digest(s).")
@@ -0,0 +1,32 @@
+# Generated by Django 5.1 on 2026-10-19 07:44
+
+import json
+import zlib
+
+from django.db import migrations, models
+
+
+def set_last_messages(apps, schema_editor):
+    """Store the newest message of every existing archive."""
+    ConversationArchive = apps.get_model('messaging', 'ConversationArchive')
+    for archive in ConversationArchive.objects.only('data').iterator():
+        rows = json.loads(zlib.decompress(bytes(archive.data))) \
+            if archive.data else []
+        if rows:
+            archive.last_message = rows[-1]
+            archive.save(update_fields=['last_message'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0004_message_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationarchive',
+            name='last_message',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(set_last_messages, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,10 @@
+import json
+import zlib
+
 from django.db import models
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.dateparse import parse_datetime
 from listings.models import Listing
 
 
@@ -25,6 +30,20 @@ class Conversation(models.Model):
         # Ensure only one conversation per listing
         unique_together = ['listing']
 
+    def get_message_history(self):
+        """
+        Return archived and live messages of the conversation, oldest first.
+
+        Archived messages are rebuilt as unsaved Message instances so they
+        can be serialized like live ones.
+        """
+        live = list(self.messages.select_related('sender'))
+        try:
+            archive = self.archive
+        except ConversationArchive.DoesNotExist:
+            return live
+        return archive.get_messages() + live
+
 
 class Message(models.Model):
     """
@@ -45,3 +64,106 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['timestamp']  # Order messages by timestamp
+        indexes = [
+            models.Index(fields=['conversation', 'timestamp'],
+                         name='message_conv_timestamp_idx'),
+            # Unread counts only ever look at unread rows
+            models.Index(fields=['conversation', 'sender'],
+                         condition=models.Q(is_read=False),
+                         name='message_unread_idx'),
+        ]
+
+
+class MessageDigest(models.Model):
+    """
+    Records an unread-message digest email sent to a user.
+
+    The most recent digest per recipient marks the point after which
+    new messages are collected for the next summary.
+    """
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='message_digests'
+    )
+    sent_at = models.DateTimeField()
+    message_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-sent_at']
+
+    def __str__(self):
+        return f"Digest for {self.recipient} at {self.sent_at}"
+
+
+class ConversationArchive(models.Model):
+    """
+    Compressed history of archived messages for a closed conversation.
+
+    Messages are stored as a zlib-compressed JSON list, keeping the hot
+    Message table proportional to active conversations. The newest
+    message is also kept uncompressed, so conversation lists can show it
+    without loading the history.
+    """
+    conversation = models.OneToOneField(
+        Conversation, on_delete=models.CASCADE, related_name='archive'
+    )
+    data = models.BinaryField()
+    message_count = models.PositiveIntegerField(default=0)
+    last_message = models.JSONField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    def load(self):
+        """Return the archived messages as a list of dicts."""
+        if not self.data:
+            return []
+        return json.loads(zlib.decompress(bytes(self.data)))
+
+    def store(self, rows):
+        """Compress and store a list of message dicts."""
+        self.data = zlib.compress(
+            json.dumps(rows, separators=(',', ':')).encode())
+        self.message_count = len(rows)
+        self.last_message = rows[-1] if rows else None
+
+    def build_message(self, row, sender):
+        """Return an archived message dict as an unsaved Message."""
+        message = Message(
+            id=row['id'],
+            conversation=self.conversation,
+            sender_id=row['sender'],
+            content=row['content'],
+            timestamp=parse_datetime(row['timestamp']),
+            is_read=row['is_read'],
+        )
+        message.sender = sender
+        return message
+
+    def get_messages(self):
+        """Return the archived messages as unsaved Message instances."""
+        rows = self.load()
+        senders = get_user_model().objects.in_bulk(
+            {row['sender'] for row in rows})
+        messages = []
+        for row in rows:
+            # Messages of deleted users are dropped, as with CASCADE
+            if row['sender'] not in senders:
+                continue
+            messages.append(self.build_message(row, senders[row['sender']]))
+        return messages
+
+    def get_last_message(self, senders):
+        """
+        Return the newest archived message without loading the history.
+
+        Args:
+            senders (dict): Users by id, e.g. the conversation's
+                participants, among which the sender is looked up.
+
+        Returns:
+            Message: An unsaved Message, or None if the archive is empty
+            or the sender is not among ``senders``.
+        """
+        row = self.last_message
+        if row is None or row['sender'] not in senders:
+            return None
+        return self.build_message(row, senders[row['sender']])
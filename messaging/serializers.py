@@ -1,11 +1,14 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 from .models import Conversation, Message
+from listings.analytics import record_event
 from listings.models import Listing
 from listings.serializers import ListingSerializer
 from users.serializers import UserProfileSerializer
+from locallisting.timing import TimedSerializerMixin
 
 
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for Message model.
 
@@ -21,7 +24,8 @@ class MessageSerializer(serializers.ModelSerializer):
                             'timestamp', 'is_read']
 
 
-class ConversationSerializer(serializers.ModelSerializer):
+class ConversationSerializer(TimedSerializerMixin,
+                             serializers.ModelSerializer):
     """
     Serializer for Conversation model.
 
@@ -41,12 +45,37 @@ class ConversationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'participants',
                             'created_at', 'updated_at']
 
+    @staticmethod
+    def setup_eager_loading(queryset, user=None):
+        """
+        Load the listing, participants, archive and last message of
+        each conversation up front, so serializing conversations costs
+        the same number of queries however many there are.
+
+        Args:
+            queryset (QuerySet): Conversations to serialize.
+            user (User): The requesting user, if any.
+
+        Returns:
+            QuerySet: The conversations with related data loaded.
+        """
+        return queryset.select_related('archive').defer(
+            'archive__data').prefetch_related(
+            Prefetch('listing', queryset=ListingSerializer.setup_eager_loading(
+                Listing.objects.all(), user)),
+            'participants',
+            Prefetch('messages', queryset=Message.objects.select_related(
+                'sender').order_by('-timestamp')[:1],
+                to_attr='latest_messages'),
+        )
+
     def create(self, validated_data):
         """Create a new conversation with the associated listing."""
         listing_id = validated_data.pop('listing_id')
         listing = Listing.objects.get(pk=listing_id)
         conversation = Conversation.objects.create(
             listing=listing)
+        record_event(listing.pk, 'contacts')
         return conversation
 
     def to_representation(self, instance):
@@ -60,8 +89,14 @@ class ConversationSerializer(serializers.ModelSerializer):
 
     def get_last_message(self, obj):
         """Get the last message in the conversation."""
-        last_message = obj.messages.order_by(
-            '-timestamp').first()
+        if hasattr(obj, 'latest_messages'):
+            last_message = next(iter(obj.latest_messages), None)
+        else:
+            last_message = obj.messages.order_by('-timestamp').first()
+        if last_message is None and hasattr(obj, 'archive'):
+            # Senders are participants, which are prefetched with them
+            last_message = obj.archive.get_last_message(
+                {user.pk: user for user in obj.participants.all()})
         # Return serialized message or None
         return MessageSerializer(last_message).data if last_message else None
 
@@ -73,7 +108,8 @@ class ConversationDetailSerializer(ConversationSerializer):
     Inherits from ConversationSerializer to add messages.
     """
     messages = MessageSerializer(
-        many=True, read_only=True)  # Messages in the conversation
+        source='get_message_history',
+        many=True, read_only=True)  # Live and archived messages
 
     class Meta(ConversationSerializer.Meta):
         fields = ConversationSerializer.Meta.fields + \
@@ -3,8 +3,16 @@ from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Conversation, Message
-from listings.models import Listing, Category, Subcategory
+from datetime import timedelta
+from django.core import mail
+from django.utils import timezone
+from .models import (
+    Conversation, ConversationArchive, Message, MessageDigest
+)
+from .archive import archive_conversation, archive_messages
+from .digests import collect_unread_digests, send_message_digests
+from listings.models import Listing, Category, Subcategory, ListingImage
+from locallisting.testing import QueryBudgetTestCase
 from .serializers import ConversationSerializer, MessageSerializer
 
 User = get_user_model()
@@ -227,3 +235,234 @@ class MessagingViewTests(TestCase):
                     kwargs={'listing_id': self.listing.id}))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
+
+
+class MessageDigestTests(TestCase):
+    """
+    Test case for the batched unread-message digest emails.
+    """
+
+    def setUp(self):
+        self.user1 = User.objects.create_user(
+            username='user1', email='user1@example.com', password='pass1234')
+        self.user2 = User.objects.create_user(
+            username='user2', email='user2@example.com', password='pass1234')
+        self.category = Category.objects.create(name='Electronics')
+        self.listing = Listing.objects.create(
+            title='iPhone',
+            description='A great iPhone',
+            user=self.user1,
+            category=self.category,
+            price=500
+        )
+        self.conversation = Conversation.objects.create(listing=self.listing)
+        self.conversation.participants.add(self.user1, self.user2)
+        for content in ['Hello', 'Is it available?']:
+            Message.objects.create(
+                conversation=self.conversation,
+                sender=self.user2,
+                content=content
+            )
+
+    def test_one_digest_per_recipient(self):
+        """
+        Test that unread messages are summarised in one email per user.
+        """
+        sent = send_message_digests()
+        self.assertEqual(sent, 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user1@example.com'])
+        self.assertIn('Is it available?', mail.outbox[0].body)
+        digest = MessageDigest.objects.get()
+        self.assertEqual(digest.recipient, self.user1)
+        self.assertEqual(digest.message_count, 2)
+
+    def test_digest_respects_window(self):
+        """
+        Test that a user gets no second digest within the window and
+        only new messages afterwards.
+        """
+        now = timezone.now()
+        send_message_digests(now=now)
+        Message.objects.create(
+            conversation=self.conversation,
+            sender=self.user2,
+            content='Still there?'
+        )
+        self.assertEqual(
+            send_message_digests(now=now + timedelta(minutes=1)), 0)
+
+        later = now + timedelta(days=1)
+        digests = collect_unread_digests(now=later)
+        self.assertEqual(list(digests), [self.user1.id])
+        self.assertEqual(
+            [row['content'] for row in digests[self.user1.id]],
+            ['Still there?'])
+        self.assertEqual(send_message_digests(now=later), 1)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn('Still there?', mail.outbox[1].body)
+
+    def test_read_messages_are_skipped(self):
+        """
+        Test that no digest is sent when all messages are read.
+        """
+        Message.objects.update(is_read=True)
+        self.assertEqual(send_message_digests(), 0)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+class MessageArchiveTests(TestCase):
+    """
+    Test case for archiving messages of closed conversations.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user1 = User.objects.create_user(
+            username='user1', email='user1@example.com', password='pass1234')
+        self.user2 = User.objects.create_user(
+            username='user2', email='user2@example.com', password='pass1234')
+        self.category = Category.objects.create(name='Electronics')
+        self.listing = Listing.objects.create(
+            title='iPhone',
+            description='A great iPhone',
+            user=self.user1,
+            category=self.category,
+            price=500,
+            status='sold'
+        )
+        self.conversation = Conversation.objects.create(listing=self.listing)
+        self.conversation.participants.add(self.user1, self.user2)
+        self.message = Message.objects.create(
+            conversation=self.conversation,
+            sender=self.user2,
+            content='Hello, is this still available?'
+        )
+        Message.objects.filter(pk=self.message.pk).update(
+            timestamp=timezone.now() - timedelta(days=365))
+
+    def test_archive_closed_conversation(self):
+        """
+        Test that old messages of closed conversations leave the hot table.
+        """
+        conversations, messages = archive_messages(older_than=180)
+        self.assertEqual((conversations, messages), (1, 1))
+        self.assertFalse(Message.objects.exists())
+        archive = ConversationArchive.objects.get()
+        self.assertEqual(archive.message_count, 1)
+        self.assertEqual(archive.get_messages()[0].content,
+                         'Hello, is this still available?')
+        self.assertEqual(archive.last_message['content'],
+                         'Hello, is this still available?')
+
+    def test_active_conversation_is_kept(self):
+        """
+        Test that conversations of active listings are not archived.
+        """
+        self.listing.status = 'active'
+        self.listing.save()
+        self.assertEqual(archive_messages(older_than=180), (0, 0))
+        self.assertEqual(Message.objects.count(), 1)
+
+    def test_archived_history_is_listed(self):
+        """
+        Test that archived messages are returned before live ones.
+        """
+        archive_messages(older_than=180)
+        Message.objects.create(
+            conversation=self.conversation,
+            sender=self.user1,
+            content='Sorry, it is sold.'
+        )
+        self.client.force_authenticate(user=self.user2)
+        response = self.client.get(reverse(
+            'message-list-create',
+            kwargs={'conversation_id': self.conversation.id}
+        ))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [m['content'] for m in response.data],
+            ['Hello, is this still available?', 'Sorry, it is sold.'])
+        self.assertEqual(response.data[0]['sender']['username'], 'user2')
+
+
+class MessagingQueryBudgetTests(QueryBudgetTestCase):
+    """
+    Query budgets of the messaging endpoints, which must not grow with
+    the number of conversations or messages.
+    """
+    urls_module = 'messaging.urls'
+    budgets = {
+        'conversation-list-create': 6,
+        'message-list-create': 5,
+        'mark-messages-as-read': 4,
+        'conversation-unread-counts': 2,
+        'unread-message-count': 2,
+        'listing-incoming-messages': 9,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='pass1234')
+        self.seller = User.objects.create_user(
+            username='seller', email='seller@example.com',
+            password='pass1234')
+        self.category = Category.objects.create(name='Electronics')
+        self.subcategory = Subcategory.objects.create(
+            name='Phones', category=self.category)
+        self.authenticate(self.user)
+        self.conversations = []
+
+    def grow(self, size):
+        """
+        Add conversations about the seller's listings, each with a reply
+        from the seller, archived in every other one, and messages to
+        the first conversation.
+        """
+        for i in range(len(self.conversations), size):
+            listing = Listing.objects.create(
+                title=f'Phone {i}', description='A phone', user=self.seller,
+                category=self.category, subcategory=self.subcategory,
+                price=100)
+            ListingImage.objects.create(
+                listing=listing, image=f'listing-{listing.id}')
+            conversation = Conversation.objects.create(listing=listing)
+            conversation.participants.add(self.user, self.seller)
+            Message.objects.create(
+                conversation=conversation, sender=self.seller,
+                content='Still available')
+            self.conversations.append(conversation)
+            # Every other conversation only has archived messages
+            if i % 2:
+                archive_conversation(conversation)
+        first = self.conversations[0]
+        for i in range(first.messages.count(), size):
+            Message.objects.create(
+                conversation=first,
+                sender=self.seller if i % 2 else self.user,
+                content=f'Message {i}')
+        self.message_ids = list(first.messages.values_list('id', flat=True))
+
+    def request_conversation_list_create(self):
+        return self.client.get(reverse('conversation-list-create'))
+
+    def request_message_list_create(self):
+        return self.client.get(reverse(
+            'message-list-create', args=[self.conversations[0].id]))
+
+    def request_mark_messages_as_read(self):
+        return self.client.post(
+            reverse('mark-messages-as-read',
+                    args=[self.conversations[0].id]),
+            {'message_ids': self.message_ids}, format='json')
+
+    def request_conversation_unread_counts(self):
+        return self.client.get(reverse('conversation-unread-counts'))
+
+    def request_unread_message_count(self):
+        return self.client.get(reverse('unread-message-count'))
+
+    def request_listing_incoming_messages(self):
+        return self.client.get(reverse(
+            'listing-incoming-messages',
+            args=[self.conversations[0].listing_id]))
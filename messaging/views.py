@@ -4,7 +4,7 @@ from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db import transaction
-from .models import Conversation, Message
+from .models import Conversation, ConversationArchive, Message
 from .serializers import (
     ConversationSerializer,
     ConversationDetailSerializer,
@@ -28,10 +28,11 @@ class ConversationListCreate(generics.ListCreateAPIView):
         listing_id = self.request.query_params.get('listing', None)
         if listing_id:
             listing = get_object_or_404(Listing, pk=listing_id)
-            return Conversation.objects.filter(listing=listing,
-                                               participants=user)
+            queryset = Conversation.objects.filter(listing=listing,
+                                                   participants=user)
         else:
-            return Conversation.objects.filter(participants=user)
+            queryset = Conversation.objects.filter(participants=user)
+        return ConversationSerializer.setup_eager_loading(queryset, user)
 
     def list(self, request, *args, **kwargs):
         """Return a list of conversations."""
@@ -117,7 +118,20 @@ class MessageListCreate(generics.ListCreateAPIView):
 
         if self.request.user not in conversation.participants.all():
             return Message.objects.none()
-        return Message.objects.filter(conversation_id=conversation_id)
+        return Message.objects.filter(
+            conversation_id=conversation_id).select_related('sender')
+
+    def list(self, request, *args, **kwargs):
+        """Return archived history followed by live messages."""
+        queryset = self.filter_queryset(self.get_queryset())
+        messages = list(queryset)
+        archive = ConversationArchive.objects.filter(
+            conversation_id=self.kwargs['conversation_id'],
+            conversation__participants=request.user).first()
+        if archive:
+            messages = archive.get_messages() + messages
+        serializer = self.get_serializer(messages, many=True)
+        return Response(serializer.data)
 
     def perform_create(self, serializer):
         """Create a new message associated with the conversation."""
@@ -147,10 +161,11 @@ class ListingIncomingMessages(generics.ListAPIView):
         user = self.request.user
 
         if user == listing.user:
-            return Conversation.objects.filter(listing=listing)
+            queryset = Conversation.objects.filter(listing=listing)
         else:
-            return Conversation.objects.filter(listing=listing,
-                                               participants=user)
+            queryset = Conversation.objects.filter(listing=listing,
+                                                   participants=user)
+        return ConversationSerializer.setup_eager_loading(queryset, user)
 
     def list(self, request, *args, **kwargs):
         """Return a list of conversations related to the listing."""
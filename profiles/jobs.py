@@ -0,0 +1,52 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from listings.models import ArchivedListing, Listing
+from taskqueue.batching import batched_ids
+from .models import Profile
+
+
+def count_listings(model, **filters):
+    """
+    Return a subquery counting the profile user's rows of ``model``.
+
+    Each table is counted in its own subquery, so counting listings and
+    archived listings does not join them per user.
+    """
+    return Coalesce(Subquery(
+        model.objects.filter(user=OuterRef('user_id'), **filters)
+        .order_by().values('user').annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+def reconcile_listing_counts(batch_size=500):
+    """
+    Correct the total and active listing counts of every profile.
+
+    The counts are maintained as listings change, which misses bulk
+    updates and deletions made outside the API. Archived listings count
+    towards the total. Profiles are recounted
+    in batches, and only those whose counts drifted are written.
+
+    Returns:
+        int: Number of profiles corrected.
+    """
+    corrected = 0
+    for ids in batched_ids(Profile.objects.all(), batch_size):
+        profiles = Profile.objects.filter(pk__in=ids).annotate(
+            live_count=count_listings(Listing),
+            archived_count=count_listings(ArchivedListing),
+            active_listing_count=count_listings(Listing, is_active=True),
+        ).only('user_id', 'total_listings', 'active_listings')
+        changed = []
+        for profile in profiles:
+            counts = (profile.live_count + profile.archived_count,
+                      profile.active_listing_count)
+            if (profile.total_listings, profile.active_listings) != counts:
+                profile.total_listings, profile.active_listings = counts
+                changed.append(profile)
+        Profile.objects.bulk_update(
+            changed, ['total_listings', 'active_listings'])
+        corrected += len(changed)
+    return corrected
@@ -18,8 +18,13 @@ class Profile(models.Model):
     num_ratings = models.PositiveIntegerField(default=0)
 
     def update_listing_counts(self):
-        """Update the total and active listings for the user profile."""
-        self.total_listings = self.user.listings.count()
+        """
+        Update the total and active listings for the user profile.
+
+        The total includes listings moved to the archive.
+        """
+        self.total_listings = (self.user.listings.count()
+                               + self.user.archived_listings.count())
         self.active_listings = self.user.listings.filter(
             is_active=True).count()
         self.save()
@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from .models import Profile
 from reviews.serializers import ReviewSerializer
+from locallisting.timing import TimedSerializerMixin
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for the Profile model, exposing public information."""
 
     username = serializers.CharField(source='user.username', read_only=True)
@@ -0,0 +1,10 @@
+from taskqueue.queue import task
+from .models import Profile
+
+
+@task(unique=True)
+def update_listing_counts(user_id):
+    """Recount the total and active listings of a user's profile."""
+    profile = Profile.objects.filter(user_id=user_id).first()
+    if profile is not None:
+        profile.update_listing_counts()
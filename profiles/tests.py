@@ -2,6 +2,11 @@ from django.test import TestCase
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
+from django.urls import reverse
+from listings.models import ArchivedListing, Listing, ListingImage
+from locallisting.testing import QueryBudgetTestCase
+from reviews.models import Review
+from .jobs import reconcile_listing_counts
 from .models import Profile
 from .serializers import ProfileSerializer, PrivateProfileSerializer
 
@@ -49,6 +54,26 @@ class ProfileModelTests(TestCase):
         self.assertEqual(self.profile.total_listings, 2)
         self.assertEqual(self.profile.active_listings, 2)
 
+    def test_reconcile_listing_counts(self):
+        """
+        Test that the scheduled job corrects drifted listing counts.
+        """
+        self.user.listings.create(title="Test Listing 1")
+        self.user.listings.create(title="Test Listing 2", status='sold')
+        for title in ("Archived 1", "Archived 2"):
+            listing = self.user.listings.create(title=title, status='sold')
+            ArchivedListing.from_listing(listing, []).save()
+            listing.delete()
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='pass')
+        Profile.objects.create(user=other)
+
+        self.assertEqual(reconcile_listing_counts(batch_size=1), 1)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.total_listings, 4)
+        self.assertEqual(self.profile.active_listings, 1)
+        self.assertEqual(reconcile_listing_counts(), 0)
+
 
 class ProfileViewTests(TestCase):
     """
@@ -133,3 +158,51 @@ class ProfileSerializerTests(TestCase):
         self.assertEqual(serializer.data['email'], self.user.email)
         self.assertIn('bio', serializer.data)
         self.assertIn('location', serializer.data)
+
+
+class ProfileQueryBudgetTests(QueryBudgetTestCase):
+    """
+    Query budgets of the profile endpoints, which must not grow with
+    the number of listings or reviews of the user.
+    """
+    urls_module = 'profiles.urls'
+    budgets = {
+        'profile-detail': 2,
+        'public-profile': 8,
+        'user-listings': 3,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', email='testuser@example.com',
+            password='testpass123')
+        Profile.objects.create(user=self.user)
+        self.authenticate(self.user)
+        self.size = 0
+
+    def grow(self, size):
+        """Add listings of the user and reviews by other users."""
+        for i in range(self.size, size):
+            listing = Listing.objects.create(
+                title=f'Listing {i}', description='Description',
+                user=self.user, price=10, condition='good')
+            ListingImage.objects.create(
+                listing=listing, image=f'listing-{listing.id}')
+            reviewer = User.objects.create_user(
+                username=f'reviewer{i}', email=f'reviewer{i}@example.com',
+                password='testpass123')
+            Review.objects.create(
+                reviewer=reviewer, reviewed_user=self.user, rating=5,
+                content='Great seller')
+        self.size = size
+
+    def request_profile_detail(self):
+        return self.client.get(reverse('profile-detail'))
+
+    def request_public_profile(self):
+        return self.client.get(
+            reverse('public-profile', args=[self.user.username]))
+
+    def request_user_listings(self):
+        return self.client.get(
+            reverse('user-listings', args=[self.user.username]))
@@ -1,10 +1,12 @@
 from rest_framework import generics, permissions
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 from rest_framework.response import Response
 from .models import Profile
 from .serializers import ProfileSerializer, PrivateProfileSerializer
 from listings.models import Listing
 from listings.serializers import ListingSerializer
+from reviews.models import Review
 
 
 class ProfileDetailView(generics.RetrieveUpdateAPIView):
@@ -21,7 +23,9 @@ class ProfileDetailView(generics.RetrieveUpdateAPIView):
 class PublicProfileView(generics.RetrieveAPIView):
     """View for retrieving a public profile by username."""
 
-    queryset = Profile.objects.all()
+    queryset = Profile.objects.select_related('user').prefetch_related(
+        Prefetch('user__reviews_received',
+                 queryset=Review.objects.select_related('reviewer')))
     serializer_class = ProfileSerializer
     lookup_field = 'user__username'
     lookup_url_kwarg = 'username'
@@ -29,7 +33,8 @@ class PublicProfileView(generics.RetrieveAPIView):
     def retrieve(self, request, *args, **kwargs):
         """Retrieve a public profile and update listing counts."""
         username = self.kwargs.get('username')
-        profile = get_object_or_404(Profile, user__username=username)
+        profile = get_object_or_404(
+            self.get_queryset(), user__username=username)
         profile.update_listing_counts()  # Update counts before returning
         serializer = self.get_serializer(profile)
         return Response(serializer.data)
@@ -45,7 +50,8 @@ class UserListingsView(generics.ListAPIView):
         username = self.kwargs['username']
         queryset = Listing.objects.filter(user__username=username)
         active_queryset = queryset.filter(is_active=True)
-        return active_queryset
+        return ListingSerializer.setup_eager_loading(
+            active_queryset, self.request.user)
 
     def list(self, request, *args, **kwargs):
         """Return a list of active listings for the specified user."""
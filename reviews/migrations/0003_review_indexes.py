@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-19 05:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_alter_review_unique_together'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['reviewed_user', '-created_at'], name='review_reviewed_created_idx'),
+        ),
+    ]
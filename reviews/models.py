@@ -22,6 +22,12 @@ class Review(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['reviewed_user', '-created_at'],
+                         name='review_reviewed_created_idx'),
+        ]
+
     def __str__(self):
         """Return a string representation of the review."""
         return (
@@ -1,11 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .models import Review
+from locallisting.timing import TimedSerializerMixin
 
 User = get_user_model()
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for the Review model."""
 
     reviewer_username = serializers.SerializerMethodField()
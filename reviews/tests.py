@@ -2,6 +2,8 @@ from django.test import TestCase
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
+from django.urls import reverse
+from locallisting.testing import QueryBudgetTestCase
 from .models import Review
 from .serializers import ReviewSerializer
 
@@ -183,3 +185,52 @@ class ReviewSerializerTests(TestCase):
         self.assertEqual(data['reviewed_user'], self.reviewed_user.id)
         self.assertEqual(data['rating'], 5)
         self.assertEqual(data['content'], 'Fantastic user!')
+
+
+class ReviewQueryBudgetTests(QueryBudgetTestCase):
+    """
+    Query budgets of the review endpoints, which must not grow with the
+    number of reviews.
+    """
+    urls_module = 'reviews.urls'
+    budgets = {
+        'review-list': 2,
+        'review-detail': 2,
+        'reviewer-review-detail': 2,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='reviewer', email='reviewer@example.com',
+            password='testpass123')
+        self.reviewed_user = User.objects.create_user(
+            username='reviewed', email='reviewed@example.com',
+            password='testpass123')
+        self.review = Review.objects.create(
+            reviewer=self.user, reviewed_user=self.reviewed_user, rating=4,
+            content='Good seller')
+        self.authenticate(self.user)
+        self.size = 1
+
+    def grow(self, size):
+        """Add reviews of the reviewed user by other users."""
+        for i in range(self.size, size):
+            reviewer = User.objects.create_user(
+                username=f'reviewer{i}', email=f'reviewer{i}@example.com',
+                password='testpass123')
+            Review.objects.create(
+                reviewer=reviewer, reviewed_user=self.reviewed_user,
+                rating=5, content='Great seller')
+        self.size = size
+
+    def request_review_list(self):
+        return self.client.get(
+            reverse('review-list', args=[self.reviewed_user.id]))
+
+    def request_review_detail(self):
+        return self.client.get(reverse('review-detail', args=[self.review.id]))
+
+    def request_reviewer_review_detail(self):
+        return self.client.get(reverse(
+            'reviewer-review-detail',
+            args=[self.reviewed_user.id, self.user.id]))
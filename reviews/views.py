@@ -16,7 +16,8 @@ class ReviewList(generics.ListCreateAPIView):
     def get_queryset(self):
         """Return reviews for the specified reviewed user."""
         reviewed_user_id = self.kwargs['user_id']
-        return Review.objects.filter(reviewed_user_id=reviewed_user_id)
+        return Review.objects.filter(
+            reviewed_user_id=reviewed_user_id).select_related('reviewer')
 
     def create(self, request, *args, **kwargs):
         """Create a new review or update an existing one."""
@@ -61,7 +62,7 @@ class ReviewList(generics.ListCreateAPIView):
 class ReviewDetail(generics.RetrieveUpdateDestroyAPIView):
     """View for retrieving, updating, and deleting a review."""
 
-    queryset = Review.objects.all()
+    queryset = Review.objects.select_related('reviewer')
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -110,7 +111,8 @@ class ReviewerReviewDetail(generics.RetrieveAPIView):
         reviewed_user_id = self.kwargs['user_id']
         reviewer_id = self.kwargs['reviewer_id']
         review = Review.objects.filter(
-            reviewed_user_id=reviewed_user_id, reviewer_id=reviewer_id).first()
+            reviewed_user_id=reviewed_user_id, reviewer_id=reviewer_id
+        ).select_related('reviewer').first()
         return review
 
     def retrieve(self, request, *args, **kwargs):
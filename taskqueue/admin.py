@@ -0,0 +1,49 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import JobRun, ScheduledJob, Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """
+    Admin view for queued, running and failed background tasks.
+
+    Failed tasks can be queued again with the retry action.
+    """
+    list_display = ('id', 'name', 'status', 'priority', 'attempts',
+                    'run_at', 'locked_by', 'created_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = ('locked_by', 'locked_at', 'last_error', 'created_at')
+    actions = ['retry_tasks']
+
+    @admin.action(description='Retry selected failed tasks')
+    def retry_tasks(self, request, queryset):
+        updated = queryset.filter(status=Task.FAILED).update(
+            status=Task.QUEUED, attempts=0, run_at=timezone.now())
+        self.message_user(request, f"{updated} task(s) queued again.")
+
+
+@admin.register(ScheduledJob)
+class ScheduledJobAdmin(admin.ModelAdmin):
+    """
+    Admin view for the next run and lease of each scheduled job.
+    """
+    list_display = ('name', 'schedule', 'next_run_at', 'locked_by',
+                    'locked_until')
+    readonly_fields = ('name', 'schedule', 'locked_by', 'locked_until')
+
+
+@admin.register(JobRun)
+class JobRunAdmin(admin.ModelAdmin):
+    """
+    Read-only admin view of the scheduled job run history.
+    """
+    list_display = ('name', 'status', 'started_at', 'duration', 'worker')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'error')
+    readonly_fields = [field.name for field in JobRun._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.utils.module_loading import autodiscover_modules
+
+
+class TaskqueueConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "taskqueue"
+
+    def ready(self):
+        # Register the @task functions of every app's tasks module
+        autodiscover_modules('tasks')
+
+        if settings.METRICS_ENABLED:
+            from locallisting.metrics import register_queue_depth
+            from .queue import get_queue_depth
+            register_queue_depth('tasks', get_queue_depth)
@@ -0,0 +1,51 @@
+"""
+Helpers for processing large querysets in short transactions.
+
+Maintenance jobs and tasks touch tables the API writes to constantly
+(``Listing``, ``Message``), so they work through primary-key batches and
+commit after each one instead of locking every matching row at once.
+"""
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def batched_ids(queryset, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield the primary keys of ``queryset`` in ascending batches.
+
+    Batches are fetched with keyset pagination on the primary key, so
+    each query is an index range scan however far the iteration gets.
+
+    Args:
+        queryset (QuerySet): Rows to iterate over.
+        batch_size (int): Maximum number of keys per batch.
+
+    Yields:
+        list: Primary keys of the next batch.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        ids = list(page.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+def delete_in_batches(queryset, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Delete the rows of ``queryset`` in batches of ``batch_size``.
+
+    Returns:
+        int: Number of rows of the queryset's model deleted.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        _, counts = model.objects.filter(pk__in=ids).delete()
+        deleted += counts.get(model._meta.label, 0)
@@ -0,0 +1,144 @@
+"""
+Cron-style schedules for scheduled jobs.
+
+Supports the five standard fields (minute, hour, day of month, month,
+day of week) with ``*``, lists, ranges and steps, e.g. ``*/15 * * * *``
+or ``30 3 * * 1-5``, and the ``@hourly``, ``@daily``, ``@weekly`` and
+``@monthly`` aliases. Schedules are evaluated in UTC.
+
+As in cron, a day of month and a day of week that are both restricted
+match when either of them does. Cron implementations disagree on
+whether a stepped ``*`` such as ``*/2`` counts as restricted, so a
+day field stepping over only part of its range is rejected when the
+other day field is restricted, e.g. ``0 0 */2 * 1``; a step covering
+the whole range, such as ``*/1``, is the same as ``*``.
+"""
+
+from datetime import timedelta, timezone as dt_timezone
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+# (lowest, highest) value of each field
+FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def _parse_field(field, low, high):
+    """
+    Return the set of values matched by one cron field.
+
+    Raises:
+        ValueError: If the field is malformed or out of range.
+    """
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Invalid step in {field!r}")
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"{field!r} is out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    A parsed cron expression.
+
+    Args:
+        expression (str): Five-field cron expression or alias.
+
+    Raises:
+        ValueError: If the expression is invalid.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = ALIASES.get(expression, expression).split()
+        if len(fields) != 5:
+            raise ValueError(
+                f"Cron expression {expression!r} must have five fields")
+        try:
+            (self.minutes, self.hours, self.days, self.months,
+             weekdays) = (
+                _parse_field(field, low, high)
+                for field, (low, high) in zip(fields, FIELD_RANGES))
+        except ValueError as error:
+            raise ValueError(
+                f"Invalid cron expression {expression!r}: {error}") from error
+        # Both 0 and 7 mean Sunday
+        self.weekdays = {day % 7 for day in weekdays}
+        # A day field is unrestricted when it is * or steps over its
+        # whole range
+        self.any_day = (fields[2].startswith('*')
+                        and self.days == set(range(1, 32)))
+        self.any_weekday = (fields[4].startswith('*')
+                            and self.weekdays == set(range(7)))
+        if not (self.any_day or self.any_weekday) and any(
+                part.startswith('*')
+                for field in (fields[2], fields[4])
+                for part in field.split(',')):
+            raise ValueError(
+                f"Invalid cron expression {expression!r}: a stepped day of "
+                f"month or day of week is ambiguous when the other is "
+                f"restricted")
+
+    def _day_matches(self, moment):
+        day_matches = moment.day in self.days
+        # Python counts weekdays from Monday, cron from Sunday
+        weekday_matches = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return weekday_matches
+        if self.any_weekday:
+            return day_matches
+        return day_matches or weekday_matches
+
+    def next_after(self, moment):
+        """
+        Return the first matching minute strictly after ``moment``.
+
+        Args:
+            moment (datetime): Timezone-aware start time.
+
+        Returns:
+            datetime: Next run time in UTC.
+        """
+        moment = moment.astimezone(dt_timezone.utc).replace(
+            second=0, microsecond=0) + timedelta(minutes=1)
+        # Skip whole months, days and hours that cannot match; a valid
+        # expression matches within a few years
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                year = moment.year + moment.month // 12
+                month = moment.month % 12 + 1
+                moment = moment.replace(
+                    year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(
+                    hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"{self.expression!r} never matches")
+
+    def __repr__(self):
+        return f"CronSchedule({self.expression!r})"
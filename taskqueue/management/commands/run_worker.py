@@ -0,0 +1,57 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from prometheus_client import multiprocess
+
+from locallisting import metrics
+from taskqueue.worker import Worker
+
+
+class Command(BaseCommand):
+    """
+    Run queued background tasks.
+
+    Runs until SIGTERM or SIGINT; with --burst it exits once the queue
+    is empty. Scheduled jobs run in the same process unless
+    SCHEDULER_ENABLED is off or --no-scheduler is given.
+
+    The worker's metrics are served on METRICS_WORKER_PORT when it is
+    set, or by the web process's /metrics when both share
+    PROMETHEUS_MULTIPROC_DIR.
+    """
+    help = 'Run background tasks from the database task queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=settings.TASK_WORKER_THREADS,
+            help='Number of worker threads.')
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.TASK_POLL_INTERVAL,
+            help='Seconds to wait when the queue is empty.')
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once the queue is empty.')
+        parser.add_argument(
+            '--no-scheduler', action='store_true',
+            help='Do not run scheduled jobs in this worker.')
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            threads=options['threads'],
+            poll_interval=options['poll_interval'],
+            burst=options['burst'],
+            scheduler=(settings.SCHEDULER_ENABLED
+                       and not options['no_scheduler']),
+        )
+        self.stdout.write(
+            f"Task worker {worker.name} running with "
+            f"{options['threads']} thread(s).")
+        if settings.METRICS_ENABLED and settings.METRICS_WORKER_PORT:
+            metrics.start_metrics_server(settings.METRICS_WORKER_PORT)
+        processed = worker.run()
+        if settings.METRICS_ENABLED and metrics.MULTIPROCESS:
+            # Drop the live gauges of this process
+            multiprocess.mark_process_dead(os.getpid())
+        self.stdout.write(f"Task worker stopped after {processed} task(s).")
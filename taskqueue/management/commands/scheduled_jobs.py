@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from taskqueue.models import JobRun, ScheduledJob
+from taskqueue.scheduler import Scheduler
+
+
+class Command(BaseCommand):
+    """
+    List the scheduled jobs, or run one immediately with --run.
+    """
+    help = 'Show scheduled jobs and their last runs, or run one now.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--run', metavar='NAME',
+            help='Run the named job now and record the run.')
+
+    def handle(self, *args, **options):
+        scheduler = Scheduler('manage.py')
+        name = options['run']
+        if name:
+            if name not in scheduler.jobs:
+                raise CommandError(f"Unknown scheduled job {name!r}.")
+            run = scheduler.run_job(name)
+            self.stdout.write(
+                f"{name} {run.status} in {run.duration:.2f}s: "
+                f"{run.result or run.error}")
+            return
+
+        scheduler.sync()
+        rows = ScheduledJob.objects.in_bulk(list(scheduler.jobs))
+        for name, job in scheduler.jobs.items():
+            last_run = JobRun.objects.filter(name=name).first()
+            last = 'never run'
+            if last_run:
+                last = (f"last {last_run.status} at "
+                        f"{last_run.started_at:%Y-%m-%d %H:%M}")
+            self.stdout.write(
+                f"{name}: {job.schedule.expression}, next at "
+                f"{rows[name].next_run_at:%Y-%m-%d %H:%M}, {last}")
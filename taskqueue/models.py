@@ -0,0 +1,139 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    A background task waiting to run, running, or failed for good.
+
+    Tasks are deleted once they succeed; failed tasks are kept for
+    inspection and can be retried from the admin.
+
+    Attributes:
+        name (str): Registered name of the task function.
+        kwargs (dict): Keyword arguments for the task function.
+        priority (int): Higher priority tasks are claimed first.
+        status (str): queued, running or failed.
+        unique_key (str): When set, at most one queued task has this key.
+        attempts (int): Number of times the task has been started.
+        max_attempts (int): Attempts before the task is marked failed.
+        run_at (datetime): The task is not claimed before this time.
+        locked_by (str): Worker thread running the task.
+        locked_at (datetime): When the task was claimed.
+        last_error (str): Traceback of the last failed attempt.
+        created_at (datetime): When the task was enqueued.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200)
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    unique_key = models.CharField(max_length=64, null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-priority', 'run_at']
+        indexes = [
+            # Claiming: the next queued task by priority and due time
+            models.Index(fields=['-priority', 'run_at'],
+                         condition=models.Q(status='queued'),
+                         name='task_queued_idx'),
+            models.Index(fields=['locked_at'],
+                         condition=models.Q(status='running'),
+                         name='task_running_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['unique_key'], condition=models.Q(status='queued'),
+                name='task_unique_queued_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class ScheduledJob(models.Model):
+    """
+    Scheduler state of a job declared in SCHEDULED_JOBS.
+
+    The row doubles as the job's lease: a scheduler must set
+    ``locked_by`` and ``locked_until`` with a conditional update before
+    running the job, so only one of many worker dynos runs each due job.
+
+    Attributes:
+        name (str): Name of the job in SCHEDULED_JOBS.
+        schedule (str): Cron expression the next run was computed from.
+        next_run_at (datetime): When the job is next due.
+        locked_by (str): Scheduler holding the lease.
+        locked_until (datetime): When the lease expires.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    schedule = models.CharField(max_length=100)
+    next_run_at = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_run_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.schedule})"
+
+
+class JobRun(models.Model):
+    """
+    One run of a scheduled job.
+
+    Attributes:
+        name (str): Name of the job in SCHEDULED_JOBS.
+        status (str): running, succeeded or failed.
+        worker (str): Scheduler that ran the job.
+        started_at (datetime): When the run started.
+        finished_at (datetime): When the run finished.
+        duration (float): Run time in seconds.
+        result (str): Value returned by the job.
+        error (str): Traceback of a failed run.
+    """
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=RUNNING)
+    worker = models.CharField(max_length=100, blank=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True)
+    result = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['name', '-started_at'],
+                         name='jobrun_name_started_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} at {self.started_at} ({self.status})"
@@ -0,0 +1,268 @@
+"""
+Background tasks stored in the application database.
+
+Functions decorated with ``@task`` are enqueued with
+``func.enqueue(**kwargs)`` and run by ``manage.py run_worker``. Workers
+claim tasks with SELECT ... FOR UPDATE SKIP LOCKED, so any number of
+worker threads and processes can share the queue. With TASKS_EAGER set
+(the default under tests) tasks run immediately in the caller.
+"""
+
+import hashlib
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+
+# Task name -> TaskFunction
+_registry = {}
+
+
+class TaskFunction:
+    """A function registered as a background task."""
+
+    def __init__(self, func, priority, max_attempts, unique):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__name__}'
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.unique = unique
+        self.__doc__ = func.__doc__
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def enqueue(self, run_at=None, **kwargs):
+        """
+        Queue the task to run with ``kwargs``, which must be JSON
+        serializable.
+
+        Args:
+            run_at (datetime): Earliest time to run the task.
+
+        Returns:
+            Task: The queued task, or None when run eagerly.
+        """
+        if settings.TASKS_EAGER:
+            run_eagerly(self, kwargs)
+            return None
+
+        task = Task(
+            name=self.name,
+            kwargs=kwargs,
+            priority=self.priority,
+            max_attempts=self.max_attempts or settings.TASK_MAX_ATTEMPTS,
+            run_at=run_at or timezone.now(),
+        )
+        if not self.unique:
+            task.save()
+            return task
+
+        # An identical task already waiting will do the same work
+        task.unique_key = hashlib.sha256(
+            f'{self.name}:{json.dumps(kwargs, sort_keys=True)}'.encode()
+        ).hexdigest()
+        try:
+            with transaction.atomic():
+                task.save()
+        except IntegrityError:
+            return Task.objects.filter(
+                unique_key=task.unique_key, status=Task.QUEUED).first()
+        return task
+
+    def enqueue_many(self, kwargs_list, run_at=None):
+        """
+        Queue the task once per kwargs dict, with a single insert.
+
+        Args:
+            kwargs_list (list): The kwargs of each task.
+            run_at (datetime): Earliest time to run the tasks.
+
+        Returns:
+            list: The queued tasks; empty when run eagerly.
+        """
+        if self.unique:
+            raise ValueError("Unique tasks must be enqueued one at a time")
+        if settings.TASKS_EAGER:
+            for kwargs in kwargs_list:
+                run_eagerly(self, kwargs)
+            return []
+
+        run_at = run_at or timezone.now()
+        return Task.objects.bulk_create([
+            Task(
+                name=self.name,
+                kwargs=kwargs,
+                priority=self.priority,
+                max_attempts=self.max_attempts or settings.TASK_MAX_ATTEMPTS,
+                run_at=run_at,
+            )
+            for kwargs in kwargs_list
+        ])
+
+
+def task(priority=PRIORITY_NORMAL, max_attempts=None, unique=False):
+    """
+    Register a function as a background task.
+
+    Args:
+        priority (int): Higher priority tasks are claimed first.
+        max_attempts (int): Attempts before giving up; defaults to
+            TASK_MAX_ATTEMPTS.
+        unique (bool): Skip enqueueing when an identical task (same
+            arguments) is already queued.
+    """
+    def decorator(func):
+        task_function = TaskFunction(func, priority, max_attempts, unique)
+        _registry[task_function.name] = task_function
+        return task_function
+    return decorator
+
+
+def run_eagerly(task_function, kwargs):
+    """Run a task in the caller, logging instead of raising errors."""
+    try:
+        task_function.func(**kwargs)
+    except Exception:
+        logger.exception("Task %s failed", task_function.name)
+
+
+def retry_delay(attempts):
+    """
+    Return the delay before retrying a task that failed ``attempts``
+    times: exponential backoff with jitter, capped at
+    TASK_RETRY_BACKOFF_MAX seconds.
+    """
+    delay = min(settings.TASK_RETRY_BACKOFF * 2 ** (attempts - 1),
+                settings.TASK_RETRY_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def claim_task(worker_id):
+    """
+    Claim the next due task for ``worker_id``.
+
+    Returns:
+        Task: The claimed task, now running, or None if none is due.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        task = (
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(status=Task.QUEUED, run_at__lte=now)
+            .order_by('-priority', 'run_at')
+            .first()
+        )
+        if task is None:
+            return None
+        # The status check keeps claiming safe on SQLite, which has no
+        # row locks
+        claimed = Task.objects.filter(
+            pk=task.pk, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_by=worker_id, locked_at=now,
+            attempts=task.attempts + 1)
+    if not claimed:
+        return None
+    task.status = Task.RUNNING
+    task.locked_by = worker_id
+    task.locked_at = now
+    task.attempts += 1
+    return task
+
+
+def _requeue(task, **fields):
+    """
+    Put a task back in the queue, dropping it if an identical task was
+    queued in the meantime.
+    """
+    try:
+        with transaction.atomic():
+            Task.objects.filter(pk=task.pk).update(
+                status=Task.QUEUED, locked_by='', locked_at=None, **fields)
+    except IntegrityError:
+        Task.objects.filter(pk=task.pk).delete()
+
+
+def run_task(task):
+    """
+    Run a claimed task, then delete it, schedule a retry or mark it
+    failed.
+
+    Returns:
+        bool: Whether the task succeeded.
+    """
+    task_function = _registry.get(task.name)
+    try:
+        if task_function is None:
+            raise LookupError(f"Unknown task {task.name}")
+        task_function.func(**task.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if task.attempts >= task.max_attempts:
+            logger.error("Task %s (%s) failed for good:\n%s",
+                         task.name, task.pk, error)
+            Task.objects.filter(pk=task.pk).update(
+                status=Task.FAILED, locked_by='', locked_at=None,
+                last_error=error)
+        else:
+            logger.warning("Task %s (%s) failed, retrying:\n%s",
+                           task.name, task.pk, error)
+            _requeue(task, last_error=error,
+                     run_at=timezone.now() + retry_delay(task.attempts))
+        return False
+    Task.objects.filter(pk=task.pk).delete()
+    return True
+
+
+def refresh_locks(worker_name):
+    """
+    Refresh the locks of the tasks running in the threads of worker
+    ``worker_name``.
+
+    Workers call this every TASK_HEARTBEAT_INTERVAL seconds, so tasks
+    running for longer than TASK_LOCK_TIMEOUT are not taken for
+    abandoned.
+
+    Returns:
+        int: Number of running tasks.
+    """
+    return Task.objects.filter(
+        status=Task.RUNNING, locked_by__startswith=f'{worker_name}:'
+    ).update(locked_at=timezone.now())
+
+
+def requeue_stale_tasks():
+    """
+    Requeue tasks whose worker has not refreshed their lock for
+    TASK_LOCK_TIMEOUT seconds, i.e. that were left running by a worker
+    that died.
+
+    Returns:
+        int: Number of tasks requeued.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.TASK_LOCK_TIMEOUT)
+    stale = list(Task.objects.filter(
+        status=Task.RUNNING, locked_at__lt=cutoff))
+    for task in stale:
+        logger.warning("Requeueing task %s (%s) abandoned by %s",
+                       task.name, task.pk, task.locked_by)
+        _requeue(task)
+    return len(stale)
+
+
+def get_queue_depth():
+    """Return the number of queued tasks."""
+    return Task.objects.filter(status=Task.QUEUED).count()
@@ -0,0 +1,195 @@
+"""
+Periodic jobs declared in the SCHEDULED_JOBS setting.
+
+Every task worker runs a scheduler thread. The schedulers of all dynos
+share one ScheduledJob row per job, which serves as a lease: a scheduler
+runs a due job only after claiming the row with a conditional update,
+so each run happens on exactly one dyno. The worker's heartbeat
+extends the leases of the jobs it is running, so long runs keep them; a
+scheduler that dies mid-run leaves the job due, and another one runs it
+again once the lease expires. Every run is recorded as a JobRun with
+its duration and result.
+
+Jobs are plain functions referenced by dotted path. They should work in
+batches (see ``taskqueue.batching``) so they never hold long locks on
+busy tables.
+"""
+
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .cron import CronSchedule
+from .models import JobRun, ScheduledJob
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """
+    A job declared in SCHEDULED_JOBS.
+
+    Args:
+        name (str): Name of the job.
+        job (str): Dotted path of the function to run.
+        schedule (str): Cron expression.
+        kwargs (dict): Keyword arguments for the function.
+    """
+
+    def __init__(self, name, job, schedule, kwargs=None):
+        self.name = name
+        self.path = job
+        self.schedule = CronSchedule(schedule)
+        self.kwargs = kwargs or {}
+
+    def __call__(self):
+        return import_string(self.path)(**self.kwargs)
+
+
+def get_jobs():
+    """Return the jobs declared in SCHEDULED_JOBS by name."""
+    return {
+        name: Job(name, **options)
+        for name, options in settings.SCHEDULED_JOBS.items()
+    }
+
+
+class Scheduler:
+    """
+    Run due scheduled jobs, at most one scheduler per job at a time.
+
+    Args:
+        worker_id (str): Name recorded as the lease holder and in the
+            run history.
+        jobs (dict): Jobs by name; defaults to SCHEDULED_JOBS.
+    """
+
+    def __init__(self, worker_id, jobs=None):
+        self.worker_id = worker_id
+        self.jobs = get_jobs() if jobs is None else jobs
+
+    def sync(self, now=None):
+        """
+        Create the rows of new jobs and reschedule jobs whose schedule
+        changed in settings.
+        """
+        now = now or timezone.now()
+        rows = {row.name: row for row in ScheduledJob.objects.filter(
+            name__in=self.jobs)}
+        for name, job in self.jobs.items():
+            row = rows.get(name)
+            if row is None:
+                ScheduledJob.objects.get_or_create(name=name, defaults={
+                    'schedule': job.schedule.expression,
+                    'next_run_at': job.schedule.next_after(now),
+                })
+            elif row.schedule != job.schedule.expression:
+                ScheduledJob.objects.filter(name=name).update(
+                    schedule=job.schedule.expression,
+                    next_run_at=job.schedule.next_after(now))
+
+    def acquire(self, name, now):
+        """
+        Take the lease of a due job.
+
+        Returns:
+            bool: Whether this scheduler may run the job.
+        """
+        lease = timedelta(seconds=settings.SCHEDULER_LEASE_TIMEOUT)
+        return bool(
+            ScheduledJob.objects.filter(
+                Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+                name=name, next_run_at__lte=now,
+            ).update(locked_by=self.worker_id, locked_until=now + lease)
+        )
+
+    def release(self, name):
+        """Schedule the next run of a job and give up its lease."""
+        job = self.jobs[name]
+        ScheduledJob.objects.filter(
+            name=name, locked_by=self.worker_id).update(
+            next_run_at=job.schedule.next_after(timezone.now()),
+            locked_by='', locked_until=None)
+
+    def run_job(self, name):
+        """
+        Run a job now and record the run, without taking its lease.
+
+        Returns:
+            JobRun: The finished run.
+        """
+        run = JobRun.objects.create(name=name, worker=self.worker_id)
+        started = time.monotonic()
+        try:
+            result = self.jobs[name]()
+        except Exception:
+            run.status = JobRun.FAILED
+            run.error = traceback.format_exc()
+            logger.error("Scheduled job %s failed:\n%s", name, run.error)
+        else:
+            run.status = JobRun.SUCCEEDED
+            run.result = '' if result is None else str(result)
+        run.duration = time.monotonic() - started
+        run.finished_at = timezone.now()
+        run.save(update_fields=[
+            'status', 'error', 'result', 'duration', 'finished_at'])
+        logger.info("Scheduled job %s %s in %.2fs",
+                    name, run.status, run.duration)
+        return run
+
+    def run_pending(self, now=None):
+        """
+        Run every job that is due and not leased by another scheduler.
+
+        Returns:
+            list: The JobRuns of the jobs run.
+        """
+        now = now or timezone.now()
+        due = ScheduledJob.objects.filter(
+            name__in=self.jobs, next_run_at__lte=now
+        ).values_list('name', flat=True)
+        runs = []
+        for name in due:
+            if not self.acquire(name, now):
+                continue
+            try:
+                runs.append(self.run_job(name))
+            finally:
+                self.release(name)
+        return runs
+
+
+def refresh_leases(worker_name):
+    """
+    Extend the leases of the jobs run by the scheduler of worker
+    ``worker_name`` by SCHEDULER_LEASE_TIMEOUT seconds.
+
+    Workers call this every TASK_HEARTBEAT_INTERVAL seconds, so jobs
+    running for longer than the lease are not run again elsewhere.
+
+    Returns:
+        int: Number of leases extended.
+    """
+    lease = timedelta(seconds=settings.SCHEDULER_LEASE_TIMEOUT)
+    return ScheduledJob.objects.filter(
+        locked_by__startswith=f'{worker_name}:'
+    ).update(locked_until=timezone.now() + lease)
+
+
+def prune_job_runs(days=None):
+    """
+    Delete the history of job runs older than SCHEDULER_HISTORY_DAYS.
+
+    Returns:
+        int: Number of runs deleted.
+    """
+    days = settings.SCHEDULER_HISTORY_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = JobRun.objects.filter(started_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,300 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from .cron import CronSchedule
+from .models import JobRun, ScheduledJob, Task
+from .queue import (
+    PRIORITY_HIGH, claim_task, refresh_locks, requeue_stale_tasks,
+    run_task, task
+)
+from .scheduler import Scheduler, prune_job_runs, refresh_leases
+
+calls = []
+
+
+@task()
+def record(value):
+    calls.append(value)
+
+
+@task(priority=PRIORITY_HIGH)
+def record_urgent(value):
+    calls.append(value)
+
+
+@task(unique=True)
+def record_once(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def fail(value):
+    raise RuntimeError(value)
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTests(TestCase):
+    """
+    Test cases for enqueueing, claiming and running tasks.
+    """
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_stores_task(self):
+        queued = record.enqueue(value=1)
+        self.assertEqual(queued.name, 'taskqueue.tests.record')
+        self.assertEqual(queued.kwargs, {'value': 1})
+        self.assertEqual(queued.status, Task.QUEUED)
+        self.assertEqual(calls, [])
+
+    def test_unique_tasks_are_not_queued_twice(self):
+        first = record_once.enqueue(value=1)
+        self.assertEqual(record_once.enqueue(value=1), first)
+        record_once.enqueue(value=2)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_enqueue_many(self):
+        record.enqueue_many([{'value': 1}, {'value': 2}])
+        self.assertEqual(
+            sorted(task.kwargs['value'] for task in Task.objects.all()),
+            [1, 2])
+        with self.assertRaises(ValueError):
+            record_once.enqueue_many([{'value': 1}])
+
+    def test_claims_by_priority_then_due_time(self):
+        record.enqueue(value='normal')
+        record_urgent.enqueue(value='urgent')
+        record.enqueue(value='later',
+                       run_at=timezone.now() + timedelta(hours=1))
+        first = claim_task('worker')
+        self.assertEqual(first.kwargs, {'value': 'urgent'})
+        self.assertEqual(first.status, Task.RUNNING)
+        self.assertEqual(first.attempts, 1)
+        self.assertEqual(claim_task('worker').kwargs, {'value': 'normal'})
+        self.assertIsNone(claim_task('worker'))
+
+    def test_successful_task_is_deleted(self):
+        record.enqueue(value=1)
+        self.assertTrue(run_task(claim_task('worker')))
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_task_is_retried_with_backoff_then_failed(self):
+        queued = fail.enqueue(value='boom')
+        self.assertFalse(run_task(claim_task('worker')))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.QUEUED)
+        self.assertGreater(queued.run_at, timezone.now())
+        self.assertIn('RuntimeError: boom', queued.last_error)
+
+        Task.objects.update(run_at=timezone.now())
+        self.assertFalse(run_task(claim_task('worker')))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.FAILED)
+        self.assertEqual(queued.attempts, 2)
+
+    @override_settings(TASK_LOCK_TIMEOUT=60)
+    def test_stale_running_tasks_are_requeued(self):
+        record.enqueue(value=1)
+        claim_task('dead-worker')
+        Task.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(requeue_stale_tasks(), 1)
+        self.assertEqual(Task.objects.get().status, Task.QUEUED)
+
+    @override_settings(TASK_LOCK_TIMEOUT=60)
+    def test_running_tasks_with_heartbeat_are_kept(self):
+        record.enqueue(value=1)
+        record.enqueue(value=2)
+        live = claim_task('host:1:0')
+        claim_task('host:12:0')
+        Task.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(refresh_locks('host:1'), 1)
+        self.assertEqual(requeue_stale_tasks(), 1)
+        live.refresh_from_db()
+        self.assertEqual(live.status, Task.RUNNING)
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        self.assertIsNone(record.enqueue(value=1))
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.exists())
+
+
+@override_settings(TASKS_EAGER=False)
+class RunWorkerCommandTests(TransactionTestCase):
+    """
+    Test case for the run_worker command.
+    """
+
+    def setUp(self):
+        calls.clear()
+
+    def test_burst_runs_all_queued_tasks(self):
+        labels = {'task': record.name, 'result': 'succeeded'}
+        before = REGISTRY.get_sample_value('tasks_run_total', labels) or 0
+        for value in range(3):
+            record.enqueue(value=value)
+        out = StringIO()
+        call_command('run_worker', threads=1, burst=True, stdout=out)
+        self.assertEqual(sorted(calls), [0, 1, 2])
+        self.assertFalse(Task.objects.exists())
+        self.assertIn('after 3 task(s)', out.getvalue())
+        self.assertEqual(
+            REGISTRY.get_sample_value('tasks_run_total', labels), before + 3)
+
+
+def scheduled_job(value):
+    calls.append(value)
+    return value
+
+
+def failing_job():
+    raise RuntimeError('boom')
+
+
+TEST_JOBS = {
+    'record': {
+        'job': 'taskqueue.tests.scheduled_job',
+        'schedule': '*/5 * * * *',
+        'kwargs': {'value': 'ran'},
+    },
+    'fail': {'job': 'taskqueue.tests.failing_job', 'schedule': '@daily'},
+}
+
+
+class CronScheduleTests(TestCase):
+    """
+    Test cases for parsing cron expressions and finding the next run.
+    """
+
+    def next_after(self, expression, moment):
+        return CronSchedule(expression).next_after(moment)
+
+    def test_steps_and_ranges(self):
+        moment = datetime(2024, 5, 10, 12, 7, 30, tzinfo=dt_timezone.utc)
+        self.assertEqual(self.next_after('*/15 * * * *', moment),
+                         moment.replace(minute=15, second=0))
+        self.assertEqual(self.next_after('0 9-17/4 * * *', moment),
+                         moment.replace(hour=13, minute=0, second=0))
+
+    def test_rolls_over_days_months_and_years(self):
+        moment = datetime(2024, 12, 31, 23, 59, tzinfo=dt_timezone.utc)
+        self.assertEqual(self.next_after('@daily', moment),
+                         datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(self.next_after('0 0 29 2 *', moment),
+                         datetime(2028, 2, 29, tzinfo=dt_timezone.utc))
+
+    def test_day_of_week(self):
+        # 2024-05-10 is a Friday
+        moment = datetime(2024, 5, 10, tzinfo=dt_timezone.utc)
+        self.assertEqual(self.next_after('30 3 * * 1', moment),
+                         datetime(2024, 5, 13, 3, 30, tzinfo=dt_timezone.utc))
+        self.assertEqual(self.next_after('0 0 * * 7', moment),
+                         datetime(2024, 5, 12, tzinfo=dt_timezone.utc))
+        # Day of month or day of week when both are restricted
+        self.assertEqual(self.next_after('0 0 1 * 6', moment),
+                         datetime(2024, 5, 11, tzinfo=dt_timezone.utc))
+        # A step over the whole range is the same as *
+        self.assertEqual(self.next_after('0 0 */1 * 1', moment),
+                         datetime(2024, 5, 13, tzinfo=dt_timezone.utc))
+        self.assertEqual(self.next_after('0 0 */2 * *', moment),
+                         datetime(2024, 5, 11, tzinfo=dt_timezone.utc))
+
+    def test_invalid_expressions(self):
+        for expression in ['* * * *', '60 * * * *', '*/0 * * * *', 'x',
+                           '0 0 */2 * 1', '0 0 1 * */2']:
+            with self.assertRaises(ValueError):
+                CronSchedule(expression)
+
+
+@override_settings(SCHEDULED_JOBS=TEST_JOBS)
+class SchedulerTests(TestCase):
+    """
+    Test cases for leasing, running and recording scheduled jobs.
+    """
+
+    def setUp(self):
+        calls.clear()
+        self.scheduler = Scheduler('worker-1')
+        self.scheduler.sync()
+
+    def make_due(self):
+        ScheduledJob.objects.update(
+            next_run_at=timezone.now() - timedelta(minutes=1))
+
+    def test_sync_schedules_jobs(self):
+        job = ScheduledJob.objects.get(name='record')
+        self.assertEqual(job.next_run_at.minute % 5, 0)
+        self.assertGreater(job.next_run_at, timezone.now())
+        self.assertEqual(self.scheduler.run_pending(), [])
+
+    def test_sync_reschedules_changed_jobs(self):
+        ScheduledJob.objects.filter(name='fail').update(schedule='@hourly')
+        self.scheduler.sync()
+        job = ScheduledJob.objects.get(name='fail')
+        self.assertEqual(job.schedule, '@daily')
+        self.assertEqual((job.next_run_at.hour, job.next_run_at.minute),
+                         (0, 0))
+
+    def test_runs_due_jobs_and_records_history(self):
+        self.make_due()
+        runs = {run.name: run for run in self.scheduler.run_pending()}
+        self.assertEqual(calls, ['ran'])
+        self.assertEqual(runs['record'].status, JobRun.SUCCEEDED)
+        self.assertEqual(runs['record'].result, 'ran')
+        self.assertIsNotNone(runs['record'].duration)
+        self.assertEqual(runs['fail'].status, JobRun.FAILED)
+        self.assertIn('boom', runs['fail'].error)
+        self.assertEqual(JobRun.objects.count(), 2)
+
+        # Both jobs are rescheduled and released, failed or not
+        for job in ScheduledJob.objects.all():
+            self.assertGreater(job.next_run_at, timezone.now())
+            self.assertEqual(job.locked_by, '')
+
+    def test_leased_jobs_run_on_one_scheduler_only(self):
+        self.make_due()
+        now = timezone.now()
+        self.assertTrue(self.scheduler.acquire('record', now))
+        self.assertEqual(
+            [run.name for run in Scheduler('worker-2').run_pending()],
+            ['fail'])
+        self.assertEqual(calls, [])
+
+        # An expired lease is taken over
+        later = now + timedelta(seconds=settings.SCHEDULER_LEASE_TIMEOUT + 1)
+        self.assertTrue(Scheduler('worker-2').acquire('record', later))
+
+    def test_heartbeat_extends_leases_of_running_jobs(self):
+        self.make_due()
+        now = timezone.now()
+        scheduler = Scheduler('host:1:scheduler')
+        self.assertTrue(scheduler.acquire('record', now))
+        ScheduledJob.objects.filter(name='record').update(
+            locked_until=now - timedelta(seconds=1))
+        self.assertEqual(refresh_leases('host:12'), 0)
+        self.assertEqual(refresh_leases('host:1'), 1)
+        self.assertFalse(Scheduler('worker-2').acquire('record', now))
+
+    def test_prune_job_runs(self):
+        JobRun.objects.create(
+            name='record', started_at=timezone.now() - timedelta(days=40))
+        JobRun.objects.create(name='record')
+        self.assertEqual(prune_job_runs(days=30), 1)
+        self.assertEqual(JobRun.objects.count(), 1)
+
+    def test_scheduled_jobs_command(self):
+        out = StringIO()
+        call_command('scheduled_jobs', run='record', stdout=out)
+        self.assertIn('record succeeded', out.getvalue())
+        call_command('scheduled_jobs', stdout=out)
+        self.assertIn('fail: @daily', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('scheduled_jobs', run='missing')
@@ -0,0 +1,149 @@
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from locallisting import metrics
+from .queue import (
+    claim_task, refresh_locks, requeue_stale_tasks, run_task
+)
+from .scheduler import Scheduler, refresh_leases
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Run queued tasks in ``threads`` threads until stopped.
+
+    Each thread claims one task at a time and has its own database
+    connection. SIGTERM and SIGINT stop the worker after the running
+    tasks finish, so dyno restarts do not abandon work.
+
+    A heartbeat thread refreshes the locks of the running tasks, and
+    the leases of the running scheduled jobs, every
+    TASK_HEARTBEAT_INTERVAL seconds; only tasks of a worker that stopped
+    refreshing them are requeued as abandoned. Unless disabled, an
+    extra thread runs the scheduled jobs of SCHEDULED_JOBS (see
+    ``taskqueue.scheduler``).
+
+    Args:
+        threads (int): Number of worker threads.
+        poll_interval (float): Seconds to wait when the queue is empty.
+        burst (bool): Stop once the queue is empty instead of waiting.
+            Scheduled jobs are not run in burst mode.
+        scheduler (bool): Run scheduled jobs.
+    """
+
+    def __init__(self, threads=1, poll_interval=1, burst=False,
+                 scheduler=False):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.scheduler = scheduler and not burst
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.finished = threading.Event()
+        self.processed = 0
+        self._lock = threading.Lock()
+        self._last_stale_check = 0
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def run(self):
+        """Run until stopped, or until the queue is empty in burst mode."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+        threads = [
+            threading.Thread(target=self.work, args=(index,),
+                             name=f'task-worker-{index}')
+            for index in range(self.threads)
+        ]
+        if self.scheduler:
+            threads.append(threading.Thread(
+                target=self.schedule, name='task-scheduler'))
+        heartbeat = threading.Thread(
+            target=self.heartbeat, name='task-heartbeat')
+        heartbeat.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.finished.set()
+        heartbeat.join()
+        return self.processed
+
+    def heartbeat(self):
+        """
+        Refresh the locks of the running tasks and the leases of the
+        running scheduled jobs until finished.
+        """
+        try:
+            while not self.finished.wait(settings.TASK_HEARTBEAT_INTERVAL):
+                close_old_connections()
+                try:
+                    refresh_locks(self.name)
+                    if self.scheduler:
+                        refresh_leases(self.name)
+                except Exception:
+                    # Keep beating through transient database errors
+                    logger.exception("Task heartbeat failed")
+        finally:
+            connection.close()
+
+    def check_stale_tasks(self):
+        """Requeue abandoned tasks at most once per lock timeout."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_stale_check < settings.TASK_LOCK_TIMEOUT:
+                return
+            self._last_stale_check = now
+        requeue_stale_tasks()
+
+    def work(self, index):
+        worker_id = f'{self.name}:{index}'
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                self.check_stale_tasks()
+                task = claim_task(worker_id)
+                if task is None:
+                    if self.burst:
+                        return
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                started = time.perf_counter()
+                succeeded = run_task(task)
+                if settings.METRICS_ENABLED:
+                    metrics.record_task(
+                        task.name, succeeded, time.perf_counter() - started)
+                with self._lock:
+                    self.processed += 1
+        except Exception:
+            logger.exception("Task worker thread %s crashed", worker_id)
+            raise
+        finally:
+            connection.close()
+
+    def schedule(self):
+        """Run due scheduled jobs until stopped."""
+        scheduler = Scheduler(f'{self.name}:scheduler')
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                try:
+                    scheduler.sync()
+                    scheduler.run_pending()
+                except Exception:
+                    # Keep scheduling through transient database errors
+                    logger.exception("Task scheduler failed")
+                self.stopping.wait(settings.SCHEDULER_POLL_INTERVAL)
+        finally:
+            connection.close()
@@ -0,0 +1,19 @@
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from taskqueue.batching import delete_in_batches
+
+
+def flush_expired_tokens(batch_size=1000):
+    """
+    Delete expired refresh tokens and their blacklist entries.
+
+    Expired tokens are rejected on their expiry date alone, so their
+    rows only grow the tables checked on every token refresh.
+
+    Returns:
+        int: Number of tokens deleted.
+    """
+    return delete_in_batches(
+        OutstandingToken.objects.filter(expires_at__lt=timezone.now()),
+        batch_size=batch_size)
@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+
+from listings.models import Listing, ListingImage
+from listings.tasks import delete_cloudinary_image
+from messaging.models import Message
+from taskqueue.batching import delete_in_batches
+from taskqueue.queue import PRIORITY_HIGH, PRIORITY_LOW, task
+from . import utils
+
+User = get_user_model()
+
+
+@task(priority=PRIORITY_HIGH)
+def send_password_reset_email(user_id, reset_token):
+    """
+    Send a password reset email, unless the token has been used or
+    replaced by a newer request in the meantime.
+    """
+    user = User.objects.filter(
+        pk=user_id, password_reset_token=reset_token).first()
+    if user is not None:
+        utils.send_password_reset_email(user, reset_token)
+
+
+@task(priority=PRIORITY_LOW)
+def delete_account(user_id):
+    """
+    Delete a deactivated account with its listings, images and messages.
+
+    Rows are deleted in batches so that large accounts never hold long
+    locks, and the listing images are removed from Cloudinary.
+    """
+    user = User.objects.filter(pk=user_id, is_active=False).first()
+    if user is None:
+        return
+
+    images = ListingImage.objects.filter(listing__user=user).only('image')
+    for image in images.iterator():
+        if image.image:
+            delete_cloudinary_image.enqueue(public_id=image.image.public_id)
+
+    delete_in_batches(Listing.objects.filter(user=user))
+    delete_in_batches(Message.objects.filter(sender=user))
+    user.delete()
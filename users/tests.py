@@ -1,8 +1,22 @@
-from django.test import TestCase
+import uuid
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken, OutstandingToken
+)
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.urls import reverse
+from listings.models import Listing, ListingImage
+from locallisting.testing import QueryBudgetTestCase
+from messaging.models import Conversation, Message
+from reviews.models import Review
+from taskqueue.models import Task
+from .jobs import flush_expired_tokens
 from .serializers import UserProfileSerializer
 from profiles.models import Profile
 
@@ -132,6 +146,46 @@ class UserViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(self.user.check_password('newpass123'))
 
+    def test_delete_account(self):
+        """
+        Test deleting the account with its listings.
+        """
+        Listing.objects.create(
+            title='Bike', description='A bike', user=self.user, price=50,
+            condition='good')
+        response = self.client.delete('/api/users/delete-account/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Listing.objects.exists())
+
+    @override_settings(TASKS_EAGER=False)
+    def test_delete_account_is_queued(self):
+        """
+        Test that the account is disabled at once and deleted by a task.
+        """
+        response = self.client.delete('/api/users/delete-account/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        task = Task.objects.get()
+        self.assertEqual(task.name, 'users.tasks.delete_account')
+        self.assertEqual(task.kwargs, {'user_id': self.user.pk})
+
+    def test_flush_expired_tokens(self):
+        """
+        Test that expired refresh tokens are purged with their blacklist
+        entries while valid ones are kept.
+        """
+        expired = RefreshToken.for_user(self.user)
+        expired.blacklist()
+        RefreshToken.for_user(self.user)
+        OutstandingToken.objects.filter(jti=expired['jti']).update(
+            expires_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(flush_expired_tokens(batch_size=1), 1)
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
 
 class UserSerializerTests(TestCase):
     """
@@ -169,3 +223,101 @@ class UserSerializerTests(TestCase):
         data = self.serializer.data
         self.assertEqual(data['email'], self.user.email)
         self.assertEqual(data['username'], self.user.username)
+
+
+class UserQueryBudgetTests(QueryBudgetTestCase):
+    """
+    Query budgets of the account endpoints, which must not grow with
+    the amount of data the user owns (deleting the account included).
+    """
+    urls_module = 'users.urls'
+    budgets = {
+        'register': 6,
+        'login': 3,
+        'token_refresh': 6,
+        'profile': 1,
+        'logout': 7,
+        'change-password': 2,
+        'password-reset-request': 4,
+        'password-reset-confirm': 3,
+        'delete-account': 3,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', email='testuser@example.com',
+            password='testpass123')
+        self.buyer = User.objects.create_user(
+            username='buyer', email='buyer@example.com',
+            password='testpass123')
+        Profile.objects.create(user=self.user)
+        self.reset_token = uuid.uuid4()
+        User.objects.filter(pk=self.user.pk).update(
+            password_reset_token=self.reset_token)
+        self.refresh = RefreshToken.for_user(self.user)
+        self.authenticate(self.user)
+        self.size = 0
+
+    def grow(self, size):
+        """
+        Add listings with images, conversations with messages, favorites
+        and reviews of the user.
+        """
+        for i in range(self.size, size):
+            listing = Listing.objects.create(
+                title=f'Listing {i}', description='Description',
+                user=self.user, price=10, condition='good')
+            ListingImage.objects.create(
+                listing=listing, image=f'listing-{listing.id}')
+            listing.favorited_by.add(self.buyer)
+            conversation = Conversation.objects.create(listing=listing)
+            conversation.participants.add(self.user, self.buyer)
+            Message.objects.create(
+                conversation=conversation, sender=self.buyer,
+                content='Is it available?')
+            reviewer = User.objects.create_user(
+                username=f'reviewer{i}', email=f'reviewer{i}@example.com',
+                password='testpass123')
+            Review.objects.create(
+                reviewer=reviewer, reviewed_user=self.user, rating=5,
+                content='Great seller')
+        self.size = size
+
+    def request_register(self):
+        return self.client.post(reverse('register'), {
+            'email': 'new@example.com', 'username': 'newuser',
+            'password': 'Str0ng-pass-123', 'password2': 'Str0ng-pass-123',
+        })
+
+    def request_login(self):
+        return self.client.post(reverse('login'), {
+            'email': 'testuser@example.com', 'password': 'testpass123'})
+
+    def request_token_refresh(self):
+        return self.client.post(
+            reverse('token_refresh'), {'refresh': str(self.refresh)})
+
+    def request_profile(self):
+        return self.client.get(reverse('profile'))
+
+    def request_logout(self):
+        return self.client.post(
+            reverse('logout'), {'refresh_token': str(self.refresh)})
+
+    def request_change_password(self):
+        return self.client.post(reverse('change-password'), {
+            'current_password': 'testpass123',
+            'new_password': 'Str0ng-pass-123'})
+
+    def request_password_reset_request(self):
+        return self.client.post(
+            reverse('password-reset-request'),
+            {'email': 'testuser@example.com'})
+
+    def request_password_reset_confirm(self):
+        return self.client.post(reverse('password-reset-confirm'), {
+            'token': str(self.reset_token),
+            'new_password': 'Str0ng-pass-123'})
+
+    def request_delete_account(self):
+        return self.client.delete(reverse('delete-account'))
@@ -1,6 +1,7 @@
 from django.core.mail import send_mail
 from django.conf import settings
 from textwrap import dedent
+from locallisting.timing import track
 
 
 def send_password_reset_email(user, reset_token):
@@ -35,7 +36,7 @@ def send_password_reset_email(user, reset_token):
             body {{ font-family: Arial, sans-serif; line-height: 1.6;
             color: #333; }}
             .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            
+
         </style>
     </head>
     <body>
@@ -78,10 +79,11 @@ def send_password_reset_email(user, reset_token):
     from_email = settings.DEFAULT_FROM_EMAIL
     to_email = user.email
 
-    send_mail(
-        subject,
-        plain_message,
-        from_email,
-        [to_email],
-        html_message=html_message,
-    )
+    with track('smtp'):
+        send_mail(
+            subject,
+            plain_message,
+            from_email,
+            [to_email],
+            html_message=html_message,
+        )
@@ -15,7 +15,7 @@ from .serializers import (
     PasswordResetRequestSerializer,
     PasswordResetConfirmSerializer
 )
-from .utils import send_password_reset_email
+from .tasks import delete_account, send_password_reset_email
 from profiles.models import Profile
 
 User = get_user_model()
@@ -215,7 +215,8 @@ class PasswordResetRequestView(APIView):
                 user.password_reset_token = reset_token
                 user.save()
 
-                send_password_reset_email(user, reset_token)
+                send_password_reset_email.enqueue(
+                    user_id=user.pk, reset_token=str(reset_token))
 
                 return Response({
                     "message": "Password reset email sent.",
@@ -275,7 +276,10 @@ class DeleteAccountView(APIView):
     permission_classes = [IsAuthenticated]
 
     def delete(self, request):
+        # The account is disabled now and deleted by the task worker
         user = request.user
-        user.delete()
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        delete_account.enqueue(user_id=user.pk)
         return Response({"message": "Account deleted successfully."},
                         status=status.HTTP_200_OK)